@@ -0,0 +1,119 @@
+"""Compare chatbot entity extraction: per-term substring scans vs the Aho-Corasick matcher.
+
+Modes:
+  linear  - entity_matcher.extract_entities_linear (the previous extract_entities loop)
+  aho     - entity_matcher.EntityMatcher.extract (one pass, word boundaries, synonyms folded)
+
+Messages are the training_data.json examples plus a few condition/fruit questions.
+The catalogue is the data/explore fruit names, padded with synthetic names up to
+--fruits so you can see how each mode scales. Messages where the two modes
+find different entities are counted and the first few are printed, e.g. "from" inside "fromage".
+
+Usage:
+python backend/benchmarks/bench_entities.py --fruits 50 500 2000 --repeat 3
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = BACKEND_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR / 'chatbot'))
+
+from entity_matcher import EntityMatcher, extract_entities_linear  # noqa: E402
+
+BASE_FRUITS = ['apple', 'banana', 'orange', 'mango', 'pineapple', 'strawberry', 'blueberry', 'grape',
+               'watermelon', 'papaya', 'kiwi', 'guava', 'pear', 'peach', 'cherry', 'lemon', 'lime',
+               'pomegranate', 'avocado', 'coconut', 'passion fruit', 'dragon fruit', 'jackfruit', 'fig']
+
+EXTRA_MESSAGES = [
+    'Which fruits are good for high blood pressure?',
+    'Is pineapple better than apples for diabetes?',
+    'I have high bp and low iron, what should I eat',
+    'Compare mangoes vs papayas for digestion',
+    'How many bananas can I eat daily when I am diabetic?',
+    'Where are dragon fruits grown and when are they in season?',
+    'I am allergic to kiwis, any smoothie recipes without them?',
+    'Tell me about cookies and fromage from France',
+]
+
+
+def load_fruit_names(limit: int) -> list:
+    explore = PROJECT_ROOT / 'data' / 'explore'
+    names = sorted(p.stem for p in explore.glob('*.json')) if explore.is_dir() else []
+    names = names or list(BASE_FRUITS)
+    i = 0
+    while len(names) < limit:
+        names.append(f'{BASE_FRUITS[i % len(BASE_FRUITS)]} variety {i}')
+        i += 1
+    return names[:limit]
+
+
+def load_messages() -> list:
+    messages = list(EXTRA_MESSAGES)
+    path = BACKEND_DIR / 'chatbot' / 'data' / 'training_data.json'
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for examples in data.get('intents', {}).values():
+            messages.extend(examples)
+    except Exception as e:
+        print(f'training data not loaded ({e}); using built-in messages only')
+    return messages
+
+
+def as_sets(entities: dict) -> dict:
+    # linear lists follow term order, aho lists follow message order; only the contents matter here
+    return {k: set(v) for k, v in entities.items()}
+
+
+def time_mode(fn, messages: list, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for m in messages:
+            fn(m)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--fruits', type=int, nargs='+', default=[len(BASE_FRUITS), 500, 2000],
+                    help='catalogue sizes to benchmark')
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--show-diffs', type=int, default=5, help='print this many disagreeing messages')
+    args = ap.parse_args(argv)
+
+    messages = load_messages()
+    print(f'{len(messages)} messages')
+    print(f"{'fruits':>7} {'patterns':>9} {'build_ms':>9} {'linear_us':>10} {'aho_us':>8} {'speedup':>8} {'diffs':>6}")
+    diffs = []
+    for size in args.fruits:
+        names = load_fruit_names(size)
+        t0 = time.perf_counter()
+        matcher = EntityMatcher(names)
+        build_ms = (time.perf_counter() - t0) * 1000
+        linear = time_mode(lambda m: extract_entities_linear(m, names), messages, args.repeat)
+        aho = time_mode(matcher.extract, messages, args.repeat)
+        diffs = []
+        for m in messages:
+            old, new = extract_entities_linear(m, names), matcher.extract(m)
+            if as_sets(old) != as_sets(new):
+                diffs.append((m, old, new))
+        per_msg = 1e6 / len(messages)
+        print(f'{size:>7} {matcher.pattern_count:>9} {build_ms:>9.1f} {linear * per_msg:>10.1f} '
+              f'{aho * per_msg:>8.1f} {linear / max(aho, 1e-9):>7.1f}x {len(diffs):>6}')
+
+    for m, old, new in diffs[:args.show_diffs]:
+        print(f'\n{m!r}')
+        print('  linear:', {k: v for k, v in old.items() if v})
+        print('  aho:   ', {k: v for k, v in new.items() if v})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Latency/throughput benchmark for the vision stack, with regression comparison.
+
+Two suites, both fed with real images from data/splits/test:
+  model  - the serving model alone (vision.model_loader.load_model), every
+           combination of --batch-sizes and --threads; p50/p95/p99 per batch,
+           images/sec and process RSS.
+  http   - end-to-end POST /vision/predict against `uvicorn vision_api:app`
+           (started here, or an existing server via --url) with a concurrent
+           load generator at each --concurrency level; p50/p95/p99, req/s,
+           error count and server RSS.
+
+The JSON written with --json records the git commit and machine info. Pass a
+previous result with --compare to print deltas. The exit status is 1 if any
+p99 or throughput regressed by more than --tolerance.
+
+Usage:
+python backend/benchmarks/bench_inference.py --suite model --batch-sizes 1 8 32 --threads 1 4
+python backend/benchmarks/bench_inference.py --suite http --concurrency 1 8 32 --requests 400
+python backend/benchmarks/bench_inference.py --json bench.json --compare bench_main.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = BACKEND_DIR.parent
+MODEL_DIR = PROJECT_ROOT / 'ml' / 'models'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.metrics import summarize_ms  # noqa: E402
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def load_images(root: Path, limit: int) -> list:
+    paths = sorted(p for p in root.rglob('*') if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES)
+    if limit:
+        paths = paths[:limit]
+    return [(p.name, p.read_bytes()) for p in paths]
+
+
+def rss_mb(pid: int = 0) -> float:
+    """Resident set size of a process (Linux /proc; 0.0 elsewhere)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", 'r', encoding='utf-8') as f:
+            for ln in f:
+                if ln.startswith('VmRSS:'):
+                    return round(int(ln.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+def machine_info() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=str(PROJECT_ROOT),
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        commit = ''
+    info = {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    try:
+        import torch
+        info['torch'] = torch.__version__
+    except Exception:
+        pass
+    return info
+
+
+# --- model-only ---
+def bench_model(images: list, batch_sizes: list, threads: list, variant: str, iters: int, warmup: int) -> list:
+    import torch
+    from vision.model_loader import load_model
+    from vision.preprocess import decode_resized, to_chw_tensor
+
+    model, classes, loaded_variant, img_size = load_model(MODEL_DIR, variant)
+    tensors = [to_chw_tensor(decode_resized(data, img_size)).float().div_(255.0) for _, data in images]
+    print(f"model: variant {loaded_variant}, {len(classes)} classes, {img_size}px input, {len(tensors)} test images")
+    rows = []
+    for n_threads in threads:
+        torch.set_num_threads(n_threads)
+        for bs in batch_sizes:
+            # cycle through the real images to fill each batch
+            batches = [torch.stack([tensors[(i * bs + j) % len(tensors)] for j in range(bs)])
+                       for i in range(max(1, min(iters, len(tensors) // bs or 1)))]
+            samples = []
+            with torch.inference_mode():
+                for i in range(warmup):
+                    model(batches[i % len(batches)])
+                t0 = time.perf_counter()
+                for i in range(iters):
+                    s = time.perf_counter()
+                    model(batches[i % len(batches)])
+                    samples.append(time.perf_counter() - s)
+                elapsed = time.perf_counter() - t0
+            row = dict(summarize_ms(samples), suite='model', variant=loaded_variant, threads=n_threads,
+                       batch_size=bs, images_per_sec=round(bs * iters / elapsed, 2), rss_mb=rss_mb())
+            rows.append(row)
+            print(f"  threads={n_threads:<3} bs={bs:<4} p50 {row['p50_ms']:8.2f} ms  p99 {row['p99_ms']:8.2f} ms  "
+                  f"{row['images_per_sec']:9.1f} img/s  rss {row['rss_mb']} MB")
+    return rows
+
+
+# --- end-to-end HTTP ---
+def _multipart(name: str, data: bytes) -> tuple:
+    boundary = uuid.uuid4().hex
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8')
+    return head + data + f'\r\n--{boundary}--\r\n'.encode('utf-8'), f'multipart/form-data; boundary={boundary}'
+
+
+def _post(url: str, name: str, data: bytes) -> tuple:
+    body, ctype = _multipart(name, data)
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': ctype}, method='POST')
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as r:
+            r.read()
+            ok = r.status == 200
+    except (urllib.error.URLError, ConnectionError, OSError):
+        ok = False
+    return time.perf_counter() - t0, ok
+
+
+def _wait_ready(base_url: str, timeout: float):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        try:
+            with urllib.request.urlopen(f'{base_url}/vision/ready', timeout=2) as r:
+                if r.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f'{base_url} not ready after {timeout}s')
+
+
+def bench_http(images: list, concurrency: list, requests: int, url: str, port: int, timeout: float,
+               cache: bool) -> list:
+    proc = None
+    base_url = url.rstrip('/')
+    if not base_url:
+        env = os.environ.copy()
+        env.setdefault('VISION_MODEL_POLL_SECONDS', '0')
+        if not cache:
+            # every request should reach the model, not the prediction cache
+            env['VISION_CACHE_SIZE'] = '0'
+        cmd = [sys.executable, '-m', 'uvicorn', 'vision_api:app', '--host', '127.0.0.1', '--port', str(port),
+               '--log-level', 'warning']
+        proc = subprocess.Popen(cmd, cwd=str(BACKEND_DIR), env=env)
+        base_url = f'http://127.0.0.1:{port}'
+    rows = []
+    try:
+        _wait_ready(base_url, timeout)
+        predict = f'{base_url}/vision/predict'
+        for name, data in images[:4]:  # warm the server's pools
+            _post(predict, name, data)
+        for conc in concurrency:
+            jobs = [images[i % len(images)] for i in range(requests)]
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=conc) as ex:
+                results = list(ex.map(lambda job: _post(predict, job[0], job[1]), jobs))
+            elapsed = time.perf_counter() - t0
+            lat = [s for s, ok in results if ok]
+            row = dict(summarize_ms(lat), suite='http', concurrency=conc, requests=requests,
+                       errors=sum(1 for _, ok in results if not ok),
+                       requests_per_sec=round(len(lat) / elapsed, 2) if elapsed else 0.0,
+                       server_rss_mb=rss_mb(proc.pid) if proc else None)
+            rows.append(row)
+            print(f"  conc={conc:<4} p50 {row['p50_ms']:8.2f} ms  p95 {row['p95_ms']:8.2f} ms  "
+                  f"p99 {row['p99_ms']:8.2f} ms  {row['requests_per_sec']:8.1f} req/s  errors {row['errors']}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return rows
+
+
+# --- regression comparison ---
+def _key(row: dict) -> tuple:
+    if row['suite'] == 'model':
+        return ('model', row.get('variant'), row['threads'], row['batch_size'])
+    return ('http', row['concurrency'])
+
+
+def compare(current: list, baseline: list, tolerance: float) -> list:
+    """Rows whose p99 rose or throughput fell by more than `tolerance` (relative) vs the baseline."""
+    base = {_key(r): r for r in baseline}
+    regressions = []
+    for row in current:
+        old = base.get(_key(row))
+        if old is None:
+            continue
+        tput = 'images_per_sec' if row['suite'] == 'model' else 'requests_per_sec'
+        p99_delta = (row['p99_ms'] - old['p99_ms']) / old['p99_ms'] if old['p99_ms'] else 0.0
+        tput_delta = (row[tput] - old[tput]) / old[tput] if old[tput] else 0.0
+        flag = p99_delta > tolerance or tput_delta < -tolerance
+        print(f"  {str(_key(row)):<40} p99 {old['p99_ms']:8.2f} -> {row['p99_ms']:8.2f} ({p99_delta:+.1%})  "
+              f"{tput} {old[tput]:8.1f} -> {row[tput]:8.1f} ({tput_delta:+.1%}){'  REGRESSION' if flag else ''}")
+        if flag:
+            regressions.append(_key(row))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suite', choices=['model', 'http', 'all'], default='all')
+    parser.add_argument('--images', default=str(PROJECT_ROOT / 'data' / 'splits' / 'test'))
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--variant', default=os.environ.get('VISION_MODEL_VARIANT', 'auto'))
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[1, 4, 16, 32])
+    parser.add_argument('--threads', type=int, nargs='*', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--iters', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, nargs='*', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=300, help='requests per concurrency level')
+    parser.add_argument('--url', default='', help='benchmark an already running server instead of starting one')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--timeout', type=float, default=180.0)
+    parser.add_argument('--cache', action='store_true', help='leave the prediction cache enabled for http runs')
+    parser.add_argument('--json', default='', help='write results to this file')
+    parser.add_argument('--compare', default='', help='earlier --json result to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='relative p99/throughput regression threshold')
+    args = parser.parse_args()
+
+    images = load_images(Path(args.images), args.limit)
+    if not images:
+        print(f"No images found under {args.images}")
+        return 1
+    print(f"Loaded {len(images)} images from {args.images}")
+
+    results = []
+    if args.suite in ('model', 'all'):
+        results += bench_model(images, args.batch_sizes, args.threads, args.variant, args.iters, args.warmup)
+    if args.suite in ('http', 'all'):
+        print('http:')
+        results += bench_http(images, args.concurrency, args.requests, args.url, args.port, args.timeout, args.cache)
+
+    out = {'machine': machine_info(), 'images': len(images), 'results': results}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(out, f, indent=2)
+        print(f"Wrote results to {args.json}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare} (commit {baseline.get('machine', {}).get('commit') or '?'}):")
+        regressions = compare(results, baseline.get('results', []), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
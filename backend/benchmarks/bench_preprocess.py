@@ -0,0 +1,103 @@
+"""Compare image preprocessing strategies used by /vision/predict.
+
+Modes:
+  legacy  - PIL open + convert + torchvision Resize((224,224)) + ToTensor (the old inline path)
+  draft   - vision.preprocess.decode_resized inline (JPEG draft decoding, uint8 output)
+  pool:N  - vision.preprocess.PreprocessPool with N worker processes and shared-memory slots
+
+Usage:
+python backend/benchmarks/bench_preprocess.py --images data/splits/test --workers 2 4 --repeat 2
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = BACKEND_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from vision.preprocess import PreprocessPool, decode_resized, to_chw_tensor  # noqa: E402
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def load_images(root: Path, limit: int) -> list:
+    paths = sorted(p for p in root.rglob('*') if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES)
+    if limit:
+        paths = paths[:limit]
+    return [p.read_bytes() for p in paths]
+
+
+def legacy_preprocess(data: bytes):
+    import io
+    from PIL import Image
+    from torchvision import transforms
+    transform = transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+    ])
+    return transform(Image.open(io.BytesIO(data)).convert('RGB'))
+
+
+def draft_preprocess(data: bytes):
+    return to_chw_tensor(decode_resized(data, 224)).float().div_(255.0)
+
+
+def run(fn, images, concurrency: int) -> float:
+    t0 = time.perf_counter()
+    if concurrency <= 1:
+        for data in images:
+            fn(data)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            list(ex.map(fn, images))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', default=str(PROJECT_ROOT / 'data' / 'splits' / 'test'))
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='*', default=[2, 4])
+    parser.add_argument('--repeat', type=int, default=2)
+    parser.add_argument('--json', default='', help='optional path to write results as JSON')
+    args = parser.parse_args()
+
+    images = load_images(Path(args.images), args.limit)
+    if not images:
+        print(f"No images found under {args.images}")
+        return
+    total_mb = sum(len(b) for b in images) / 1e6
+    print(f"Loaded {len(images)} images ({total_mb:.1f} MB) from {args.images}")
+
+    results = []
+
+    def record(mode, fn, concurrency):
+        fn(images[0])  # warm imports / worker start-up
+        best = min(run(fn, images, concurrency) for _ in range(args.repeat))
+        row = {'mode': mode, 'concurrency': concurrency, 'seconds': round(best, 4),
+               'images_per_sec': round(len(images) / best, 2), 'ms_per_image': round(best / len(images) * 1000.0, 3)}
+        results.append(row)
+        print(f"{mode:>10}  conc={concurrency:<3} {row['images_per_sec']:>9.1f} img/s  {row['ms_per_image']:>8.3f} ms/img")
+
+    record('legacy', legacy_preprocess, 1)
+    record('draft', draft_preprocess, 1)
+    for n in args.workers:
+        pool = PreprocessPool(n, size=224)
+        try:
+            record(f'pool:{n}', pool.preprocess, n * 2)
+        finally:
+            pool.close()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'images': len(images), 'source': args.images, 'results': results}, f, indent=2)
+        print(f"Wrote results to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Measure startup time and per-worker memory of `vision_api:app` under uvicorn.
+
+Starts `uvicorn vision_api:app --workers N` from backend/, waits for every
+worker to report ready on /vision/ready, then reads /proc/<pid>/smaps_rollup
+for each worker. RSS counts pages shared with other processes in full, so
+compare PSS (shared pages split between the processes mapping them) and
+Private_* to see what each extra worker really costs. Linux only.
+
+Usage:
+python backend/benchmarks/bench_workers_rss.py --workers 4
+python backend/benchmarks/bench_workers_rss.py --workers 4 --modes private shared --json rss.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def smaps_rollup(pid: int) -> dict:
+    out = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r', encoding='utf-8') as f:
+        for ln in f:
+            parts = ln.split()
+            if len(parts) >= 3 and parts[-1] == 'kB':
+                out[parts[0].rstrip(':')] = int(parts[-2])
+    return out
+
+
+def child_pids(pid: int) -> list:
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children', 'r', encoding='utf-8') as f:
+            return [int(x) for x in f.read().split()]
+    except OSError:
+        return []
+
+
+def wait_ready(url: str, workers: int, timeout: float) -> float:
+    """Poll /vision/ready until `workers` consecutive probes succeed (probes land on random workers)."""
+    t0 = time.perf_counter()
+    streak = 0
+    while time.perf_counter() - t0 < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as r:
+                streak = streak + 1 if r.status == 200 else 0
+        except (urllib.error.URLError, ConnectionError, OSError):
+            streak = 0
+        if streak >= workers * 3:
+            return time.perf_counter() - t0
+        time.sleep(0.2)
+    raise TimeoutError(f'{url} not ready after {timeout}s')
+
+
+def run_mode(mode: str, workers: int, port: int, timeout: float, settle: float) -> dict:
+    env = os.environ.copy()
+    env['VISION_SHARED_WEIGHTS'] = '1' if mode == 'shared' else '0'
+    env.setdefault('VISION_MODEL_POLL_SECONDS', '0')
+    cmd = [sys.executable, '-m', 'uvicorn', 'vision_api:app', '--host', '127.0.0.1', '--port', str(port),
+           '--workers', str(workers), '--log-level', 'warning']
+    proc = subprocess.Popen(cmd, cwd=str(BACKEND_DIR), env=env)
+    try:
+        startup = wait_ready(f'http://127.0.0.1:{port}/vision/ready', workers, timeout)
+        time.sleep(settle)
+        pids = child_pids(proc.pid)
+        # uvicorn's multiprocess supervisor spawns one child per worker (plus possibly a resource tracker)
+        rows = []
+        for pid in pids:
+            try:
+                mem = smaps_rollup(pid)
+            except OSError:
+                continue
+            rows.append({
+                'pid': pid,
+                'rss_mb': round(mem.get('Rss', 0) / 1024.0, 1),
+                'pss_mb': round(mem.get('Pss', 0) / 1024.0, 1),
+                'private_mb': round((mem.get('Private_Clean', 0) + mem.get('Private_Dirty', 0)) / 1024.0, 1),
+                'shared_mb': round((mem.get('Shared_Clean', 0) + mem.get('Shared_Dirty', 0)) / 1024.0, 1),
+            })
+        rows.sort(key=lambda r: -r['rss_mb'])
+        rows = rows[:workers]
+        total_pss = sum(r['pss_mb'] for r in rows)
+        return {
+            'mode': mode,
+            'workers': workers,
+            'startup_seconds': round(startup, 2),
+            'total_pss_mb': round(total_pss, 1),
+            'pss_per_worker_mb': round(total_pss / len(rows), 1) if rows else 0.0,
+            'private_per_worker_mb': round(sum(r['private_mb'] for r in rows) / len(rows), 1) if rows else 0.0,
+            'worker_processes': rows,
+        }
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modes', nargs='*', default=['private', 'shared'], choices=['private', 'shared'])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=180.0)
+    parser.add_argument('--settle', type=float, default=2.0, help='seconds to wait after ready before sampling')
+    parser.add_argument('--json', default='')
+    args = parser.parse_args()
+
+    if not Path('/proc/self/smaps_rollup').exists():
+        print('This benchmark needs Linux /proc/<pid>/smaps_rollup')
+        return
+
+    results = []
+    for mode in args.modes:
+        res = run_mode(mode, args.workers, args.port, args.timeout, args.settle)
+        results.append(res)
+        print(f"{mode:>8}: {args.workers} workers ready in {res['startup_seconds']}s, "
+              f"PSS {res['pss_per_worker_mb']} MB/worker (private {res['private_per_worker_mb']} MB), "
+              f"total PSS {res['total_pss_mb']} MB")
+    if len(results) == 2:
+        saved = results[0]['pss_per_worker_mb'] - results[1]['pss_per_worker_mb']
+        print(f"Per-worker PSS saving with shared weights: {saved:.1f} MB")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote results to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
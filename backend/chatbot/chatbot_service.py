@@ -0,0 +1,204 @@
+"""Background initialization and readiness for the Fruitopia chatbot.
+
+Building FruitopiaChatbot imports sentence-transformers, loads the encoder,
+may download NLTK data, loads the fruit database and the intent index. That
+takes seconds. Both backend/main.py and backend/vision_api.py start it on a
+background thread at startup (`ChatbotService.start`). Only one initialization
+runs, even when many requests arrive at once. Until it finishes,
+`respond` answers from a small rule-based fallback instead of blocking the
+request, and the reply is marked `source: 'fallback'`.
+
+Once the chatbot is ready, `respond_async` coalesces concurrent messages
+through a MicroBatcher (utils/batching.py). Messages arriving within
+CHATBOT_MAX_WAIT_MS (default 5), up to CHATBOT_MAX_BATCH (default 32), are
+encoded by SentenceTransformer in one call on a worker thread, off the event
+loop. `respond_bulk` serves /chatbot/messages in chunks of CHATBOT_BULK_CHUNK.
+
+`health()` reports the state (starting, loading, ready, failed), seconds per
+stage (import, sentence_model, nltk_data, fruit_database, training_data), how
+many replies came from the model vs the fallback, the batcher stats and the
+hit rates of the chatbot's query memo (query_cache.py).
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('chatbot.service')
+
+ERROR_RESPONSE = "I'm sorry, I'm having trouble processing your request right now."
+
+_GREETINGS = {'hello', 'hi', 'hey', 'howdy', 'greetings'}
+_GOODBYES = {'bye', 'goodbye', 'farewell'}
+_CONDITIONS = ('diabetes', 'diabetic', 'blood pressure', 'hypertension', 'cholesterol', 'heart',
+               'weight', 'digestion', 'immune', 'anemia', 'constipation')
+
+
+def fallback_response(message: str) -> str:
+    """Quick rule-based reply used while the transformer chatbot is still loading."""
+    text = (message or '').lower()
+    words = set(re.findall(r"[a-z']+", text))
+    if words & _GREETINGS:
+        return "Hello! I am your Fruitopia assistant. I'm still warming up, so my answers are brief for a moment."
+    if words & _GOODBYES:
+        return "Goodbye! Remember to eat your fruits for better health."
+    if any(c in text for c in _CONDITIONS):
+        return ("I can recommend fruits for that condition. Give me a few seconds to finish loading, "
+                "then ask again for detailed recommendations.")
+    if 'recommend' in words or 'suggest' in words:
+        return 'Sure! Please tell me your disease or symptoms.'
+    return 'I can help you find healthy fruits. Ask me for recommendations!'
+
+
+class ChatbotService:
+    def __init__(self, retry_seconds: float = 60.0):
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._respond_many = None
+        self._batcher = None
+        self._cache_stats = None
+        self.state = 'starting'
+        self.since = time.time()
+        self.error: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self.total_seconds: Optional[float] = None
+        self.model_responses = 0
+        self.fallback_responses = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def _set_state(self, state: str, error: Optional[str] = None):
+        self.state = state
+        self.error = error
+        self.since = time.time()
+
+    def start(self) -> bool:
+        """Start initialization on a background thread unless it is running or done; True if started."""
+        with self._lock:
+            if self.state in ('loading', 'ready'):
+                return False
+            if self.state == 'failed' and time.time() - self.since < self.retry_seconds:
+                return False
+            self._set_state('loading')
+            self._thread = threading.Thread(target=self._initialize, name='chatbot-init', daemon=True)
+            self._thread.start()
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until initialization has finished (for scripts and tests); returns `ready`."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.ready
+
+    def _initialize(self):
+        t0 = time.perf_counter()
+        try:
+            t = time.perf_counter()
+            from custom_chatbot import initialize_chatbot, get_responses, cache_stats  # type: ignore
+            stages = {'import': time.perf_counter() - t}
+            stages.update(initialize_chatbot() or {})
+            self.stages = {k: round(v, 3) for k, v in stages.items()}
+            self._respond_many = get_responses
+            self._cache_stats = cache_stats
+            self.total_seconds = round(time.perf_counter() - t0, 3)
+            self._set_state('ready')
+            logger.info(f"chatbot ready in {self.total_seconds}s {self.stages}")
+        except Exception as e:
+            self.total_seconds = round(time.perf_counter() - t0, 3)
+            self._set_state('failed', str(e))
+            logger.error(f"Chatbot initialization failed: {e}")
+
+    def respond_many(self, messages: List[str]) -> List[dict]:
+        """{'response', 'source', 'intent'} per message; one encode call for the whole list.
+
+        source is 'model', 'fallback' (not ready yet) or 'error'. Never blocks on initialization.
+        If the batched call raises, each message is retried on its own, so one bad
+        message in a coalesced batch only fails itself.
+        """
+        if not self.ready:
+            # a never-started init starts now; a failed one is retried after retry_seconds
+            self.start()
+            with self._lock:
+                self.fallback_responses += len(messages)
+            return [{'response': fallback_response(m), 'source': 'fallback', 'intent': None} for m in messages]
+        try:
+            pairs = self._respond_many(list(messages))
+        except Exception as e:
+            logger.error(f"Chatbot error: {e}")
+            if len(messages) == 1:
+                return [{'response': ERROR_RESPONSE, 'source': 'error', 'intent': None}]
+            return [out for m in messages for out in self.respond_many([m])]
+        with self._lock:
+            self.model_responses += len(messages)
+        return [{'response': reply, 'source': 'model', 'intent': intent} for intent, reply in pairs]
+
+    def respond(self, message: str) -> Tuple[str, str]:
+        """(reply, source) for one message, without coalescing."""
+        out = self.respond_many([message])[0]
+        return out['response'], out['source']
+
+    def _get_batcher(self):
+        if self._batcher is None:
+            with self._lock:
+                if self._batcher is None:
+                    from utils.batching import MicroBatcher
+                    self._batcher = MicroBatcher(
+                        self.respond_many,
+                        max_batch_size=int(os.environ.get('CHATBOT_MAX_BATCH', '32')),
+                        max_wait_ms=float(os.environ.get('CHATBOT_MAX_WAIT_MS', '5')),
+                        name='chatbot-encode',
+                    )
+        return self._batcher
+
+    async def respond_async(self, message: str) -> dict:
+        """Coalesce with concurrent callers into one batched encode; the fallback path skips the queue."""
+        if not self.ready:
+            return self.respond_many([message])[0]
+        return await self._get_batcher().submit(message)
+
+    def respond_bulk(self, messages: List[str], chunk: int = 0) -> List[dict]:
+        """respond_many over `chunk`-sized slices (CHATBOT_BULK_CHUNK, default 256) for offline replays."""
+        chunk = chunk or int(os.environ.get('CHATBOT_BULK_CHUNK', '256'))
+        out = []
+        for i in range(0, len(messages), max(1, chunk)):
+            out.extend(self.respond_many(messages[i:i + chunk]))
+        return out
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.close()
+            self._batcher = None
+
+    def health(self) -> dict:
+        return {
+            'ready': self.ready,
+            'state': self.state,
+            'since': self.since,
+            'error': self.error,
+            'stages_seconds': dict(self.stages),
+            'total_seconds': self.total_seconds,
+            'model_responses': self.model_responses,
+            'fallback_responses': self.fallback_responses,
+            'batcher': self._batcher.stats() if self._batcher is not None else None,
+            'cache': self._cache_stats() if self._cache_stats is not None else None,
+        }
+
+
+_SERVICE: Optional[ChatbotService] = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_service() -> ChatbotService:
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                _SERVICE = ChatbotService()
+    return _SERVICE
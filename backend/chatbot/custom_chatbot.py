@@ -10,24 +10,46 @@ import pickle
 import numpy as np
 from typing import List, Dict, Any, Optional
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import nltk
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 import re
+import time
+
+try:
+    from embedding_index import build_index, file_sha256, load_index, normalize_rows
+    from entity_matcher import EntityMatcher
+    from query_cache import LRUCache, normalize_query
+except ImportError:  # imported as backend.chatbot.custom_chatbot
+    from .embedding_index import build_index, file_sha256, load_index, normalize_rows
+    from .entity_matcher import EntityMatcher
+    from .query_cache import LRUCache, normalize_query
 
 class FruitopiaChatbot:
     """Custom transformer-based chatbot for fruit recommendations and information"""
 
     def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
         """Initialize the chatbot with a sentence transformer model"""
+        # seconds spent per construction stage, reported by /chatbot/health
+        self.init_timings = {}
+        t0 = time.perf_counter()
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
+        self.init_timings['sentence_model'] = time.perf_counter() - t0
         self.intents = {}
         self.responses = {}
+        self.intent_map = []
+        # unit-length rows from the on-disk index (embedding_index.py)
         self.intent_embeddings = None
         self.fruit_database = None
+        # Aho-Corasick automaton over diseases, fruit names and keywords (entity_matcher.py)
+        self.entity_matcher = None
+        # memo of recent queries (embedding, intent, entities) and of database-derived response parts
+        self.analysis_cache = LRUCache(int(os.environ.get('CHATBOT_CACHE_SIZE', '4096')), 'analysis')
+        self.fragment_cache = LRUCache(int(os.environ.get('CHATBOT_FRAGMENT_CACHE_SIZE', '1024')), 'fragments')
 
         # Download NLTK data if needed
+        t0 = time.perf_counter()
         try:
             nltk.data.find('tokenizers/punkt')
         except LookupError:
@@ -39,6 +61,7 @@ class FruitopiaChatbot:
             nltk.download('stopwords', quiet=True)
 
         self.stop_words = set(stopwords.words('english'))
+        self.init_timings['nltk_data'] = time.perf_counter() - t0
 
     def load_fruit_database(self, data_path: str = None):
         """Load the comprehensive fruit database"""
@@ -53,6 +76,7 @@ class FruitopiaChatbot:
             return
 
         self.fruit_database = {}
+        self.clear_caches()
         fruit_files = [f for f in os.listdir(data_path) if f.endswith('.json')]
 
         for file in fruit_files:
@@ -63,6 +87,7 @@ class FruitopiaChatbot:
             except Exception as e:
                 print(f"Error loading {file}: {e}")
 
+        self.entity_matcher = EntityMatcher(self.fruit_database.keys())
         print(f"Loaded {len(self.fruit_database)} fruits from database")
 
     def preprocess_text(self, text: str) -> str:
@@ -94,19 +119,32 @@ class FruitopiaChatbot:
 
             self.intents = data.get('intents', {})
             self.responses = data.get('responses', {})
+            self.clear_caches()
+
+            # Reuse the persisted embedding index when it matches this model and training file
+            training_hash = file_sha256(data_path)
+            cached = load_index(self.model_name, training_hash)
+            if cached is not None:
+                self.intent_embeddings, self.intent_map = cached
+                print(f"Loaded {len(self.intents)} intents with {len(self.intent_map)} training examples "
+                      f"from the embedding index")
+                return
 
             # Create embeddings for all intent examples
             all_examples = []
-            self.intent_map = []
+            intent_map = []
 
             for intent, examples in self.intents.items():
                 for example in examples:
                     all_examples.append(self.preprocess_text(example))
-                    self.intent_map.append(intent)
+                    intent_map.append(intent)
 
             if all_examples:
-                self.intent_embeddings = self.model.encode(all_examples)
-                print(f"Loaded {len(self.intents)} intents with {len(all_examples)} training examples")
+                embeddings = self.model.encode(all_examples, convert_to_numpy=True)
+                self.intent_embeddings, self.intent_map = build_index(
+                    self.model_name, training_hash, embeddings, intent_map)
+                print(f"Loaded {len(self.intents)} intents with {len(all_examples)} training examples "
+                      f"(embedding index rebuilt)")
 
         except Exception as e:
             print(f"Error loading training data: {e}")
@@ -287,112 +325,72 @@ class FruitopiaChatbot:
 
         print(f"Created comprehensive training data at {data_path}")
 
+    def clear_caches(self):
+        """Drop memoized analyses and response parts (the database or intents changed)"""
+        self.analysis_cache.clear()
+        self.fragment_cache.clear()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {'analysis': self.analysis_cache.stats(), 'fragments': self.fragment_cache.stats()}
+
+    def encode_messages(self, messages: List[str]) -> np.ndarray:
+        """Encode preprocessed messages in one batched call; rows are unit length"""
+        processed = [self.preprocess_text(m) for m in messages]
+        embeddings = self.model.encode(processed, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def analyze_messages(self, messages: List[str], threshold: float = 0.2) -> List[Dict[str, Any]]:
+        """Embedding, intent and entities per message, memoized on the normalized text.
+
+        Messages missing from the cache are encoded together in one batch.
+        """
+        keys = [(normalize_query(m), threshold) for m in messages]
+        found = [self.analysis_cache.get(k) for k in keys]
+        missing = list(dict.fromkeys(k for k, a in zip(keys, found) if a is None))
+        if not missing:
+            return found
+
+        texts = [text for text, _ in missing]
+        if self.intent_embeddings is None:
+            embeddings = [None] * len(texts)
+            intents = ["default"] * len(texts)
+        else:
+            embeddings = self.encode_messages(texts)
+            # Index rows are unit length, so one product gives every cosine similarity
+            similarities = embeddings @ np.asarray(self.intent_embeddings).T
+            best = similarities.argmax(axis=1)
+            intents = [self.intent_map[idx] if similarities[row, idx] >= threshold else "default"
+                       for row, idx in enumerate(best)]
+
+        fresh = {}
+        for key, text, embedding, intent in zip(missing, texts, embeddings, intents):
+            analysis = {'embedding': embedding, 'intent': intent, 'entities': self.extract_entities(text)}
+            self.analysis_cache.put(key, analysis)
+            fresh[key] = analysis
+        return [a if a is not None else fresh[k] for k, a in zip(keys, found)]
+
+    def classify_intents(self, messages: List[str], threshold: float = 0.2) -> List[str]:
+        """Classify several messages with a single encode call and one matrix product"""
+        return [a['intent'] for a in self.analyze_messages(messages, threshold)]
+
     def classify_intent(self, message: str, threshold: float = 0.2) -> str:
         """Classify the intent of a message using semantic similarity"""
-        if not self.intent_embeddings is not None:
-            return "default"
+        return self.classify_intents([message], threshold)[0]
 
-        # Preprocess the message
-        processed_message = self.preprocess_text(message)
-
-        # Encode the message
-        message_embedding = self.model.encode([processed_message])
-
-        # Calculate similarities
-        similarities = cosine_similarity(message_embedding, self.intent_embeddings)[0]
-
-        # Find the best match
-        best_idx = np.argmax(similarities)
-        best_similarity = similarities[best_idx]
-
-        if best_similarity >= threshold:
-            return self.intent_map[best_idx]
-        else:
-            return "default"
+    def _fragment(self, kind: str, key: tuple, compute):
+        """Deterministic response part (depends only on the fruit database), memoized"""
+        value = self.fragment_cache.get((kind,) + key)
+        if value is None:
+            value = compute()
+            self.fragment_cache.put((kind,) + key, value)
+        return value
 
     def extract_entities(self, message: str) -> Dict[str, Any]:
-        """Extract comprehensive entities from the message"""
-        entities = {
-            'diseases': [],
-            'fruits': [],
-            'conditions': [],
-            'quantities': [],
-            'seasons': [],
-            'cooking_methods': [],
-            'allergens': [],
-            'origins': [],
-            'comparisons': []
-        }
-
-        message_lower = message.lower()
-
-        # Enhanced diseases/health conditions
-        diseases = [
-            'diabetes', 'diabetic', 'blood sugar', 'high blood pressure', 'hypertension',
-            'heart disease', 'cholesterol', 'weight loss', 'obesity', 'cancer',
-            'immune system', 'digestion', 'constipation', 'inflammation', 'arthritis',
-            'bone health', 'anemia', 'thyroid', 'kidney', 'liver', 'asthma', 'depression',
-            'memory', 'brain health', 'skin health', 'hair health', 'eyesight', 'vision',
-            'blood pressure', 'high cholesterol', 'heart health', 'digestive health'
-        ]
-
-        for disease in diseases:
-            if disease in message_lower:
-                entities['diseases'].append(disease)
-
-        # Fruit names (from database) - improved matching
-        if self.fruit_database:
-            for fruit in self.fruit_database.keys():
-                fruit_lower = fruit.lower()
-                # Check exact match
-                if fruit_lower in message_lower:
-                    entities['fruits'].append(fruit)
-                # Check singular/plural variations
-                elif fruit_lower.endswith('s') and fruit_lower[:-1] in message_lower:
-                    entities['fruits'].append(fruit)
-                elif fruit_lower + 's' in message_lower:
-                    entities['fruits'].append(fruit)
-                # Check partial matches for common fruits
-                elif len(fruit_lower) > 4 and fruit_lower[:-1] in message_lower:  # Remove last char
-                    entities['fruits'].append(fruit)
-
-        # Quantity-related keywords
-        quantity_keywords = ['how much', 'how many', 'quantity', 'amount', 'serving', 'portion', 'daily']
-        for keyword in quantity_keywords:
-            if keyword in message_lower:
-                entities['quantities'].append(keyword)
-
-        # Seasonal keywords
-        season_keywords = ['season', 'available', 'fresh', 'when', 'time', 'month']
-        for keyword in season_keywords:
-            if keyword in message_lower:
-                entities['seasons'].append(keyword)
-
-        # Cooking/recipe keywords
-        cooking_keywords = ['recipe', 'cook', 'prepare', 'salad', 'smoothie', 'juice', 'bake', 'grill']
-        for keyword in cooking_keywords:
-            if keyword in message_lower:
-                entities['cooking_methods'].append(keyword)
-
-        # Allergy keywords
-        allergy_keywords = ['allergic', 'allergy', 'intolerant', 'sensitive', 'reaction']
-        for keyword in allergy_keywords:
-            if keyword in message_lower:
-                entities['allergens'].append(keyword)
-
-        # Origin/geography keywords
-        origin_keywords = ['where', 'from', 'origin', 'country', 'grown', 'cultivated']
-        for keyword in origin_keywords:
-            if keyword in message_lower:
-                entities['origins'].append(keyword)
-
-        # Comparison keywords
-        comparison_keywords = ['vs', 'versus', 'better', 'compare', 'difference', 'which']
-        for keyword in comparison_keywords:
-            if keyword in message_lower:
-                entities['comparisons'].append(keyword)
-
-        return entities
+        """Extract diseases, fruits and keyword entities in one pass over the message"""
+        if self.entity_matcher is None:
+            # no database loaded: diseases and keywords only
+            self.entity_matcher = EntityMatcher(self.fruit_database or ())
+        return self.entity_matcher.extract(message)
 
     def recommend_fruits_for_condition(self, condition: str) -> List[str]:
         """Recommend fruits based on health condition"""
@@ -458,13 +456,18 @@ class FruitopiaChatbot:
 
         return ' '.join(info_parts) if info_parts else f"{fruit_name} is a healthy fruit with many nutritional benefits!"
 
-    def generate_response(self, message: str) -> str:
-        """Generate a comprehensive response to the user's message"""
-        # Classify intent
-        intent = self.classify_intent(message)
+    def generate_responses(self, messages: List[str]) -> List[tuple]:
+        """(intent, response) for each message; intents are classified in one batch"""
+        analyses = self.analyze_messages(messages)
+        return [(a['intent'], self.generate_response(message, a)) for message, a in zip(messages, analyses)]
 
-        # Extract entities
-        entities = self.extract_entities(message)
+    def generate_response(self, message: str, analysis: Optional[Dict[str, Any]] = None) -> str:
+        """Generate a comprehensive response to the user's message"""
+        # Classify intent and extract entities (memoized; generate_responses batches this)
+        if analysis is None:
+            analysis = self.analyze_messages([message])[0]
+        intent = analysis['intent']
+        entities = analysis['entities']
 
         # Generate response based on intent
         if intent == "greet":
@@ -476,7 +479,7 @@ class FruitopiaChatbot:
         elif intent == "recommend_fruits":
             if entities['diseases']:
                 condition = entities['diseases'][0]
-                fruits = self.recommend_fruits_for_condition(condition)
+                fruits = self._fragment('recommend', (condition,), lambda: self.recommend_fruits_for_condition(condition))
                 response_template = np.random.choice(self.responses.get("recommend_fruits", ["I recommend: {fruits}"]))
                 return response_template.format(fruits=", ".join(fruits))
             else:
@@ -487,7 +490,7 @@ class FruitopiaChatbot:
         elif intent == "fruit_info":
             if entities['fruits']:
                 fruit = entities['fruits'][0]
-                info = self.get_fruit_info(fruit)
+                info = self._fragment('fruit_info', (fruit,), lambda: self.get_fruit_info(fruit))
                 response_template = np.random.choice(self.responses.get("fruit_info", ["{info}"]))
                 return response_template.format(fruit=fruit, info=info)
             else:
@@ -532,7 +535,8 @@ class FruitopiaChatbot:
         elif intent == "comparison":
             if len(entities['fruits']) >= 2:
                 fruit1, fruit2 = entities['fruits'][:2]
-                comparison = self.compare_fruits(fruit1, fruit2)
+                comparison = self._fragment('compare', (fruit1, fruit2),
+                                            lambda: self.compare_fruits(fruit1, fruit2))
                 response_template = np.random.choice(self.responses.get("comparison", ["{comparison}"]))
                 return response_template.format(fruit1=fruit1, fruit2=fruit2, comparison=comparison)
             else:
@@ -569,12 +573,12 @@ class FruitopiaChatbot:
             # Fallback: Check for any entities and respond accordingly
             if entities['fruits']:
                 fruit = entities['fruits'][0]
-                info = self.get_fruit_info(fruit)
+                info = self._fragment('fruit_info', (fruit,), lambda: self.get_fruit_info(fruit))
                 return f"Let me tell you about {fruit}: {info}"
 
             elif entities['diseases']:
                 condition = entities['diseases'][0]
-                fruits = self.recommend_fruits_for_condition(condition)
+                fruits = self._fragment('recommend', (condition,), lambda: self.recommend_fruits_for_condition(condition))
                 return f"For {condition}, I recommend these fruits: {', '.join(fruits)}"
 
             elif entities['quantities']:
@@ -621,7 +625,9 @@ class FruitopiaChatbot:
             self.intents = model_data.get('intents', {})
             self.responses = model_data.get('responses', {})
             self.intent_map = model_data.get('intent_map', [])
-            self.intent_embeddings = model_data.get('intent_embeddings')
+            embeddings = model_data.get('intent_embeddings')
+            # classify_intent expects unit-length rows
+            self.intent_embeddings = normalize_rows(embeddings) if embeddings is not None else None
 
             print(f"Model loaded from {filepath}")
             return True
@@ -751,24 +757,38 @@ class FruitopiaChatbot:
 # Global chatbot instance
 chatbot = None
 
-def initialize_chatbot():
-    """Initialize the chatbot with training data and fruit database"""
+def initialize_chatbot() -> Dict[str, float]:
+    """Initialize the chatbot with training data and fruit database; returns seconds per stage"""
     global chatbot
     if chatbot is None:
         chatbot = FruitopiaChatbot()
+    timings = dict(chatbot.init_timings)
 
     # Load fruit database
+    t0 = time.perf_counter()
     chatbot.load_fruit_database()
+    timings['fruit_database'] = time.perf_counter() - t0
 
     # Load training data
+    t0 = time.perf_counter()
     chatbot.load_training_data()
+    timings['training_data'] = time.perf_counter() - t0
 
     print("Chatbot initialized successfully!")
+    return timings
 
 def get_response(message: str) -> str:
     """Get a response from the chatbot"""
     return chatbot.generate_response(message)
 
+def get_responses(messages: List[str]) -> List[tuple]:
+    """(intent, response) for several messages, encoded together"""
+    return chatbot.generate_responses(messages)
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit-rate metrics of the query and response-fragment memos"""
+    return chatbot.cache_stats() if chatbot is not None else {}
+
 if __name__ == "__main__":
     # Initialize and test the chatbot
     initialize_chatbot()
@@ -0,0 +1,100 @@
+"""Persistent, versioned embedding index for chatbot intent classification.
+
+Encoding every intent example with SentenceTransformer dominated chatbot
+startup. The encoded examples are now stored once per (model name,
+training_data.json content) under data/index/:
+
+  data/index/<model>_<training sha256[:16]>/embeddings.npy   float32 [N, D], rows L2-normalized
+  data/index/<model>_<training sha256[:16]>/meta.json        model, hash, intent_map, dim, version
+
+The matrix is opened memory-mapped, so a fresh index costs no encoding and
+almost no heap. Rows are unit length, so cosine similarity against a
+normalized query is a single matrix-vector product: `embeddings @ query`.
+Bump INDEX_VERSION when preprocessing or the file layout changes.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+
+INDEX_VERSION = 1
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'index')
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """float32 copy of `matrix` with every row scaled to unit L2 norm (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def index_path(model_name: str, training_hash: str, index_dir: str = INDEX_DIR) -> str:
+    safe = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+    return os.path.join(index_dir, f'{safe}_{training_hash[:16]}')
+
+
+def _read_meta(path: str) -> dict:
+    try:
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def load_index(model_name: str, training_hash: str, index_dir: str = INDEX_DIR):
+    """(embeddings memmap, intent_map) if a fresh index exists, else None."""
+    path = index_path(model_name, training_hash, index_dir)
+    meta = _read_meta(path)
+    if (meta.get('version') != INDEX_VERSION or meta.get('model_name') != model_name
+            or meta.get('training_sha256') != training_hash):
+        return None
+    try:
+        embeddings = np.load(os.path.join(path, 'embeddings.npy'), mmap_mode='r')
+    except Exception:
+        return None
+    if embeddings.shape[0] != len(meta.get('intent_map') or []):
+        return None
+    return embeddings, meta['intent_map']
+
+
+def build_index(model_name: str, training_hash: str, embeddings, intent_map: list, index_dir: str = INDEX_DIR):
+    """Normalize and write the index, then reopen it memory-mapped; returns (embeddings, intent_map)."""
+    path = index_path(model_name, training_hash, index_dir)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    matrix = normalize_rows(embeddings)
+    np.save(os.path.join(tmp, 'embeddings.npy'), matrix)
+    meta = {
+        'version': INDEX_VERSION,
+        'model_name': model_name,
+        'training_sha256': training_hash,
+        'count': int(matrix.shape[0]),
+        'dim': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        'intent_map': intent_map,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    # swap the whole directory so a concurrently starting worker never reads half an index
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # another worker won the race; use its copy
+        shutil.rmtree(tmp, ignore_errors=True)
+    return load_index(model_name, training_hash, index_dir) or (matrix, intent_map)
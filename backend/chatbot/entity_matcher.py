@@ -0,0 +1,292 @@
+"""Single-pass entity extraction for chatbot messages.
+
+`extract_entities` used to test every disease term, every fruit name (with four
+spelling variants each) and every keyword with a separate `in` scan. The cost
+grew with the catalogue, and substrings matched inside other words: "apple"
+in "pineapple", "from" in "fromage", "cook" in "cookie". `EntityMatcher`
+compiles all of them into one Aho-Corasick automaton when the fruit database
+loads. A message is then scanned once, whatever the number of patterns, and a
+match only counts if it starts and ends on a word boundary. Fruit names also
+match their singular/plural forms and disease terms their plural; keywords
+only match as written or in the forms listed in `_EXTRA_FORMS`.
+
+Disease synonyms from backend/ml/disease_synonyms.json are folded into one
+condition name that `recommend_fruits_for_condition` understands ("high bp",
+"hypertension" -> "high blood pressure"; "diabetic" -> "diabetes"). Synonyms
+that are not a disease on their own ("sugar") are left out.
+Within a category, a match nested inside a longer one is dropped: "high
+cholesterol" wins over "cholesterol". `extract_entities_linear` keeps the old
+scan as the reference for backend/benchmarks/bench_entities.py.
+"""
+
+import json
+import os
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+SYNONYMS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'ml', 'disease_synonyms.json')
+
+ENTITY_KEYS = ('diseases', 'fruits', 'conditions', 'quantities', 'seasons',
+               'cooking_methods', 'allergens', 'origins', 'comparisons')
+
+DISEASE_TERMS = [
+    'diabetes', 'diabetic', 'blood sugar', 'high blood pressure', 'hypertension',
+    'heart disease', 'cholesterol', 'weight loss', 'obesity', 'cancer',
+    'immune system', 'digestion', 'constipation', 'inflammation', 'arthritis',
+    'bone health', 'anemia', 'thyroid', 'kidney', 'liver', 'asthma', 'depression',
+    'memory', 'brain health', 'skin health', 'hair health', 'eyesight', 'vision',
+    'blood pressure', 'high cholesterol', 'heart health', 'digestive health'
+]
+
+KEYWORDS = {
+    'quantities': ['how much', 'how many', 'quantity', 'amount', 'serving', 'portion', 'daily'],
+    'seasons': ['season', 'available', 'fresh', 'when', 'time', 'month'],
+    'cooking_methods': ['recipe', 'cook', 'prepare', 'salad', 'smoothie', 'juice', 'bake', 'grill'],
+    'allergens': ['allergic', 'allergy', 'intolerant', 'sensitive', 'reaction'],
+    'origins': ['where', 'from', 'origin', 'country', 'grown', 'cultivated'],
+    'comparisons': ['vs', 'versus', 'better', 'compare', 'difference', 'which'],
+}
+
+# keywords are matched as written plus these listed forms (what the old substring
+# scan caught); generated inflections would add non-words like 'v' for 'vs'
+_EXTRA_FORMS = {
+    'serving': ('servings',),
+    'portion': ('portions',),
+    'amount': ('amounts',),
+    'quantity': ('quantities',),
+    'season': ('seasons', 'seasonal', 'seasonally'),
+    'fresh': ('freshness', 'freshly'),
+    'month': ('months',),
+    'recipe': ('recipes',),
+    'cook': ('cooks', 'cooking', 'cooked'),
+    'prepare': ('prepares', 'preparing', 'prepared'),
+    'salad': ('salads',),
+    'smoothie': ('smoothies',),
+    'juice': ('juices', 'juicing', 'juiced'),
+    'bake': ('bakes', 'baking', 'baked'),
+    'grill': ('grills', 'grilling', 'grilled'),
+    'allergy': ('allergies', 'allergen', 'allergens'),
+    'reaction': ('reactions',),
+    'origin': ('origins', 'originate', 'originates', 'originated'),
+    'country': ('countries',),
+    'grown': ('grow', 'grows'),
+    'cultivated': ('cultivate',),
+    'compare': ('compares', 'comparing', 'compared', 'comparison'),
+    'difference': ('differences',),
+}
+
+# synonym groups that are not a condition ("healthy", "wellness") would turn every
+# "which fruits are healthy?" into a condition lookup, so they are not folded in
+_NON_CONDITIONS = {'general'}
+# synonyms that name a nutrient, not a disease: "is there sugar in mango" is not about diabetes
+_NON_DISEASE_SYNONYMS = {'sugar', 'high sugar'}
+# adjective forms the synonyms file does not list
+_EXTRA_SYNONYMS = {'diabetic': 'diabetes'}
+# canonical group name -> the condition term recommend_fruits_for_condition matches on
+CONDITION_TERMS = {'hypertension': 'high blood pressure'}
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: goto/fail/output tables built once, one pass per text."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (pattern length, payload) pairs ending at each state, fail-chain outputs included
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for pattern, payload in patterns:
+            if pattern:
+                self._add(pattern, payload)
+        self._link()
+
+    def __len__(self):
+        return len(self._goto)
+
+    def _add(self, pattern: str, payload: Any):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), payload))
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """(start, end, payload) for every occurrence, overlapping ones included."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i + 1 - length, i + 1, payload
+
+
+def _plural(word: str) -> str:
+    if word.endswith('y') and len(word) > 1 and word[-2] not in 'aeiou':
+        return word[:-1] + 'ies'
+    if word.endswith(('s', 'x', 'ch', 'sh', 'o')):
+        return word + 'es'
+    return word + 's'
+
+
+def _singular(word: str) -> str:
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'xes', 'oes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _noun_forms(term: str) -> set:
+    """term plus singular and plural of its last word: "mangoes" -> {mangoes, mango, mangos}."""
+    head, _, last = term.rpartition(' ')
+    prefix = f'{head} ' if head else ''
+    single = _singular(last)
+    return {term, prefix + single, prefix + _plural(single), prefix + single + 's'}
+
+
+def _disease_forms(term: str) -> set:
+    """term plus the plural of its last word ("kidney" -> kidneys); words already ending in s are left as is.
+
+    Disease terms are written singular or as mass nouns, so they are never
+    singularized ("diabetes" must not yield "diabete").
+    """
+    head, _, last = term.rpartition(' ')
+    if last.endswith('s'):
+        return {term}
+    return {term, (f'{head} ' if head else '') + _plural(last)}
+
+
+def _keyword_forms(term: str) -> set:
+    """The keyword itself plus the forms listed in _EXTRA_FORMS."""
+    return {term} | set(_EXTRA_FORMS.get(term, ()))
+
+
+def load_disease_synonyms(path: str = SYNONYMS_FILE) -> Dict[str, str]:
+    """synonym -> condition term (see CONDITION_TERMS) from disease_synonyms.json; empty if the file is missing."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            groups = json.load(f)
+    except Exception:
+        return {}
+    mapping = {}
+    for canonical, synonyms in groups.items():
+        if canonical in _NON_CONDITIONS:
+            continue
+        term = CONDITION_TERMS.get(canonical, canonical)
+        for synonym in [canonical] + list(synonyms or []):
+            synonym = ' '.join(str(synonym).lower().split())
+            if synonym not in _NON_DISEASE_SYNONYMS:
+                mapping[synonym] = term
+    for synonym, canonical in _EXTRA_SYNONYMS.items():
+        if canonical in mapping:
+            mapping.setdefault(synonym, mapping[canonical])
+    return mapping
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum()
+
+
+class EntityMatcher:
+    """Compiled matcher over disease terms, fruit names and intent keywords."""
+
+    def __init__(self, fruit_names: Iterable[str] = (), synonyms_path: str = SYNONYMS_FILE):
+        self.synonyms = load_disease_synonyms(synonyms_path)
+        patterns: Dict[str, set] = {}
+
+        def add(forms, category, value):
+            for form in forms:
+                patterns.setdefault(form, set()).add((category, value))
+
+        for term in DISEASE_TERMS + list(self.synonyms):
+            add(_disease_forms(term), 'diseases', self.synonyms.get(term, term))
+        self.fruit_names = list(fruit_names)
+        for fruit in self.fruit_names:
+            name = ' '.join(fruit.lower().replace('_', ' ').replace('-', ' ').split())
+            add(_noun_forms(name), 'fruits', fruit)
+        for category, keywords in KEYWORDS.items():
+            for keyword in keywords:
+                add(_keyword_forms(keyword), category, keyword)
+
+        self.pattern_count = len(patterns)
+        self._automaton = AhoCorasick(
+            (pattern, tuple(sorted(payloads))) for pattern, payloads in patterns.items())
+
+    def extract(self, message: str) -> Dict[str, List[str]]:
+        """Same keys as FruitopiaChatbot.extract_entities; values in order of first appearance."""
+        text = ' '.join((message or '').lower().split())
+        n = len(text)
+        spans: Dict[str, List[Tuple[int, int, str]]] = {}
+        for start, end, payloads in self._automaton.finditer(text):
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end < n and _is_word_char(text[end]):
+                continue
+            for category, value in payloads:
+                spans.setdefault(category, []).append((start, end, value))
+
+        entities = {key: [] for key in ENTITY_KEYS}
+        for category, found in spans.items():
+            # longest first, so a nested match ("cholesterol" in "high cholesterol") is dropped
+            found.sort(key=lambda s: (s[0] - s[1], s[0]))
+            kept = []
+            for start, end, value in found:
+                if not any(ks <= start and end <= ke for ks, ke, _ in kept):
+                    kept.append((start, end, value))
+            kept.sort()
+            values = entities[category]
+            for _, _, value in kept:
+                if value not in values:
+                    values.append(value)
+        return entities
+
+
+def extract_entities_linear(message: str, fruit_names: Iterable[str] = ()) -> Dict[str, List[str]]:
+    """The previous per-term substring scan, kept as the benchmark reference."""
+    entities = {key: [] for key in ENTITY_KEYS}
+    message_lower = message.lower()
+
+    for disease in DISEASE_TERMS:
+        if disease in message_lower:
+            entities['diseases'].append(disease)
+
+    for fruit in fruit_names:
+        fruit_lower = fruit.lower()
+        if fruit_lower in message_lower:
+            entities['fruits'].append(fruit)
+        elif fruit_lower.endswith('s') and fruit_lower[:-1] in message_lower:
+            entities['fruits'].append(fruit)
+        elif fruit_lower + 's' in message_lower:
+            entities['fruits'].append(fruit)
+        elif len(fruit_lower) > 4 and fruit_lower[:-1] in message_lower:
+            entities['fruits'].append(fruit)
+
+    for category, keywords in KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in message_lower:
+                entities[category].append(keyword)
+
+    return entities
@@ -0,0 +1,69 @@
+"""Bounded LRU memo for repeated chatbot queries.
+
+Chat traffic is very repetitive ("hello", "tell me about apples"), so the
+chatbot keeps the embedding, intent and entities of recent messages keyed on
+the normalized text (`normalize_query`), plus the deterministic response
+fragments built from the fruit database (fruit info, recommendations,
+comparisons). Only the random template choice is redone on every message.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+def normalize_query(message: str) -> str:
+    """Lowercase, collapse whitespace and drop leading/trailing punctuation: "Hello! " -> "hello"."""
+    return ' '.join((message or '').lower().split()).strip(' ?!.,;:')
+
+
+class LRUCache:
+    """Thread-safe bounded LRU with hit/miss/eviction counters; max_entries=0 disables it."""
+
+    def __init__(self, max_entries: int = 1024, name: str = 'cache'):
+        self.max_entries = max(0, int(max_entries))
+        self.name = name
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0 or value is None:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -47,38 +47,32 @@ async def vision_identify(image: UploadFile = File(...)):
     return {"fruit": fruit_name}
 
 # --- Chatbot Endpoint ---
+import asyncio
+import time
 import requests
 from uuid import uuid4
-# Add chatbot directory to path
+from fastapi import HTTPException
+# Add chatbot directory to path (and backend/ itself for utils.batching)
 sys.path.append(os.path.join(backend_dir, 'chatbot'))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+# The custom chatbot loads on a background thread at startup (chatbot_service.py);
+# messages that arrive before it is ready get a quick rule-based reply.
+from chatbot_service import get_service as get_chatbot_service  # type: ignore  # noqa: E402
+
+
+@app.on_event('startup')
+def _startup_chatbot():
+    if os.environ.get('CHATBOT_EAGER_INIT', '1') != '0':
+        get_chatbot_service().start()
 
-# Initialize the custom chatbot on startup
-chatbot_initialized = False
-initialize_chatbot_func = None
-get_response_func = None
-
-def init_chatbot():
-    global chatbot_initialized, get_response_func
-    if not chatbot_initialized:
-        try:
-            from custom_chatbot import initialize_chatbot as init_func, get_response as response_func  # type: ignore
-            init_func()
-            get_response_func = response_func
-            chatbot_initialized = True
-            print("Chatbot initialized successfully")
-        except Exception as e:
-            print(f"Chatbot initialization failed: {e}")
-            get_response_func = lambda msg: "I'm sorry, I'm having trouble processing your request right now."
 
 # In-memory session storage (for demo; use Redis/DB in production)
 chat_sessions = {}
 
 @app.post("/chatbot/message")
-def chatbot_message(message: str = Body(..., embed=True), session_id: Optional[str] = Body(None, embed=True)):
-    # Initialize chatbot if not already done
-    if not chatbot_initialized:
-        init_chatbot()
-        
+async def chatbot_message(message: str = Body(..., embed=True), session_id: Optional[str] = Body(None, embed=True)):
     if not session_id:
         session_id = str(uuid4())
 
@@ -86,14 +80,47 @@ def chatbot_message(message: str = Body(..., embed=True), session_id: Optional[s
     if session_id not in chat_sessions:
         chat_sessions[session_id] = {"history": []}
 
-    # Get response from custom chatbot
-    try:
-        bot_response = get_response_func(message)
-    except Exception as e:
-        print(f"Chatbot error: {e}")
-        bot_response = "I'm sorry, I'm having trouble processing your request right now."
+    # Get response from custom chatbot: concurrent messages are encoded in one batch
+    # (rule-based fallback while it is still loading)
+    result = await get_chatbot_service().respond_async(message)
+    bot_response, source = result["response"], result["source"]
 
     # Update session history
     chat_sessions[session_id]["history"].append({"user": message, "bot": bot_response})
 
-    return {"response": bot_response, "session_id": session_id}
+    return {"response": bot_response, "session_id": session_id, "source": source}
+
+
+@app.post("/chatbot/messages")
+async def chatbot_messages(messages: List[str] = Body(..., embed=True), wait: bool = Body(True, embed=True)):
+    """Bulk replay (e.g. FAQ regression runs): replies and intents for many messages, encoded in chunks.
+
+    With wait=true (default) the call waits for the chatbot to finish loading
+    (up to CHATBOT_BULK_WAIT_SECONDS) instead of answering from the fallback.
+    """
+    service = get_chatbot_service()
+    max_messages = int(os.environ.get('CHATBOT_BULK_MAX', '10000'))
+    if len(messages) > max_messages:
+        raise HTTPException(status_code=413, detail=f"at most {max_messages} messages per request")
+    loop = asyncio.get_running_loop()
+    if wait and not service.ready:
+        service.start()
+        await loop.run_in_executor(None, service.wait, float(os.environ.get('CHATBOT_BULK_WAIT_SECONDS', '120')))
+    t0 = time.perf_counter()
+    results = await loop.run_in_executor(None, service.respond_bulk, messages)
+    return {
+        "results": [dict(message=m, **r) for m, r in zip(messages, results)],
+        "count": len(results),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+    }
+
+
+@app.on_event('shutdown')
+def _shutdown_chatbot():
+    get_chatbot_service().close()
+
+
+@app.get("/chatbot/health")
+def chatbot_health():
+    """Chatbot readiness, seconds per initialization stage and model/fallback reply counts."""
+    return get_chatbot_service().health()
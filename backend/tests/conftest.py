@@ -0,0 +1,9 @@
+"""Put backend/ and backend/chatbot/ on sys.path the way main.py and vision_api.py do."""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+for path in (BACKEND_DIR, BACKEND_DIR / 'chatbot'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
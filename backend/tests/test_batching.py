@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.batching import MicroBatcher
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_results_follow_submission_order():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(fn, max_batch_size=8, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    try:
+        assert _run(main()) == [0, 10, 20, 30, 40]
+    finally:
+        batcher.close()
+    # all five arrived inside one wait window, so they shared one call
+    assert calls == [[0, 1, 2, 3, 4]]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    sizes = []
+
+    def fn(items):
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(fn, max_batch_size=3, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+
+    try:
+        assert _run(main()) == list(range(7))
+    finally:
+        batcher.close()
+    assert max(sizes) <= 3
+    assert sum(sizes) == 7
+    assert batcher.stats()['batches'] == len(sizes)
+
+
+def test_fn_error_reaches_every_caller_in_the_batch():
+    def fn(items):
+        raise ValueError('boom')
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    try:
+        results = _run(main())
+    finally:
+        batcher.close()
+    assert all(isinstance(r, ValueError) for r in results)
+    assert batcher.stats()['errors'] == 1
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(2)), return_exceptions=True)
+
+    try:
+        results = _run(main())
+    finally:
+        batcher.close()
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_batcher_keeps_serving_after_an_error():
+    def fn(items):
+        if 'bad' in items:
+            raise ValueError('bad item')
+        return items
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=1)
+
+    async def main():
+        with pytest.raises(ValueError):
+            await batcher.submit('bad')
+        return await batcher.submit('good')
+
+    try:
+        assert _run(main()) == 'good'
+    finally:
+        batcher.close()
+
+
+def test_single_request_is_flushed_after_max_wait():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=64, max_wait_ms=30)
+
+    async def main():
+        t0 = time.perf_counter()
+        result = await batcher.submit('only')
+        return result, time.perf_counter() - t0
+
+    try:
+        result, elapsed = _run(main())
+    finally:
+        batcher.close()
+    assert result == 'only'
+    # a lone item waits out the window instead of waiting for a full batch
+    assert 0.025 <= elapsed < 1.0
+
+
+def test_full_batch_does_not_wait_for_the_window():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=2, max_wait_ms=5000)
+
+    async def main():
+        t0 = time.perf_counter()
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2))
+        return results, time.perf_counter() - t0
+
+    try:
+        results, elapsed = _run(main())
+    finally:
+        batcher.close()
+    assert results == [1, 2]
+    assert elapsed < 1.0
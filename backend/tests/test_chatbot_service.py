@@ -0,0 +1,53 @@
+import threading
+
+from chatbot_service import ERROR_RESPONSE, ChatbotService
+
+
+def _ready_service(respond_many):
+    service = ChatbotService()
+    service._respond_many = respond_many
+    service.state = 'ready'
+    return service
+
+
+def test_respond_many_answers_every_message_from_the_model():
+    service = _ready_service(lambda msgs: [('echo', m.upper()) for m in msgs])
+    out = service.respond_many(['a', 'b'])
+    assert out == [{'response': 'A', 'source': 'model', 'intent': 'echo'},
+                   {'response': 'B', 'source': 'model', 'intent': 'echo'}]
+    assert service.model_responses == 2
+
+
+def test_one_failing_message_does_not_fail_its_batch():
+    calls = []
+
+    def respond_many(msgs):
+        calls.append(list(msgs))
+        if 'boom' in msgs:
+            raise RuntimeError('encoder failed')
+        return [('echo', m) for m in msgs]
+
+    service = _ready_service(respond_many)
+    out = service.respond_many(['a', 'boom', 'c'])
+    assert [o['source'] for o in out] == ['model', 'error', 'model']
+    assert [o['response'] for o in out] == ['a', ERROR_RESPONSE, 'c']
+    assert calls == [['a', 'boom', 'c'], ['a'], ['boom'], ['c']]
+    assert service.model_responses == 2
+
+
+def test_not_ready_uses_the_fallback_without_blocking():
+    service = ChatbotService()
+    service.start = lambda: False
+    out = service.respond_many(['hello there'])
+    assert out[0]['source'] == 'fallback'
+    assert service.fallback_responses == 1
+
+
+def test_counters_are_not_lost_under_concurrency():
+    service = _ready_service(lambda msgs: [('echo', m) for m in msgs])
+    threads = [threading.Thread(target=lambda: [service.respond('hi') for _ in range(500)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert service.model_responses == 4000
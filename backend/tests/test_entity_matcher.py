@@ -0,0 +1,61 @@
+from entity_matcher import EntityMatcher, load_disease_synonyms
+
+FRUITS = ['apple', 'pineapple', 'mango', 'passion fruit']
+
+
+def _matcher():
+    return EntityMatcher(FRUITS)
+
+
+def test_blood_pressure_phrasings_fold_to_one_recommendable_term():
+    matcher = _matcher()
+    for message in ('I have high blood pressure', 'fruits for high bp?', 'I was diagnosed with hypertension'):
+        assert matcher.extract(message)['diseases'] == ['high blood pressure'], message
+
+
+def test_diabetic_folds_into_diabetes():
+    matcher = _matcher()
+    assert matcher.extract('I am diabetic, can I eat mango?')['diseases'] == ['diabetes']
+    assert matcher.extract('fruits for high blood sugar')['diseases'] == ['diabetes']
+
+
+def test_sugar_alone_is_not_a_disease():
+    entities = _matcher().extract('is there sugar in mango')
+    assert entities['diseases'] == []
+    assert entities['fruits'] == ['mango']
+
+
+def test_fruit_names_match_on_word_boundaries():
+    entities = _matcher().extract('Is pineapple better than apples?')
+    assert entities['fruits'] == ['pineapple', 'apple']
+    assert _matcher().extract('I like passion fruits')['fruits'] == ['passion fruit']
+
+
+def test_nested_disease_match_is_dropped():
+    assert _matcher().extract('what helps with high cholesterol')['diseases'] == ['high cholesterol']
+
+
+def test_keywords_ignore_words_that_merely_contain_them():
+    entities = _matcher().extract('tell me about cookies and fromage')
+    assert entities['cooking_methods'] == []
+    assert entities['origins'] == []
+    assert _matcher().extract('where is mango grown')['origins'] == ['where', 'grown']
+
+
+def test_missing_synonyms_file_disables_folding(tmp_path):
+    assert load_disease_synonyms(str(tmp_path / 'missing.json')) == {}
+    matcher = EntityMatcher(FRUITS, synonyms_path=str(tmp_path / 'missing.json'))
+    assert matcher.extract('I have hypertension')['diseases'] == ['hypertension']
+
+
+def test_keywords_get_no_generated_forms():
+    matcher = _matcher()
+    assert matcher.extract('apple v banana')['comparisons'] == []
+    assert matcher.extract('apple vs banana')['comparisons'] == ['vs']
+    assert matcher.extract('any recipes for baking mango?')['cooking_methods'] == ['recipe', 'bake']
+
+
+def test_disease_terms_are_not_singularized():
+    matcher = _matcher()
+    assert matcher.extract('diabete')['diseases'] == []
+    assert matcher.extract('fruits for healthy kidneys')['diseases'] == ['kidney']
@@ -0,0 +1,45 @@
+import vision.model_registry as model_registry
+from vision.model_registry import ModelRegistry
+
+
+class _FakeModel:
+    pass
+
+
+def _fake_loader(calls, fail_first=False):
+    def load_model(model_dir, variant, shared_weights):
+        calls.append(variant)
+        if fail_first and len(calls) == 1:
+            raise RuntimeError('truncated checkpoint')
+        return _FakeModel(), ['apple', 'banana'], 'eager', 224
+    return load_model
+
+
+def test_watcher_performs_the_first_load(tmp_path, monkeypatch):
+    calls, activated = [], []
+    monkeypatch.setattr(model_registry, 'load_model', _fake_loader(calls))
+    registry = ModelRegistry(tmp_path, poll_seconds=0, on_activate=activated.append)
+    registry.poll()
+    assert registry.active() is None and calls == []
+
+    (tmp_path / 'fruit_classifier.pt').write_bytes(b'weights')
+    registry.poll()  # first sighting: wait until the file is stable
+    assert registry.active() is None
+    registry.poll()
+    entry = registry.active()
+    assert entry is not None and entry.classes == ['apple', 'banana']
+    assert activated == [entry]
+
+
+def test_failed_checkpoint_is_retried_after_retry_seconds(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(model_registry, 'load_model', _fake_loader(calls, fail_first=True))
+    (tmp_path / 'fruit_classifier.pt').write_bytes(b'weights')
+    registry = ModelRegistry(tmp_path, poll_seconds=0, retry_seconds=60)
+    assert registry.load_now() is None
+    assert registry.last_error == 'truncated checkpoint'
+    assert registry.load_now() is None and len(calls) == 1  # same file, inside the retry window
+
+    registry.retry_seconds = 0
+    assert registry.load_now() is not None
+    assert len(calls) == 2 and registry.last_error is None
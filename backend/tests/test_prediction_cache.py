@@ -0,0 +1,58 @@
+from vision.prediction_cache import PredictionCache, content_key
+
+
+def test_content_key_depends_only_on_bytes():
+    assert content_key(b'abc') == content_key(b'abc')
+    assert content_key(b'abc') != content_key(b'abd')
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PredictionCache(max_entries=2, ttl_seconds=0)
+    cache.set_version('v1')
+    cache.put('a', [1])
+    cache.put('b', [2])
+    assert cache.get('a') == [1]  # 'b' is now the oldest
+    cache.put('c', [3])
+    assert cache.get('b') is None
+    assert cache.get('a') == [1] and cache.get('c') == [3]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    import vision.prediction_cache as pc
+    now = [1000.0]
+    monkeypatch.setattr(pc.time, 'time', lambda: now[0])
+    cache = PredictionCache(max_entries=4, ttl_seconds=10)
+    cache.set_version('v1')
+    cache.put('a', [1])
+    now[0] += 5
+    assert cache.get('a') == [1]
+    now[0] += 11
+    assert cache.get('a') is None
+
+
+def test_version_change_invalidates_and_rejects_stale_puts():
+    cache = PredictionCache(max_entries=4, ttl_seconds=0)
+    cache.set_version('v1')
+    cache.put('a', [1])
+    cache.set_version('v2')
+    assert cache.get('a') is None
+    cache.put('a', [1], version='v1')  # computed by the old model, finished after the swap
+    assert cache.get('a') is None
+    cache.put('a', [2], version='v2')
+    assert cache.get('a') == [2]
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / 'predictions.sqlite')
+    first = PredictionCache(max_entries=4, ttl_seconds=0, disk_path=path)
+    first.set_version('v1')
+    first.put('a', {'label': 'apple'})
+    second = PredictionCache(max_entries=4, ttl_seconds=0, disk_path=path)
+    second.set_version('v1')
+    assert second.get('a') == {'label': 'apple'}
+    assert second.stats()['disk_hits'] == 1
+    third = PredictionCache(max_entries=4, ttl_seconds=0, disk_path=path)
+    third.set_version('v2')
+    assert third.get('a') is None
@@ -0,0 +1,30 @@
+from query_cache import LRUCache, normalize_query
+
+
+def test_normalize_query_folds_case_space_and_edge_punctuation():
+    assert normalize_query('  Hello!  ') == 'hello'
+    assert normalize_query('Tell me   about APPLES?') == 'tell me about apples'
+    assert normalize_query(None) == ''
+
+
+def test_lru_keeps_recently_used_entries():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert len(cache) == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_zero_size_and_none_values_are_not_stored():
+    disabled = LRUCache(max_entries=0)
+    disabled.put('a', 1)
+    assert disabled.get('a') is None
+    cache = LRUCache(max_entries=2)
+    cache.put('a', None)
+    assert len(cache) == 0
+    assert LRUCache().stats()['hit_rate'] is None
@@ -0,0 +1,40 @@
+import io
+import zipfile
+
+import pytest
+
+from vision.uploads import UploadTooLarge, extract_images, is_archive
+
+
+def _zip(members: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_extract_images_skips_non_images():
+    data = _zip({'a.jpg': b'x' * 10, 'notes.txt': b'hi', '.hidden.jpg': b'y', 'dir/b.png': b'z' * 5})
+    assert is_archive(data, 'batch.zip')
+    assert extract_images(data, 'batch.zip', max_members=10, max_bytes=0) == [('a.jpg', b'x' * 10),
+                                                                                ('dir/b.png', b'z' * 5)]
+
+
+def test_extract_images_enforces_total_budget():
+    data = _zip({'a.jpg': b'x' * 60, 'b.jpg': b'y' * 60})
+    with pytest.raises(UploadTooLarge):
+        extract_images(data, 'batch.zip', max_members=10, max_bytes=100)
+
+
+def test_extract_images_enforces_per_image_limit():
+    data = _zip({'small.jpg': b'x' * 10, 'big.jpg': b'y' * 50})
+    with pytest.raises(UploadTooLarge) as exc:
+        extract_images(data, 'batch.zip', max_members=10, max_bytes=0, max_member_bytes=20)
+    assert exc.value.limit == 20
+
+
+def test_extract_images_enforces_member_count():
+    data = _zip({f'{i}.jpg': b'x' for i in range(3)})
+    with pytest.raises(ValueError):
+        extract_images(data, 'batch.zip', max_members=2, max_bytes=0)
@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+pytest.importorskip('fastapi')
+
+import vision.model_registry as model_registry  # noqa: E402
+import vision_api  # noqa: E402
+
+
+def _wait_for(state, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if vision_api._READINESS['state'] == state:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_checkpoint_added_after_a_fallback_boot_is_loaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(vision_api, 'MODEL_DIR', tmp_path)
+    monkeypatch.setattr(vision_api, '_REGISTRY', None)
+    monkeypatch.setattr(vision_api, '_warmup_entry', lambda entry: None)
+    monkeypatch.setattr(model_registry, 'load_model',
+                        lambda model_dir, variant, shared_weights: (object(), ['apple'], 'eager', 224))
+    monkeypatch.setenv('VISION_LOAD_RETRY_SECONDS', '0')
+    monkeypatch.setenv('VISION_MODEL_POLL_SECONDS', '0')
+    vision_api._set_readiness('starting', False)
+
+    assert vision_api._start_model_load()
+    assert _wait_for('fallback')
+    assert vision_api._ensure_model() is None  # starts another retry; let it finish
+    assert _wait_for('fallback')
+
+    (tmp_path / 'fruit_classifier.pt').write_bytes(b'weights')
+    vision_api._ensure_model()  # a request kicks off the retry; it never loads inline
+    assert _wait_for('ready')
+    assert vision_api._ensure_model().classes == ['apple']
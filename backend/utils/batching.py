@@ -0,0 +1,124 @@
+"""Dynamic micro-batching for async request handlers.
+
+Handlers `await batcher.submit(item)`; a single background task gathers queued
+items until either `max_batch_size` items are waiting or `max_wait_ms` has
+elapsed since the first one arrived, then calls `fn(items)` once in a worker
+thread and hands each caller its own result. While a batch is running new
+requests keep queueing, so under load batches grow on their own.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from utils.metrics import Histogram, LatencyStats
+
+logger = logging.getLogger('batching')
+
+
+class MicroBatcher:
+    """Coalesce concurrent `submit()` calls into batched `fn(list) -> list` calls."""
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, name: str = 'batcher',
+                 latency: Optional[LatencyStats] = None):
+        self._fn = fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.latency = latency or LatencyStats()
+        self.batch_sizes = Histogram()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight = 0
+        self._batches = 0
+        self._errors = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        # (re)bind to the running loop; test clients may create a fresh loop per session
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._task = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_started()
+        fut = self._loop.create_future()
+        await self._queue.put((item, fut, time.perf_counter()))
+        return await fut
+
+    async def _collect(self) -> list:
+        first = await self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # drop requests whose callers already went away
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.latency.record('queue_wait', started - enqueued)
+            self.batch_sizes.observe(len(batch))
+            self._in_flight = len(batch)
+            try:
+                results = await loop.run_in_executor(self._executor, self._fn, [entry[0] for entry in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: fn returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                self._errors += 1
+                logger.info(f"{self.name}: batch of {len(batch)} failed: {e}")
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            finally:
+                self._in_flight = 0
+                self._batches += 1
+                self.latency.record('batch_run', time.perf_counter() - started)
+            for (_, fut, _), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    def stats(self) -> dict:
+        return {
+            'name': self.name,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': round(self.max_wait * 1000.0, 3),
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'in_flight': self._in_flight,
+            'batches': self._batches,
+            'errors': self._errors,
+            'batch_size_histogram': self.batch_sizes.snapshot(),
+            'latency': self.latency.snapshot(),
+        }
+
+    def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,94 @@
+"""Small in-process metrics helpers shared by the serving code.
+
+Nothing here depends on a metrics backend; snapshots are plain dicts so they
+can be returned straight from a FastAPI endpoint.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Iterable, List
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    idx = int(round((q / 100.0) * (len(sorted_values) - 1)))
+    idx = max(0, min(idx, len(sorted_values) - 1))
+    return sorted_values[idx]
+
+
+def summarize_ms(samples: Iterable[float]) -> dict:
+    """Summarize latency samples given in seconds as milliseconds."""
+    vals = sorted(samples)
+    if not vals:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'count': len(vals),
+        'mean_ms': round(sum(vals) / len(vals) * 1000.0, 3),
+        'p50_ms': round(percentile(vals, 50) * 1000.0, 3),
+        'p95_ms': round(percentile(vals, 95) * 1000.0, 3),
+        'p99_ms': round(percentile(vals, 99) * 1000.0, 3),
+        'max_ms': round(vals[-1] * 1000.0, 3),
+    }
+
+
+class LatencyStats:
+    """Rolling window of per-stage latency samples (seconds)."""
+
+    def __init__(self, window: int = 2048):
+        self._window = window
+        self._samples: Dict[str, deque] = {}
+        self._totals: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            buf = self._samples.get(stage)
+            if buf is None:
+                buf = self._samples[stage] = deque(maxlen=self._window)
+            buf.append(seconds)
+            self._totals[stage] = self._totals.get(stage, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = {k: list(v) for k, v in self._samples.items()}
+            totals = dict(self._totals)
+        out = {}
+        for stage, vals in items.items():
+            summary = summarize_ms(vals)
+            summary['total'] = totals.get(stage, 0)
+            out[stage] = summary
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+class Histogram:
+    """Counts of discrete values (e.g. batch sizes)."""
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: int):
+        with self._lock:
+            self._counts[value] = self._counts.get(value, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        weighted = sum(k * v for k, v in counts.items())
+        return {
+            'counts': {str(k): counts[k] for k in sorted(counts)},
+            'observations': total,
+            'mean': round(weighted / total, 3) if total else 0.0,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
@@ -0,0 +1,223 @@
+"""Load the fruit classifier for serving, optionally from an exported variant.
+
+ml/export.py writes CPU-serving variants of ml/models/fruit_classifier.pt and
+a manifest (fruit_classifier.variants.json) with the latency it measured for
+each. `load_model(model_dir, variant)` resolves the requested variant:
+
+  eager                                    the fp32 checkpoint (previous behaviour)
+  torchscript | dynamic_int8 | static_int8 | onnx   that artifact if present
+  auto                                     the fastest fresh artifact in the manifest, else eager
+
+An artifact is only used while the manifest's recorded checkpoint size/mtime
+still match the checkpoint, so a retrained model never serves a stale export.
+
+Checkpoints from ml/distill.py also carry 'arch', 'width_mult' and 'img_size'
+(e.g. a MobileNetV3-small student at 160x160). The eager loaders build that
+architecture, and `load_model` also returns the input size the model expects.
+
+With `shared_weights=True` the eager model is served from a weights-only copy
+of the checkpoint (fruit_classifier.shared.pt) that is memory-mapped rather
+than read into the heap. Parameters alias the file's page-cache pages, so every
+worker process on the box shares one physical copy of the weights.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+# variant names, the manifest reader and the variant loader are shared with ml/export.py (ml/variants.py)
+ML_DIR = Path(__file__).resolve().parents[2] / 'ml'
+if str(ML_DIR) not in sys.path:
+    sys.path.append(str(ML_DIR))
+
+from variants import (  # noqa: E402,F401
+    CHECKPOINT_NAME, DEFAULT_IMG_SIZE, MANIFEST_NAME, VARIANT_FILES, OnnxModel, load_variant, read_manifest,
+)
+
+logger = logging.getLogger('vision.model_loader')
+
+SHARED_NAME = 'fruit_classifier.shared.pt'
+CALIBRATION_NAME = 'fruit_classifier.calibration.json'
+
+
+def checkpoint_signature(path: Path):
+    """Cheap change detector for a checkpoint: (size, mtime_ns), or None if missing."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+def file_digest(path: Path, length: int = 16) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:length]
+
+
+def _manifest_is_fresh(manifest: dict, checkpoint: Path) -> bool:
+    src = manifest.get('source') or {}
+    try:
+        st = checkpoint.stat()
+    except OSError:
+        return False
+    return src.get('size') == st.st_size and src.get('mtime_ns') == st.st_mtime_ns
+
+
+def read_temperature(model_dir: Path) -> float:
+    """Softmax temperature fitted by `ml/evaluate.py --fit-temperature`, or 1.0 if absent/stale."""
+    try:
+        with open(model_dir / CALIBRATION_NAME, 'r', encoding='utf-8') as f:
+            calib = json.load(f)
+    except Exception:
+        return 1.0
+    if not _manifest_is_fresh(calib, model_dir / CHECKPOINT_NAME):
+        logger.info('read_temperature: calibration was fitted on a different checkpoint; ignoring it')
+        return 1.0
+    try:
+        t = float(calib.get('temperature', 1.0))
+    except (TypeError, ValueError):
+        return 1.0
+    return t if t > 0 else 1.0
+
+
+def _onnx_available() -> bool:
+    try:
+        import onnxruntime  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def available_variants(model_dir: Path) -> dict:
+    """Fresh exported variants present on disk -> manifest entry."""
+    checkpoint = model_dir / CHECKPOINT_NAME
+    manifest = read_manifest(model_dir)
+    if not manifest or not _manifest_is_fresh(manifest, checkpoint):
+        return {}
+    out = {}
+    for name, entry in (manifest.get('variants') or {}).items():
+        if name == 'eager' or name not in VARIANT_FILES:
+            continue
+        if not (model_dir / VARIANT_FILES[name]).exists():
+            continue
+        if name == 'onnx' and not _onnx_available():
+            continue
+        out[name] = entry
+    return out
+
+
+def select_variant(model_dir: Path, requested: str = 'auto') -> str:
+    requested = (requested or 'auto').strip().lower()
+    if requested == 'eager':
+        return 'eager'
+    variants = available_variants(model_dir)
+    if requested != 'auto':
+        if requested in variants:
+            return requested
+        logger.info(f"select_variant: {requested!r} not available/fresh in {model_dir}; using eager")
+        return 'eager'
+    manifest = read_manifest(model_dir)
+    eager_ms = (((manifest.get('variants') or {}).get('eager') or {}).get('latency_bs1') or {}).get('median_ms')
+    best, best_ms = 'eager', eager_ms if eager_ms is not None else float('inf')
+    for name, entry in variants.items():
+        ms = (entry.get('latency_bs1') or {}).get('median_ms')
+        if ms is not None and ms < best_ms:
+            best, best_ms = name, ms
+    return best
+
+
+ARCH_KEYS = ('arch', 'width_mult', 'img_size')
+
+
+def _build_architecture(data: dict):
+    """Untrained network for the checkpoint's 'arch', built by ml/architectures.py like training does."""
+    from architectures import build_model, checkpoint_spec
+
+    spec = checkpoint_spec(data)
+    return build_model(spec['arch'], len(data.get('classes')), width_mult=spec['width_mult'])
+
+
+def load_eager(checkpoint: Path):
+    """Return (model, classes, img_size) from a training checkpoint."""
+    import torch
+
+    data = torch.load(str(checkpoint), map_location='cpu')
+    classes = data.get('classes')
+    if not classes or 'model_state' not in data:
+        raise ValueError(f'model file {checkpoint} missing required keys')
+    model = _build_architecture(data)
+    model.load_state_dict(data['model_state'])
+    model.eval()
+    return model, classes, int(data.get('img_size', DEFAULT_IMG_SIZE))
+
+
+def ensure_shared_weights(checkpoint: Path) -> Path:
+    """(Re)write the mmap-friendly weights-only copy of `checkpoint` if it is missing or stale."""
+    import torch
+    shared = checkpoint.with_name(SHARED_NAME)
+    sidecar = shared.with_suffix('.json')
+    signature = list(checkpoint_signature(checkpoint) or ())
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            if shared.exists() and json.load(f).get('source_signature') == signature:
+                return shared
+    except Exception:
+        pass
+    data = torch.load(str(checkpoint), map_location='cpu')
+    state = {k: v.contiguous() for k, v in data['model_state'].items()}
+    # write-then-rename so concurrently starting workers never see a partial file
+    tmp = shared.with_name(f'{shared.name}.{os.getpid()}.tmp')
+    torch.save({'model_state': state, 'classes': data.get('classes'),
+                **{k: data[k] for k in ARCH_KEYS if k in data}}, str(tmp))
+    os.replace(tmp, shared)
+    tmp_meta = sidecar.with_name(f'{sidecar.name}.{os.getpid()}.tmp')
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump({'source_signature': signature}, f)
+    os.replace(tmp_meta, sidecar)
+    logger.info(f"ensure_shared_weights: wrote {shared}")
+    return shared
+
+
+def load_shared(checkpoint: Path):
+    """Build the eager model on the meta device and point its parameters at mmap'd storage."""
+    import torch
+
+    shared = ensure_shared_weights(checkpoint)
+    data = torch.load(str(shared), map_location='cpu', mmap=True, weights_only=True)
+    classes = data.get('classes')
+    with torch.device('meta'):
+        model = _build_architecture(data)
+    model.load_state_dict(data['model_state'], assign=True)
+    model.eval()
+    return model, classes, int(data.get('img_size', DEFAULT_IMG_SIZE))
+
+
+def load_model(model_dir: Path, requested: str = 'auto', shared_weights: bool = False):
+    """Return (model, classes, variant_name, img_size); raises if nothing can be loaded."""
+    checkpoint = model_dir / CHECKPOINT_NAME
+    if shared_weights and (requested or 'auto').strip().lower() == 'auto':
+        # exported TorchScript/ONNX artifacts cannot be memory-mapped; share the eager weights
+        requested = 'eager'
+    name = select_variant(model_dir, requested)
+    if name != 'eager':
+        try:
+            model, classes, img_size = load_variant(model_dir, name)
+            if classes:
+                return model, classes, name, img_size
+            logger.info(f"load_model: variant {name} has no class list; using eager")
+        except Exception as e:
+            logger.info(f"load_model: failed to load variant {name} ({e}); using eager")
+    if shared_weights:
+        try:
+            model, classes, img_size = load_shared(checkpoint)
+            return model, classes, 'eager-shared', img_size
+        except Exception as e:
+            logger.info(f"load_model: shared weights unavailable ({e}); loading a private copy")
+    model, classes, img_size = load_eager(checkpoint)
+    return model, classes, 'eager', img_size
@@ -0,0 +1,248 @@
+"""Versioned, hot-reloadable registry for the vision model.
+
+The registry owns every resident model version. A watcher thread polls
+ml/models/fruit_classifier.pt (size/mtime, then content hash). When a new
+checkpoint has been stable for two polls it is loaded and warmed up in the
+background, then swapped in as the active version with a single reference
+assignment. Requests already holding the previous entry finish on it. The
+watcher also performs the first load when no usable checkpoint existed at
+startup, and a checkpoint that failed to load is retried after `retry_seconds`.
+
+Up to `keep` versions stay resident so a canary request can pin an older or
+newer version explicitly, and an optional shadow version can be run next to
+the active one to measure top-1 agreement without affecting responses.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from vision.model_loader import CHECKPOINT_NAME, checkpoint_signature, file_digest, load_model, read_temperature
+
+logger = logging.getLogger('vision.model_registry')
+
+
+class ModelEntry:
+    """One resident model version."""
+
+    def __init__(self, model, classes, variant: str, version: str, signature, load_seconds: float,
+                 img_size: int = 224):
+        self.model = model
+        self.classes = classes
+        self.variant = variant
+        self.version = version
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.requests = 0
+        self.warmup: Optional[dict] = None
+        self.temperature = 1.0
+        self.img_size = img_size
+
+    def describe(self) -> dict:
+        return {
+            'version': self.version,
+            'variant': self.variant,
+            'num_classes': len(self.classes or []),
+            'loaded_at': self.loaded_at,
+            'load_seconds': round(self.load_seconds, 3),
+            'requests': self.requests,
+            'temperature': self.temperature,
+            'img_size': self.img_size,
+            'warmup': self.warmup,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: Path, variant: str = 'auto', keep: int = 2,
+                 poll_seconds: float = 5.0, warmup: Optional[Callable[[ModelEntry], None]] = None,
+                 shadow: bool = False, shared_weights: bool = False, retry_seconds: float = 60.0,
+                 on_activate: Optional[Callable[[ModelEntry], None]] = None):
+        self.model_dir = Path(model_dir)
+        self.checkpoint = self.model_dir / CHECKPOINT_NAME
+        self.variant = variant
+        self.keep = max(1, int(keep))
+        self.poll_seconds = float(poll_seconds)
+        self.shadow_enabled = shadow
+        self.shared_weights = shared_weights
+        self.retry_seconds = float(retry_seconds)
+        self._warmup = warmup
+        self._on_activate = on_activate
+        self._entries: 'OrderedDict[str, ModelEntry]' = OrderedDict()
+        self._active: Optional[ModelEntry] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._pending_signature = None
+        self._failed_signature = None
+        self._failed_at = 0.0
+        self._shadow_executor: Optional[ThreadPoolExecutor] = None
+        self._shadow_stats = {'compared': 0, 'agreed': 0, 'errors': 0}
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+    # --- lookup ---
+    def active(self) -> Optional[ModelEntry]:
+        return self._active
+
+    def get(self, version: str) -> Optional[ModelEntry]:
+        with self._lock:
+            return self._entries.get(version)
+
+    def shadow(self) -> Optional[ModelEntry]:
+        """Most recent resident version other than the active one, if shadowing is on."""
+        if not self.shadow_enabled:
+            return None
+        with self._lock:
+            active = self._active
+            for entry in reversed(self._entries.values()):
+                if entry is not active:
+                    return entry
+        return None
+
+    def versions(self) -> list:
+        with self._lock:
+            active = self._active
+            return [dict(e.describe(), active=e is active) for e in self._entries.values()]
+
+    # --- loading ---
+    def load_now(self) -> Optional[ModelEntry]:
+        """Synchronously load the checkpoint if it is not the active version yet."""
+        signature = checkpoint_signature(self.checkpoint)
+        if signature is None or self._recently_failed(signature):
+            return self._active
+        active = self._active
+        if active is not None and active.signature == signature:
+            return active
+        return self._load(signature)
+
+    def _recently_failed(self, signature) -> bool:
+        return signature == self._failed_signature and time.time() - self._failed_at < self.retry_seconds
+
+    def _load(self, signature) -> Optional[ModelEntry]:
+        with self._load_lock:
+            active = self._active
+            if active is not None and active.signature == signature:
+                return active
+            t0 = time.perf_counter()
+            try:
+                version_hash = file_digest(self.checkpoint)
+                if active is not None and active.version.startswith(version_hash + '-'):
+                    # touched but identical content; just remember the new signature
+                    active.signature = signature
+                    return active
+                model, classes, variant, img_size = load_model(self.model_dir, self.variant, self.shared_weights)
+                entry = ModelEntry(model, classes, variant, f"{version_hash}-{variant}", signature,
+                                   time.perf_counter() - t0, img_size)
+                entry.temperature = read_temperature(self.model_dir)
+                if self._warmup is not None:
+                    self._warmup(entry)
+                entry.load_seconds = time.perf_counter() - t0
+            except Exception as e:
+                self._failed_signature = signature
+                self._failed_at = time.time()
+                self.last_error = str(e)
+                logger.info(f"model registry: failed to load {self.checkpoint} ({e}); keeping current version")
+                return active
+            with self._lock:
+                self._entries[entry.version] = entry
+                self._entries.move_to_end(entry.version)
+                self._active = entry
+                while len(self._entries) > self.keep:
+                    oldest = next(iter(self._entries))
+                    if self._entries[oldest] is entry:
+                        break
+                    del self._entries[oldest]
+            if active is not None:
+                self.reloads += 1
+            self.last_error = None
+            logger.info(f"model registry: active version {entry.version} ({entry.variant}, "
+                        f"loaded in {entry.load_seconds:.2f}s, {len(self._entries)} resident)")
+            if self._on_activate is not None:
+                try:
+                    self._on_activate(entry)
+                except Exception:
+                    logger.exception('model registry: on_activate callback failed')
+            return entry
+
+    # --- watching ---
+    def poll(self):
+        """One watcher step: load a changed checkpoint once its signature is stable."""
+        signature = checkpoint_signature(self.checkpoint)
+        active = self._active
+        if signature is None or (active is not None and active.signature == signature):
+            self._pending_signature = None
+            if active is not None:
+                # a calibration fitted after the model was loaded is picked up here
+                active.temperature = read_temperature(self.model_dir)
+            return
+        if self._recently_failed(signature):
+            return
+        if signature != self._pending_signature:
+            # the file may still be being written; wait for the next poll
+            self._pending_signature = signature
+            return
+        self._pending_signature = None
+        self._load(signature)
+
+    def start_watcher(self):
+        if self.poll_seconds <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.wait(self.poll_seconds):
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception('model registry: watcher error')
+
+        self._watcher = threading.Thread(target=_loop, name='vision-model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._shadow_executor is not None:
+            self._shadow_executor.shutdown(wait=False)
+            self._shadow_executor = None
+
+    # --- shadow comparison ---
+    def submit_shadow(self, run: Callable[[], tuple]):
+        """Run `run()` -> (agreed, compared) off the request path and record the outcome."""
+        if self._shadow_executor is None:
+            self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vision-shadow')
+
+        def _task():
+            try:
+                agreed, compared = run()
+                with self._lock:
+                    self._shadow_stats['compared'] += compared
+                    self._shadow_stats['agreed'] += agreed
+            except Exception:
+                with self._lock:
+                    self._shadow_stats['errors'] += 1
+
+        self._shadow_executor.submit(_task)
+
+    def stats(self) -> dict:
+        active = self._active
+        with self._lock:
+            shadow = dict(self._shadow_stats)
+        if shadow['compared']:
+            shadow['agreement'] = round(shadow['agreed'] / shadow['compared'], 4)
+        return {
+            'active_version': active.version if active else None,
+            'active_variant': active.variant if active else None,
+            'resident': self.versions(),
+            'keep': self.keep,
+            'reloads': self.reloads,
+            'watching': self._watcher is not None and self._watcher.is_alive(),
+            'poll_seconds': self.poll_seconds,
+            'last_error': self.last_error,
+            'shadow': shadow if self.shadow_enabled else None,
+        }
@@ -0,0 +1,143 @@
+"""Prediction cache keyed by a content hash of the uploaded bytes plus model version.
+
+The memory tier is a bounded LRU with a TTL. An optional sqlite file acts as a
+second tier that survives restarts and is shared by workers on the same box.
+Entries written under another model version are never returned, and
+`set_version()` drops them from both tiers when the model changes.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger('vision.prediction_cache')
+
+
+def content_key(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class PredictionCache:
+    """Two-tier (memory LRU/TTL + optional sqlite) cache of JSON-serialisable values."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0, disk_path: Optional[str] = None):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self.version: Optional[str] = None
+        self._mem: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if disk_path:
+            try:
+                self._db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS predictions ('
+                    'key TEXT NOT NULL, version TEXT NOT NULL, created REAL NOT NULL, value TEXT NOT NULL, '
+                    'PRIMARY KEY (key, version))'
+                )
+            except Exception as e:
+                logger.info(f"prediction cache: disk tier disabled ({e})")
+                self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self._db is not None
+
+    def set_version(self, version: Optional[str]):
+        """Switch to a new model version, dropping entries from other versions."""
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                self.invalidations += 1
+                logger.info(f"prediction cache: model version {self.version} -> {version}, invalidating")
+            self.version = version
+            self._mem.clear()
+            if self._db is not None and version is not None:
+                try:
+                    self._db.execute('DELETE FROM predictions WHERE version != ?', (version,))
+                except Exception as e:
+                    logger.info(f"prediction cache: failed to prune disk tier ({e})")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            version = self.version
+            entry = self._mem.get(key)
+            if entry is not None:
+                created, value = entry
+                if self.ttl <= 0 or now - created <= self.ttl:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._mem[key]
+            if self._db is not None and version is not None:
+                row = self._db.execute(
+                    'SELECT created, value FROM predictions WHERE key = ? AND version = ?', (key, version)
+                ).fetchone()
+                if row is not None and (self.ttl <= 0 or now - row[0] <= self.ttl):
+                    value = json.loads(row[1])
+                    self._store_mem(key, row[0], value)
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any, version: Optional[str] = None):
+        """Store `value`; ignored if it was computed under a version that is no longer current."""
+        now = time.time()
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._store_mem(key, now, value)
+            if self._db is not None and self.version is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO predictions (key, version, created, value) VALUES (?, ?, ?, ?)',
+                        (key, self.version, now, json.dumps(value)),
+                    )
+                except Exception as e:
+                    logger.info(f"prediction cache: disk write failed ({e})")
+
+    def _store_mem(self, key: str, created: float, value: Any):
+        if self.max_entries <= 0:
+            return
+        self._mem[key] = (created, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM predictions')
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'version': self.version,
+                'entries': len(self._mem),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'disk_tier': self._db is not None,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,114 @@
+"""Image decode/resize for the vision API, inline or on a process pool.
+
+`decode_resized` uses PIL's `draft()` so large JPEGs are decoded at a reduced
+DCT scale (1/2, 1/4 or 1/8) that is still at least the target size, then
+resized to a uint8 HxWx3 array.
+
+`PreprocessPool` runs that work in worker processes. The parent owns a fixed
+ring of shared-memory slots; a worker decodes into the slot it is given and
+only returns the slot index, so pixel data never goes through pickle.
+"""
+
+import io
+import logging
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger('vision.preprocess')
+
+
+def decode_resized(data: bytes, size: int = 224) -> np.ndarray:
+    """Decode image bytes to a (size, size, 3) uint8 RGB array."""
+    from PIL import Image
+    img = Image.open(io.BytesIO(data))
+    if img.format == 'JPEG':
+        # let libjpeg skip detail we would throw away when resizing anyway
+        img.draft('RGB', (size, size))
+    img = img.convert('RGB')
+    if img.size != (size, size):
+        img = img.resize((size, size), Image.BILINEAR)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def to_chw_tensor(arr: np.ndarray):
+    """uint8 HxWx3 array -> uint8 3xHxW tensor (scaling to float happens per batch)."""
+    import torch
+    return torch.from_numpy(arr).permute(2, 0, 1)
+
+
+# --- worker side ---
+_ATTACHED = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = _ATTACHED.get(name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            # the parent owns the segment; keep the worker's tracker from unlinking it on exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        _ATTACHED[name] = shm
+    return shm
+
+
+def _decode_into(data: bytes, shm_name: str, size: int) -> int:
+    arr = decode_resized(data, size)
+    shm = _attach(shm_name)
+    view = np.ndarray((size, size, 3), dtype=np.uint8, buffer=shm.buf)
+    view[...] = arr
+    del view
+    return size
+
+
+# --- parent side ---
+class PreprocessPool:
+    """Process pool that decodes/resizes uploads into shared-memory slots."""
+
+    def __init__(self, workers: int, size: int = 224, slots: int = 0):
+        self.size = size
+        self.workers = max(1, int(workers))
+        nslots = max(self.workers, int(slots) or self.workers * 2)
+        nbytes = size * size * 3
+        self._slots = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(nslots)]
+        self._free = queue.Queue()
+        for i in range(nslots):
+            self._free.put(i)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+        self._closed = False
+        self._lock = threading.Lock()
+        logger.info(f"preprocess pool: {self.workers} workers, {nslots} shared slots of {nbytes} bytes")
+
+    def preprocess(self, data: bytes):
+        """Blocking: decode `data` in a worker and return a uint8 3xHxW tensor."""
+        slot = self._free.get()
+        try:
+            shm = self._slots[slot]
+            self._executor.submit(_decode_into, data, shm.name, self.size).result()
+            view = np.ndarray((self.size, self.size, 3), dtype=np.uint8, buffer=shm.buf)
+            # copy out so the slot can be reused immediately
+            arr = view.copy()
+            del view
+        finally:
+            self._free.put(slot)
+        return to_chw_tensor(arr)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for shm in self._slots:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
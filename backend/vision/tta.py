@@ -0,0 +1,39 @@
+"""Test-time augmentation views for a preprocessed image.
+
+Every mode returns a [V,3,H,W] stack. The scheduler concatenates the views
+of all queued requests into one forward pass and averages each request's
+logits, so TTA costs extra compute, not extra round trips.
+
+  none        1 view  (the 224x224 resize)
+  flip        2 views (+ horizontal flip)
+  multi_crop  6 views (+ flip + four 87.5% corner crops scaled back up)
+"""
+
+TTA_MODES = ('none', 'flip', 'multi_crop')
+
+
+def num_views(mode: str) -> int:
+    return {'none': 1, 'flip': 2, 'multi_crop': 6}[mode]
+
+
+def tta_views(tensor, mode: str = 'none'):
+    """tensor: [3,H,W] (uint8 or float) -> [V,3,H,W]."""
+    import torch
+    import torch.nn.functional as F
+    if mode == 'none':
+        return tensor.unsqueeze(0)
+    flipped = torch.flip(tensor, dims=[2])
+    if mode == 'flip':
+        return torch.stack([tensor, flipped])
+    if mode != 'multi_crop':
+        raise ValueError(f'unknown tta mode {mode!r}')
+    x = tensor.float().div(255.0) if tensor.dtype == torch.uint8 else tensor
+    _, h, w = x.shape
+    ch, cw = int(h * 0.875), int(w * 0.875)
+    crops = [
+        x[:, :ch, :cw], x[:, :ch, w - cw:],
+        x[:, h - ch:, :cw], x[:, h - ch:, w - cw:],
+    ]
+    crops = F.interpolate(torch.stack(crops), size=(h, w), mode='bilinear', align_corners=False)
+    base = torch.stack([x, torch.flip(x, dims=[2])])
+    return torch.cat([base, crops])
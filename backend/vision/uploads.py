@@ -0,0 +1,124 @@
+"""Helpers for handling image uploads in memory.
+
+Uploads are read in bounded chunks straight into memory and decoded from a
+BytesIO view; a temporary file is only created for helpers that insist on a
+filesystem path (see `spooled_path`).
+"""
+
+import io
+import os
+import tarfile
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Tuple
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff'}
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size cap."""
+
+    def __init__(self, limit: int):
+        super().__init__(f'upload exceeds {limit} bytes')
+        self.limit = limit
+
+
+async def read_upload(upload, max_bytes: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> bytes:
+    """Read an UploadFile into memory, aborting as soon as `max_bytes` is exceeded."""
+    declared = getattr(upload, 'size', None)
+    if declared is not None and max_bytes and declared > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    chunks = []
+    total = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def open_image(data: bytes):
+    """Decode image bytes with PIL without touching the filesystem."""
+    from PIL import Image
+    # BytesIO over an immutable bytes object shares the buffer instead of copying it
+    return Image.open(io.BytesIO(data))
+
+
+@contextmanager
+def spooled_path(data: bytes, filename: str = ''):
+    """Write `data` to a private temp file and yield its path; the file is always removed.
+
+    Only for legacy helpers that take a path. The client-supplied filename is
+    used for its suffix alone, so concurrent uploads never collide.
+    """
+    suffix = Path(filename or '').suffix[:16]
+    fd, path = tempfile.mkstemp(prefix='fruitopia-upload-', suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        yield path
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def is_archive(data: bytes, filename: str = '') -> bool:
+    name = (filename or '').lower()
+    if name.endswith(ARCHIVE_SUFFIXES):
+        return True
+    return data[:4] == b'PK\x03\x04'
+
+
+def extract_images(data: bytes, filename: str, max_members: int, max_bytes: int,
+                   max_member_bytes: int = 0) -> List[Tuple[str, bytes]]:
+    """Return (name, bytes) for image members of a zip/tar archive.
+
+    Non-image members and directories are skipped. Raises UploadTooLarge when
+    the uncompressed images exceed `max_bytes` or a single image exceeds
+    `max_member_bytes` (0 = no per-image limit), and ValueError when there are
+    more than `max_members` images or the archive cannot be read.
+    """
+    out = []
+    total = 0
+
+    def _take(name: str, size: int, read):
+        nonlocal total
+        if Path(name).suffix.lower() not in IMAGE_SUFFIXES or Path(name).name.startswith('.'):
+            return
+        if len(out) >= max_members:
+            raise ValueError(f'archive contains more than {max_members} images')
+        if max_member_bytes and size > max_member_bytes:
+            raise UploadTooLarge(max_member_bytes)
+        total += size
+        if max_bytes and total > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        out.append((name, read()))
+
+    buf = io.BytesIO(data)
+    if zipfile.is_zipfile(buf):
+        with zipfile.ZipFile(buf) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                _take(info.filename, info.file_size, lambda info=info: zf.read(info))
+        return out
+    buf.seek(0)
+    try:
+        with tarfile.open(fileobj=buf, mode='r:*') as tf:
+            for member in tf:
+                if not member.isfile():
+                    continue
+                _take(member.name, member.size, lambda member=member: tf.extractfile(member).read())
+    except tarfile.TarError as e:
+        raise ValueError(f'unreadable archive {filename!r}: {e}')
+    return out
@@ -0,0 +1,73 @@
+"""Model warm-up until latency settles.
+
+Dummy batches are run at every configured batch size, in rounds. After each
+round the p99 of the most recent `window` samples per batch size is compared
+with the p99 of the window before it. Warm-up ends once every batch size is
+within `tolerance` (relative), or after `max_rounds`. `preprocess` runs inside
+the timed call, so the warm-up covers the same per-batch work as serving
+(e.g. resizing 224x224 uploads for a smaller model).
+"""
+
+import logging
+import time
+from typing import Callable, Iterable, Optional
+
+from utils.metrics import percentile
+
+logger = logging.getLogger('vision.warmup')
+
+
+def configure_torch_threads(num_threads: int = 0, interop_threads: int = 0) -> dict:
+    """Pin torch intra/inter-op thread pools (0 leaves the torch default)."""
+    import torch
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # only allowed before the first inter-op parallel work in the process
+            logger.info(f"configure_torch_threads: could not set interop threads ({e})")
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    return {'num_threads': torch.get_num_threads(), 'interop_threads': torch.get_num_interop_threads()}
+
+
+def _p99(samples) -> float:
+    return percentile(sorted(samples), 99)
+
+
+def warm_up(model, batch_sizes: Iterable[int], img_size: int = 224, window: int = 5,
+            tolerance: float = 0.15, max_rounds: int = 40, preprocess: Optional[Callable] = None) -> dict:
+    import torch
+    sizes = sorted({int(b) for b in batch_sizes if int(b) > 0}) or [1]
+    inputs = {b: torch.rand(b, 3, img_size, img_size) for b in sizes}
+    samples = {b: [] for b in sizes}
+    t0 = time.perf_counter()
+    settled = False
+    rounds = 0
+    with torch.no_grad():
+        while rounds < max_rounds:
+            rounds += 1
+            for b in sizes:
+                s = time.perf_counter()
+                model(preprocess(inputs[b]) if preprocess else inputs[b])
+                samples[b].append(time.perf_counter() - s)
+            if rounds < 2 * window:
+                continue
+            settled = True
+            for b in sizes:
+                recent = _p99(samples[b][-window:])
+                previous = _p99(samples[b][-2 * window:-window])
+                if previous <= 0 or abs(recent - previous) / previous > tolerance:
+                    settled = False
+                    break
+            if settled:
+                break
+    result = {
+        'rounds': rounds,
+        'settled': settled,
+        'seconds': round(time.perf_counter() - t0, 3),
+        'p99_ms': {str(b): round(_p99(samples[b][-window:]) * 1000.0, 3) for b in sizes},
+    }
+    if not settled:
+        logger.info(f"warm_up: p99 did not settle within {max_rounds} rounds: {result['p99_ms']}")
+    return result
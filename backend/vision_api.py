@@ -7,21 +7,31 @@ add guarded model loading separately.
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
 import os
 import logging
 import math
 import difflib
 import sys
+import threading
+import time
 from uuid import uuid4
 
 # Add backend directory to Python path for relative imports
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, backend_dir)
 
+from utils.batching import MicroBatcher  # noqa: E402
+from utils.metrics import LatencyStats  # noqa: E402
+from vision.uploads import UploadTooLarge, extract_images, is_archive, read_upload, spooled_path  # noqa: E402
+from vision.prediction_cache import content_key  # noqa: E402
+from vision.tta import TTA_MODES, tta_views  # noqa: E402
+
 FILE_DIR = Path(__file__).resolve().parent  # backend/
 PROJECT_ROOT = FILE_DIR.parent
 # initialize logger early so .env loader can use it
@@ -53,17 +63,56 @@ META_FILE = FILE_DIR / 'ml' / 'metadata.json'
 app = FastAPI(title='Fruitopia - clean backend')
 
 
-@app.on_event('startup')
-def _startup_load_model():
+# Readiness: the model is loaded and warmed up in a background thread at startup
+# so the server binds immediately; /vision/ready answers 503 until it finishes.
+_READINESS = {'state': 'starting', 'ready': False, 'since': time.time(), 'detail': None}
+
+
+def _set_readiness(state: str, ready: bool, detail=None):
+    _READINESS.update({'state': state, 'ready': ready, 'since': time.time(), 'detail': detail})
+
+
+_LOAD_LOCK = threading.Lock()
+
+
+def _background_load_model():
     try:
-        _ensure_model()
-        if _MODEL is not None:
-            logger.info('startup: torch model is loaded and ready')
+        _configure_torch()
+        entry = _ensure_model(block=True)
+        if entry is not None:
+            _set_readiness('ready', True, {'version': entry.version, 'warmup': entry.warmup})
+            logger.info('startup: torch model is loaded, warmed up and ready')
         else:
+            _set_readiness('fallback', True, 'torch model not loaded (will use fallback)')
             logger.info('startup: torch model not loaded (will use fallback)')
-    except Exception:
+    except Exception as e:
+        _set_readiness('failed', False, str(e))
         logger.exception('startup: unexpected error while loading model')
 
+
+def _start_model_load() -> bool:
+    """Start the background load unless one is running or the model is ready; True if it was started.
+
+    A load that failed or found no usable checkpoint ('fallback') is retried at
+    most every VISION_LOAD_RETRY_SECONDS (default 60), so a checkpoint added
+    later is still picked up.
+    """
+    with _LOAD_LOCK:
+        state = _READINESS['state']
+        if state in ('loading', 'warming', 'ready'):
+            return False
+        if state in ('failed', 'fallback') and \
+                time.time() - _READINESS['since'] < _env_float('VISION_LOAD_RETRY_SECONDS', 60.0):
+            return False
+        _set_readiness('loading', False)
+    threading.Thread(target=_background_load_model, name='vision-startup', daemon=True).start()
+    return True
+
+
+@app.on_event('startup')
+def _startup_load_model():
+    _start_model_load()
+
 # Development CORS: allow Angular dev server to call this API
 app.add_middleware(
     CORSMiddleware,
@@ -124,43 +173,318 @@ def _env_flag(key: str) -> bool:
     return False
 
 
-# Lazy model state
-_MODEL = None
-_MODEL_CLASSES = None
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(key: str, default: float) -> float:
+    try:
+        return float(os.environ.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Lazy model state: a registry of resident versions, hot-reloaded from disk
+MODEL_DIR = PROJECT_ROOT / 'ml' / 'models'
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+_TORCH_CONFIGURED = False
 
-def _ensure_model():
-    """Attempt to lazily load a PyTorch model saved by ml/train.py at ml/models/fruit_classifier.pt.
+
+def _configure_torch():
+    """Apply VISION_TORCH_THREADS / VISION_TORCH_INTEROP_THREADS once per process."""
+    global _TORCH_CONFIGURED
+    if _TORCH_CONFIGURED:
+        return
+    _TORCH_CONFIGURED = True
+    try:
+        from vision.warmup import configure_torch_threads
+        threads = configure_torch_threads(_env_int('VISION_TORCH_THREADS', 0), _env_int('VISION_TORCH_INTEROP_THREADS', 0))
+        logger.info(f"torch threads: {threads}")
+    except Exception as e:
+        logger.info(f"_configure_torch: skipped ({e})")
+
+
+def _warmup_batch_sizes() -> list:
+    raw = os.environ.get('VISION_WARMUP_BATCH_SIZES', '')
+    if raw.strip():
+        return [int(x) for x in raw.replace(';', ',').split(',') if x.strip().isdigit()]
+    # default: powers of two up to the scheduler's max batch, plus the max itself
+    max_batch = max(1, _env_int('VISION_MAX_BATCH', 16))
+    sizes, b = [], 1
+    while b < max_batch:
+        sizes.append(b)
+        b *= 2
+    return sizes + [max_batch]
+
+
+def _warmup_entry(entry):
+    """Run dummy batches at every configured batch size until p99 latency settles.
+
+    Used for the first load and for every hot-reloaded version before it is swapped in.
+    Inputs are 224x224 like decoded uploads and go through the same `_resize_batch`
+    as `_run_model_batch`, so a smaller distilled model warms up its resize path too.
+    """
+    from vision.warmup import warm_up
+    if not _READINESS['ready']:
+        _set_readiness('warming', False)
+    entry.warmup = warm_up(
+        entry.model,
+        _warmup_batch_sizes(),
+        img_size=224,
+        preprocess=lambda batch: _resize_batch(batch, entry.img_size),
+        window=_env_int('VISION_WARMUP_WINDOW', 5),
+        tolerance=_env_float('VISION_WARMUP_TOLERANCE', 0.15),
+        max_rounds=_env_int('VISION_WARMUP_MAX_ROUNDS', 40),
+    )
+    logger.info(f"warm-up for {entry.version}: {entry.warmup}")
+
+
+def _get_registry():
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                from vision.model_registry import ModelRegistry
+                _REGISTRY = ModelRegistry(
+                    MODEL_DIR,
+                    variant=os.environ.get('VISION_MODEL_VARIANT', 'auto'),
+                    keep=_env_int('VISION_MODEL_KEEP', 2),
+                    poll_seconds=_env_float('VISION_MODEL_POLL_SECONDS', 5.0),
+                    warmup=_warmup_entry,
+                    shadow=_env_flag('VISION_MODEL_SHADOW'),
+                    shared_weights=_env_flag('VISION_SHARED_WEIGHTS'),
+                    retry_seconds=_env_float('VISION_LOAD_RETRY_SECONDS', 60.0),
+                    on_activate=_on_model_activated,
+                )
+    return _REGISTRY
+
+
+def _on_model_activated(entry):
+    """Registry callback: a version loaded by the watcher (e.g. a checkpoint added after a fallback boot) is ready."""
+    if _READINESS['state'] != 'ready':
+        _set_readiness('ready', True, {'version': entry.version, 'warmup': entry.warmup})
+
+
+def _ensure_model(block: bool = False):
+    """Return the active model entry, loading ml/models/fruit_classifier.pt on first use.
+
+    VISION_MODEL_VARIANT selects an artifact exported by ml/export.py
+    (auto|eager|torchscript|dynamic_int8|static_int8|onnx; default auto = the
+    fastest fresh export, else the eager checkpoint). A watcher thread, started
+    as soon as the registry exists, picks up new checkpoints (including the first
+    one, if none was usable at startup) and swaps them in once warmed up.
+    Request-time callers never load: until a model is active they get None
+    (fallback path), and if no load has run yet (no startup hook, e.g. a bare
+    TestClient) or the last one failed or found no checkpoint, the background
+    load is started instead.
+    Only the startup thread passes block=True and loads inline.
     This function swallows import errors so the server remains usable without torch.
     """
-    global _MODEL, _MODEL_CLASSES
-    if _MODEL is not None:
-        return
     try:
-        model_path = PROJECT_ROOT / 'ml' / 'models' / 'fruit_classifier.pt'
-        if not model_path.exists():
-            logger.info(f"_ensure_model: no model file at {model_path}")
-            return
-        # guarded imports
-        import torch
-        from torchvision import models
-        import torch.nn as nn
-
-        data = torch.load(str(model_path), map_location='cpu')
-        classes = data.get('classes')
-        if not classes or 'model_state' not in data:
-            logger.warning(f"_ensure_model: model file {model_path} missing required keys")
-            return
-        model = models.mobilenet_v2(pretrained=False)
-        model.classifier[1] = nn.Linear(model.last_channel, len(classes))
-        model.load_state_dict(data['model_state'])
-        model.eval()
-        _MODEL = model
-        _MODEL_CLASSES = classes
-        logger.info(f"_ensure_model: loaded model from {model_path} with {len(classes)} classes")
+        registry = _get_registry()
+        registry.start_watcher()
+        entry = registry.active()
+        if entry is None and not block:
+            _start_model_load()
+            return None
+        if entry is None:
+            model_path = MODEL_DIR / 'fruit_classifier.pt'
+            if not model_path.exists():
+                logger.info(f"_ensure_model: no model file at {model_path}")
+                return None
+            entry = registry.load_now()
+        return entry
     except Exception as e:
         logger.info(f"_ensure_model: could not load model ({e}); continuing without torch-model")
-        _MODEL = None
-        _MODEL_CLASSES = None
+        return None
+
+
+# Prediction cache keyed by upload content hash + model version
+_PREDICTION_CACHE = None
+
+
+def _get_prediction_cache():
+    global _PREDICTION_CACHE
+    if _PREDICTION_CACHE is None:
+        from vision.prediction_cache import PredictionCache
+        _PREDICTION_CACHE = PredictionCache(
+            max_entries=_env_int('VISION_CACHE_SIZE', 1024),
+            ttl_seconds=_env_float('VISION_CACHE_TTL', 3600.0),
+            disk_path=os.environ.get('VISION_CACHE_DB') or None,
+        )
+    return _PREDICTION_CACHE
+
+
+def _sync_cache_version(entry):
+    """Point the cache at the serving model version; swapping versions invalidates it."""
+    version = entry.version if entry is not None else None
+    _get_prediction_cache().set_version(version)
+    return version
+
+
+# Inference scheduler: concurrent /vision/predict calls are coalesced into
+# batched forward passes (VISION_MAX_BATCH images or VISION_MAX_WAIT_MS).
+_VISION_LATENCY = LatencyStats()
+_BATCHER: Optional[MicroBatcher] = None
+
+
+def _resize_batch(batch, size: int):
+    """Resize a float [N,3,H,W] batch to size x size (no-op when it already matches)."""
+    if batch.shape[-2:] == (size, size):
+        return batch
+    import torch
+    return torch.nn.functional.interpolate(batch, size=(size, size), mode='bilinear', align_corners=False,
+                                           antialias=True)
+
+
+def _run_model_batch(items: list) -> list:
+    """Run batched forward passes over (views, entry) items; returns (logits, entry) per item.
+
+    `views` is a [V,3,H,W] stack (uint8 or float) from vision.tta; all views of
+    all items run in one forward pass and each item gets its mean logits.
+    Uploads are decoded at 224x224; a model with a smaller input size (a
+    distilled student from ml/distill.py) gets the batch resized on the fly.
+    Items pinned to a model entry run on it; the rest run on whichever version
+    is active when the batch starts, so a concurrent swap never splits a batch.
+    """
+    import torch
+    registry = _get_registry()
+    active = registry.active()
+    groups = {}
+    for i, (views, entry) in enumerate(items):
+        entry = entry or active
+        if entry is None:
+            raise RuntimeError('model not loaded')
+        groups.setdefault(entry.version, (entry, []))[1].append(i)
+    results = [None] * len(items)
+    for entry, idxs in groups.values():
+        parts = [items[i][0] for i in idxs]
+        parts = [v.float().div_(255.0) if v.dtype == torch.uint8 else v for v in parts]
+        batch = torch.cat(parts)
+        batch = _resize_batch(batch, entry.img_size)
+        with torch.no_grad():
+            logits = entry.model(batch)
+        entry.requests += len(idxs)
+        offset = 0
+        for part, i in zip(parts, idxs):
+            n = part.shape[0]
+            results[i] = (logits[offset:offset + n].mean(dim=0), entry)
+            offset += n
+        shadow = registry.shadow() if entry is active else None
+        if shadow is not None:
+            top1 = logits.argmax(dim=1)
+
+            def _compare(shadow=shadow, batch=batch, top1=top1):
+                with torch.no_grad():
+                    other = shadow.model(_resize_batch(batch, shadow.img_size)).argmax(dim=1)
+                return int((other == top1).sum().item()), int(top1.numel())
+
+            registry.submit_shadow(_compare)
+    return results
+
+
+def _get_batcher() -> MicroBatcher:
+    global _BATCHER
+    if _BATCHER is None:
+        _BATCHER = MicroBatcher(
+            _run_model_batch,
+            max_batch_size=_env_int('VISION_MAX_BATCH', 16),
+            max_wait_ms=_env_float('VISION_MAX_WAIT_MS', 5.0),
+            name='vision-infer',
+            latency=_VISION_LATENCY,
+        )
+    return _BATCHER
+
+
+_DECODE_POOL: Optional[ThreadPoolExecutor] = None
+_PREPROCESS_POOL = None
+_PREPROCESS_LOCK = threading.Lock()
+
+
+def _get_preprocess_pool():
+    """Process pool for decode/resize when VISION_PREPROCESS_WORKERS > 0, else None (inline)."""
+    global _PREPROCESS_POOL
+    workers = _env_int('VISION_PREPROCESS_WORKERS', 0)
+    if workers <= 0:
+        return None
+    if _PREPROCESS_POOL is None:
+        with _PREPROCESS_LOCK:
+            if _PREPROCESS_POOL is None:
+                from vision.preprocess import PreprocessPool
+                _PREPROCESS_POOL = PreprocessPool(workers, size=224, slots=_env_int('VISION_PREPROCESS_SLOTS', 0))
+    return _PREPROCESS_POOL
+
+
+def _preprocess_bytes(data: bytes):
+    """Decode uploaded image bytes into a uint8 [3,224,224] tensor.
+
+    Blocking; call it from a worker thread. Float conversion happens once per
+    batch in _run_model_batch.
+    """
+    pool = _get_preprocess_pool()
+    if pool is not None:
+        return pool.preprocess(data)
+    from vision.preprocess import decode_resized, to_chw_tensor
+    return to_chw_tensor(decode_resized(data, 224))
+
+
+def _preprocess_views(data: bytes, tta: str = 'none'):
+    """Decode once and expand into the [V,3,224,224] test-time views for `tta`."""
+    return tta_views(_preprocess_bytes(data), tta)
+
+
+def _topk_predictions(logits, classes, k: int = 3, temperature: float = 1.0) -> list:
+    """Top-k classes from (mean) logits, with temperature-scaled softmax probabilities."""
+    import torch
+    if isinstance(logits, list):
+        logits = torch.tensor(logits)
+    probs = torch.softmax(logits.float() / max(temperature, 1e-6), dim=0)
+    topk = probs.topk(min(k, probs.numel()))
+    preds = []
+    for idx, score in zip(topk.indices.tolist(), topk.values.tolist()):
+        cls_name = classes[idx] if classes and idx < len(classes) else str(idx)
+        preds.append({'class': cls_name, 'score': float(score)})
+    return preds
+
+
+def _get_decode_pool() -> ThreadPoolExecutor:
+    global _DECODE_POOL
+    if _DECODE_POOL is None:
+        workers = _env_int('VISION_DECODE_THREADS', min(4, os.cpu_count() or 1))
+        _DECODE_POOL = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='vision-decode')
+    return _DECODE_POOL
+
+
+@app.on_event('shutdown')
+def _shutdown_batcher():
+    global _BATCHER, _DECODE_POOL, _PREPROCESS_POOL
+    if _BATCHER is not None:
+        _BATCHER.close()
+        _BATCHER = None
+    if _DECODE_POOL is not None:
+        _DECODE_POOL.shutdown(wait=False)
+        _DECODE_POOL = None
+    if _PREPROCESS_POOL is not None:
+        _PREPROCESS_POOL.close()
+        _PREPROCESS_POOL = None
+    if _REGISTRY is not None:
+        _REGISTRY.stop()
+
+
+@app.get('/vision/metrics')
+def vision_metrics():
+    """Scheduler queue depth, batch-size histogram and per-stage latency."""
+    cache = _PREDICTION_CACHE.stats() if _PREDICTION_CACHE is not None else None
+    models = _REGISTRY.stats() if _REGISTRY is not None else None
+    if _BATCHER is None:
+        return {'scheduler': None, 'latency': _VISION_LATENCY.snapshot(), 'cache': cache, 'models': models}
+    return {'scheduler': _BATCHER.stats(), 'cache': cache, 'models': models}
 
 
 @app.get('/recommend/diseases')
@@ -235,12 +559,24 @@ def recommend(payload: dict):
 
 @app.get('/vision/health')
 def vision_health():
-    # report whether the torch model could be loaded (lazy)
-    try:
-        _ensure_model()
-    except Exception:
-        pass
-    return {'ok': True, 'model_loaded': _MODEL is not None}
+    # report whether the torch model could be loaded (lazy) and which version is serving
+    entry = _ensure_model()
+    return {
+        'ok': True,
+        'ready': _READINESS['ready'],
+        'readiness': dict(_READINESS),
+        'model_loaded': entry is not None,
+        'model_variant': entry.variant if entry else None,
+        'model_version': entry.version if entry else None,
+        'models': _REGISTRY.stats() if _REGISTRY is not None else None,
+    }
+
+
+@app.get('/vision/ready')
+def vision_ready():
+    """Load-balancer readiness probe: 200 once the model is warmed up (or fallback is final), else 503."""
+    body = {'ready': _READINESS['ready'], 'state': _READINESS['state']}
+    return JSONResponse(body, status_code=200 if _READINESS['ready'] else 503)
 
 
 @app.get('/vision/classes')
@@ -299,133 +635,287 @@ def vision_image(class_name: str = Query(..., alias='cls'), filename: str = Quer
     return FileResponse(str(fpath))
 
 
+def _identify_fruit_predictions(data: bytes, filename: str) -> list:
+    """Adapter for the path-based identify_fruit helper; spools to a temp file only when reached."""
+    from vision.image_recognition import identify_fruit  # type: ignore
+    with spooled_path(data, filename) as path:
+        res = identify_fruit(path)
+    preds = []
+    if isinstance(res, str):
+        preds = [{'class': res, 'score': 0.9}]
+    elif isinstance(res, list):
+        if res and isinstance(res[0], (list, tuple)):
+            preds = [{'class': r[0], 'score': float(r[1])} for r in res]
+        else:
+            preds = [{'class': r, 'score': 0.9} for r in res]
+    elif isinstance(res, dict):
+        preds = res.get('predictions') or []
+    else:
+        preds = [{'class': str(res), 'score': 0.9}]
+    return preds
+
+
+def _dev_mock_prediction(filename: Optional[str]) -> dict:
+    """BACKEND_FAKE_PREDICT answer: a class picked deterministically from the upload's filename."""
+    fname = filename or 'unknown.jpg'
+    fake_classes = _get_available_classes() or ['apple', 'banana', 'orange']
+    idx = sum(ord(c) for c in fname) % len(fake_classes)
+    return {
+        'predictions': [
+            {'class': fake_classes[idx], 'score': 0.87},
+            {'class': fake_classes[(idx + 1) % len(fake_classes)], 'score': 0.08},
+        ],
+        'source': 'dev-mock',
+    }
+
+
+def _fallback_prediction(data: bytes, filename: str) -> Optional[dict]:
+    """What /vision/predict answers without a torch model: identify_fruit, else the dev mock, else None."""
+    try:
+        return {'predictions': _identify_fruit_predictions(data, filename), 'source': 'local-identify'}
+    except Exception as e:
+        logger.info(f"_fallback_prediction: identify_fruit helper not available or failed: {e}")
+    if _env_flag('BACKEND_FAKE_PREDICT'):
+        return _dev_mock_prediction(filename)
+    return None
+
+
 @app.post('/vision/predict')
-async def predict_stub(file: Optional[UploadFile] = File(None), image: Optional[UploadFile] = File(None)):
+async def predict_stub(file: Optional[UploadFile] = File(None), image: Optional[UploadFile] = File(None),
+                       model_version: Optional[str] = Query(None), k: int = Query(3, ge=1, le=50),
+                       tta: str = Query('none'), calibrate: bool = Query(True)):
     # Accept either 'file' or 'image' as the multipart form field for compatibility
     upload = file or image
     if not upload:
         return JSONResponse({'error': 'no file uploaded; expected form field named "file"'}, status_code=422)
+    tta = (tta or 'none').strip().lower()
+    if tta not in TTA_MODES:
+        return JSONResponse({'error': f'unknown tta mode {tta!r}; expected one of {list(TTA_MODES)}'}, status_code=422)
 
-    # save upload to a temp path
+    # read the upload into memory (bounded), no temp files on the hot path
+    max_bytes = _env_int('VISION_MAX_UPLOAD_MB', 10) * 1024 * 1024
     try:
-        tmp_dir = FILE_DIR / 'tmp'
-        tmp_dir.mkdir(exist_ok=True)
-        tmp_path = tmp_dir / (getattr(upload, 'filename', 'upload.jpg'))
-        with open(tmp_path, 'wb') as f:
-            f.write(await upload.read())
+        data = await read_upload(upload, max_bytes)
+    except UploadTooLarge as e:
+        return JSONResponse({'error': f'uploaded file too large (limit {e.limit} bytes)'}, status_code=413)
     except Exception as e:
-        logger.info(f"predict_stub: failed to save upload: {e}")
-        return JSONResponse({'error': 'failed to save uploaded file'}, status_code=500)
+        logger.info(f"predict_stub: failed to read upload: {e}")
+        return JSONResponse({'error': 'failed to read uploaded file'}, status_code=500)
+    if not data:
+        # frontend dev setups post placeholder uploads and expect the mock answer
+        if _env_flag('BACKEND_FAKE_PREDICT'):
+            return JSONResponse(_dev_mock_prediction(upload.filename))
+        return JSONResponse({'error': 'uploaded file is empty'}, status_code=422)
+    fname = getattr(upload, 'filename', None) or 'upload.jpg'
 
     try:
         # try torch model first (lazy-loaded)
-        _ensure_model()
-        if _MODEL is not None:
+        active = _ensure_model()
+        pinned = None
+        if active is not None and model_version and model_version != active.version:
+            # canary/comparison request against another resident version
+            pinned = _get_registry().get(model_version)
+            if pinned is None:
+                return JSONResponse({'error': f'model version {model_version} is not resident'}, status_code=404)
+        if active is not None:
             try:
-                import torch
-                from torchvision import transforms
-                from PIL import Image
-
-                transform = transforms.Compose([
-                    transforms.Resize((224, 224)),
-                    transforms.ToTensor(),
-                ])
-                img = Image.open(str(tmp_path)).convert('RGB')
-                tensor = transform(img).unsqueeze(0)
-                with torch.no_grad():
-                    outputs = _MODEL(tensor)
-                    probs = torch.softmax(outputs, dim=1).squeeze(0)
-                    topk = torch.topk(probs, k=min(3, probs.numel()))
-                    preds = []
-                    for idx, score in zip(topk.indices.tolist(), topk.values.tolist()):
-                        cls_name = _MODEL_CLASSES[idx] if _MODEL_CLASSES and idx < len(_MODEL_CLASSES) else str(idx)
-                        preds.append({'class': cls_name, 'score': float(score)})
-                try:
-                    tmp_path.unlink()
-                except Exception:
-                    pass
-                return JSONResponse({'predictions': preds, 'source': 'torch-model'})
+                t0 = time.perf_counter()
+                cache = _get_prediction_cache()
+                version = _sync_cache_version(active)
+                # logits are cached per TTA mode; k and temperature are applied after the lookup
+                key = f'{content_key(data)}:{tta}' if cache.enabled and version and pinned is None else None
+                cached = cache.get(key) if key else None
+                if cached is not None:
+                    temperature = active.temperature if calibrate else 1.0
+                    preds = _topk_predictions(cached, active.classes, k, temperature)
+                    elapsed = time.perf_counter() - t0
+                    _VISION_LATENCY.record('total_cached', elapsed)
+                    meta = {'k': k, 'tta': tta, 'views': 0, 'temperature': temperature, 'cached': True,
+                            'timings_ms': {'total': round(elapsed * 1000.0, 3)}}
+                    return JSONResponse({'predictions': preds, 'source': 'torch-model', 'model_version': version,
+                                         'cached': True, 'meta': meta})
+                loop = asyncio.get_running_loop()
+                views = await loop.run_in_executor(_get_decode_pool(), _preprocess_views, data, tta)
+                t1 = time.perf_counter()
+                _VISION_LATENCY.record('preprocess', t1 - t0)
+                logits, entry = await _get_batcher().submit((views, pinned))
+                t2 = time.perf_counter()
+                if key:
+                    cache.put(key, logits.tolist(), version=entry.version)
+                temperature = entry.temperature if calibrate else 1.0
+                preds = _topk_predictions(logits, entry.classes, k, temperature)
+                t3 = time.perf_counter()
+                _VISION_LATENCY.record('total', t3 - t0)
+                meta = {
+                    'k': k, 'tta': tta, 'views': int(views.shape[0]), 'temperature': temperature, 'cached': False,
+                    'timings_ms': {
+                        'preprocess': round((t1 - t0) * 1000.0, 3),
+                        'inference': round((t2 - t1) * 1000.0, 3),
+                        'postprocess': round((t3 - t2) * 1000.0, 3),
+                        'total': round((t3 - t0) * 1000.0, 3),
+                    },
+                }
+                return JSONResponse({'predictions': preds, 'source': 'torch-model', 'model_version': entry.version,
+                                     'meta': meta})
             except Exception as e:
                 logger.info(f"predict_stub: torch inference failed: {e}")
 
-        # fallback: try local helper identify_fruit
-        try:
-            from vision.image_recognition import identify_fruit  # type: ignore
-            res = identify_fruit(str(tmp_path))
-            preds = []
-            if isinstance(res, str):
-                preds = [{'class': res, 'score': 0.9}]
-            elif isinstance(res, list):
-                if res and isinstance(res[0], (list, tuple)):
-                    preds = [{'class': r[0], 'score': float(r[1])} for r in res]
-                else:
-                    preds = [{'class': r, 'score': 0.9} for r in res]
-            elif isinstance(res, dict):
-                preds = res.get('predictions') or []
-            else:
-                preds = [{'class': str(res), 'score': 0.9}]
-            try:
-                tmp_path.unlink()
-            except Exception:
-                pass
-            return JSONResponse({'predictions': preds, 'source': 'local-identify'})
-        except Exception as e:
-            logger.info(f"predict_stub: identify_fruit helper not available or failed: {e}")
-
-        # fallback to dev mock if enabled
-        if _env_flag('BACKEND_FAKE_PREDICT'):
-            fname = getattr(upload, 'filename', None) or 'unknown.jpg'
-            fake_classes = _get_available_classes() or ['apple', 'banana', 'orange']
-            idx = sum(ord(c) for c in fname) % len(fake_classes)
-            fake = {
-                'predictions': [
-                    {'class': fake_classes[idx], 'score': 0.87},
-                    {'class': fake_classes[(idx + 1) % len(fake_classes)], 'score': 0.08},
-                ],
-                'source': 'dev-mock',
-            }
-            try:
-                tmp_path.unlink()
-            except Exception:
-                pass
-            return JSONResponse(fake)
+        # fallback: local helper identify_fruit, then the dev mock if enabled
+        res = _fallback_prediction(data, fname)
+        if res is not None:
+            return JSONResponse(res)
 
         # nothing available
-        try:
-            tmp_path.unlink()
-        except Exception:
-            pass
         return JSONResponse({'error': 'model not available in this environment'}, status_code=501)
     except Exception as e:
         logger.info(f"predict_stub: unexpected error: {e}")
-        try:
-            tmp_path.unlink()
-        except Exception:
-            pass
         return JSONResponse({'error': 'internal error during prediction'}, status_code=500)
 
 
+@app.post('/vision/predict/batch')
+async def predict_batch(files: List[UploadFile] = File(...), k: int = Query(3, ge=1, le=50),
+                        tta: str = Query('none'), calibrate: bool = Query(True)):
+    """Classify many images (or zip/tar archives of images) in one request.
+
+    Images are decoded in parallel on a thread pool and run through the model
+    in batched forward passes; results are streamed back as NDJSON, one line
+    per image, as soon as each chunk finishes, followed by a summary line.
+    `k`, `tta` and `calibrate` behave as on /vision/predict. Until a model is
+    active (e.g. during warm-up) each image gets the same identify/mock fallback
+    as /vision/predict; 501 only if neither is available.
+    """
+    tta = (tta or 'none').strip().lower()
+    if tta not in TTA_MODES:
+        return JSONResponse({'error': f'unknown tta mode {tta!r}; expected one of {list(TTA_MODES)}'}, status_code=422)
+    max_files = _env_int('VISION_BATCH_MAX_FILES', 256)
+    max_total = _env_int('VISION_BATCH_MAX_MB', 200) * 1024 * 1024
+    max_file = _env_int('VISION_MAX_UPLOAD_MB', 10) * 1024 * 1024
+
+    # read everything up front: upload handles are closed once the streaming response starts
+    items = []
+    total = 0
+    try:
+        for upload in files:
+            name = getattr(upload, 'filename', None) or f'upload_{len(items)}'
+            data = await read_upload(upload, max(1, max_total - total) if max_total else 0)
+            if is_archive(data, name):
+                # the archive buffer is dropped after extraction; its images share what is left of the budget
+                members = extract_images(data, name, max_files - len(items),
+                                         max(1, max_total - total) if max_total else 0, max_file)
+                total += sum(len(b) for _, b in members)
+                items.extend((f'{name}/{m}', b) for m, b in members)
+            else:
+                if max_file and len(data) > max_file:
+                    raise UploadTooLarge(max_file)
+                total += len(data)
+                items.append((name, data))
+            if len(items) > max_files:
+                raise ValueError(f'too many images (limit {max_files})')
+    except UploadTooLarge as e:
+        return JSONResponse({'error': f'upload too large (limit {e.limit} bytes)'}, status_code=413)
+    except Exception as e:
+        logger.info(f"predict_batch: failed to read uploads: {e}")
+        return JSONResponse({'error': f'failed to read uploads: {e}'}, status_code=422)
+    if not items:
+        return JSONResponse({'error': 'no images uploaded'}, status_code=422)
+
+    loop = asyncio.get_running_loop()
+    pool = _get_decode_pool()
+    active = _ensure_model()
+    if active is None:
+        first = await loop.run_in_executor(pool, _fallback_prediction, items[0][1], items[0][0])
+        if first is None:
+            return JSONResponse({'error': 'model not available in this environment'}, status_code=501)
+        return StreamingResponse(_stream_fallback(items, first, loop, pool), media_type='application/x-ndjson')
+
+    batcher = _get_batcher()
+    cache = _get_prediction_cache()
+    version = _sync_cache_version(active)
+    use_cache = cache.enabled and version is not None
+    chunk_size = batcher.max_batch_size
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    def _lookup_or_decode(data):
+        # worker thread: the cache lookup can hit the sqlite tier, so it stays off the event loop too
+        key = f'{content_key(data)}:{tta}' if use_cache else None
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            return key, cached, None
+        return key, None, _preprocess_views(data, tta)
+
+    def _decode_chunk(chunk):
+        return [loop.run_in_executor(pool, _lookup_or_decode, data) for _, data in chunk]
+
+    async def _infer_one(pending):
+        key, cached, views = await pending
+        if cached is not None:
+            return cached, active
+        logits, entry = await batcher.submit((views, None))
+        if key:
+            cache.put(key, logits.tolist(), version=entry.version)
+        return logits, entry
+
+    async def _stream():
+        t0 = time.perf_counter()
+        errors = 0
+        index = 0
+        # keep one chunk of decodes in flight ahead of the chunk being inferred
+        pending = _decode_chunk(chunks[0])
+        for ci, chunk in enumerate(chunks):
+            current = pending
+            pending = _decode_chunk(chunks[ci + 1]) if ci + 1 < len(chunks) else None
+            results = await asyncio.gather(*(_infer_one(f) for f in current), return_exceptions=True)
+            lines = []
+            for (name, _), res in zip(chunk, results):
+                if isinstance(res, Exception):
+                    errors += 1
+                    row = {'index': index, 'filename': name, 'error': str(res) or res.__class__.__name__}
+                else:
+                    logits, entry = res
+                    preds = _topk_predictions(logits, entry.classes, k, entry.temperature if calibrate else 1.0)
+                    row = {'index': index, 'filename': name, 'predictions': preds,
+                           'source': 'torch-model', 'model_version': entry.version}
+                lines.append(json.dumps(row))
+                index += 1
+            yield '\n'.join(lines) + '\n'
+        elapsed = time.perf_counter() - t0
+        _VISION_LATENCY.record('batch_request', elapsed)
+        yield json.dumps({'done': True, 'count': index, 'errors': errors, 'elapsed_ms': round(elapsed * 1000.0, 3)}) + '\n'
+
+    return StreamingResponse(_stream(), media_type='application/x-ndjson')
+
+
+async def _stream_fallback(items: list, first: dict, loop, pool):
+    """NDJSON lines for predict_batch while no model is active; `first` is items[0]'s answer."""
+    t0 = time.perf_counter()
+    errors = 0
+    for index, (name, data) in enumerate(items):
+        res = first if index == 0 else await loop.run_in_executor(pool, _fallback_prediction, data, name)
+        if res is None:
+            errors += 1
+            row = {'index': index, 'filename': name, 'error': 'model not available in this environment'}
+        else:
+            row = dict(res, index=index, filename=name)
+        yield json.dumps(row) + '\n'
+    elapsed = time.perf_counter() - t0
+    yield json.dumps({'done': True, 'count': len(items), 'errors': errors,
+                      'elapsed_ms': round(elapsed * 1000.0, 3)}) + '\n'
+
+
 # --- Chatbot Endpoint ---
 # Add chatbot directory to path
 sys.path.append(os.path.join(FILE_DIR, 'chatbot'))
 
-# Initialize the custom chatbot on startup
-chatbot_initialized = False
-initialize_chatbot_func = None
-get_response_func = None
+# The custom chatbot loads on a background thread at startup (chatbot_service.py);
+# messages that arrive before it is ready get a quick rule-based reply.
+from chatbot_service import get_service as get_chatbot_service  # type: ignore  # noqa: E402
+
+
+@app.on_event('startup')
+def _startup_chatbot():
+    if os.environ.get('CHATBOT_EAGER_INIT', '1') != '0':
+        get_chatbot_service().start()
 
-def init_chatbot():
-    global chatbot_initialized, get_response_func
-    if not chatbot_initialized:
-        try:
-            from custom_chatbot import initialize_chatbot as init_func, get_response as response_func  # type: ignore
-            init_func()
-            get_response_func = response_func
-            chatbot_initialized = True
-            logger.info("Chatbot initialized successfully")
-        except Exception as e:
-            logger.error(f"Chatbot initialization failed: {e}")
-            get_response_func = lambda msg: "I'm sorry, I'm having trouble processing your request right now."
 
 # In-memory session storage (for demo; use Redis/DB in production)
 chat_sessions = {}
@@ -560,11 +1050,7 @@ def generate_recipe(
     return recipe
 
 @app.post("/chatbot/message")
-def chatbot_message(message: str = Body(..., embed=True), session_id: Optional[str] = Body(None, embed=True)):
-    # Initialize chatbot if not already done
-    if not chatbot_initialized:
-        init_chatbot()
-        
+async def chatbot_message(message: str = Body(..., embed=True), session_id: Optional[str] = Body(None, embed=True)):
     if not session_id:
         session_id = str(uuid4())
 
@@ -572,14 +1058,47 @@ def chatbot_message(message: str = Body(..., embed=True), session_id: Optional[s
     if session_id not in chat_sessions:
         chat_sessions[session_id] = {"history": []}
 
-    # Get response from custom chatbot
-    try:
-        bot_response = get_response_func(message)
-    except Exception as e:
-        logger.error(f"Chatbot error: {e}")
-        bot_response = "I'm sorry, I'm having trouble processing your request right now."
+    # Get response from custom chatbot: concurrent messages are encoded in one batch
+    # (rule-based fallback while it is still loading)
+    result = await get_chatbot_service().respond_async(message)
+    bot_response, source = result["response"], result["source"]
 
     # Update session history
     chat_sessions[session_id]["history"].append({"user": message, "bot": bot_response})
 
-    return {"response": bot_response, "session_id": session_id}
+    return {"response": bot_response, "session_id": session_id, "source": source}
+
+
+@app.post("/chatbot/messages")
+async def chatbot_messages(messages: List[str] = Body(..., embed=True), wait: bool = Body(True, embed=True)):
+    """Bulk replay (e.g. FAQ regression runs): replies and intents for many messages, encoded in chunks.
+
+    With wait=true (default) the call waits for the chatbot to finish loading
+    (up to CHATBOT_BULK_WAIT_SECONDS) instead of answering from the fallback.
+    """
+    service = get_chatbot_service()
+    max_messages = int(os.environ.get('CHATBOT_BULK_MAX', '10000'))
+    if len(messages) > max_messages:
+        raise HTTPException(status_code=413, detail=f"at most {max_messages} messages per request")
+    loop = asyncio.get_running_loop()
+    if wait and not service.ready:
+        service.start()
+        await loop.run_in_executor(None, service.wait, float(os.environ.get('CHATBOT_BULK_WAIT_SECONDS', '120')))
+    t0 = time.perf_counter()
+    results = await loop.run_in_executor(None, service.respond_bulk, messages)
+    return {
+        "results": [dict(message=m, **r) for m, r in zip(messages, results)],
+        "count": len(results),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+    }
+
+
+@app.on_event('shutdown')
+def _shutdown_chatbot():
+    get_chatbot_service().close()
+
+
+@app.get("/chatbot/health")
+def chatbot_health():
+    """Chatbot readiness, seconds per initialization stage and model/fallback reply counts."""
+    return get_chatbot_service().health()
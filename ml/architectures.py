@@ -0,0 +1,52 @@
+"""Classifier architectures a checkpoint can hold.
+
+Checkpoints written by train.py hold only {'model_state', 'classes'} and are
+MobileNetV2 at 224x224. Checkpoints written by distill.py also record
+'arch', 'width_mult' and 'img_size'. `build_model` and `model_from_checkpoint`
+read those keys (with the MobileNetV2 defaults), so evaluate.py and export.py
+load either kind. backend/vision/model_loader.py builds its serving models
+with them too.
+"""
+import torch
+import torch.nn as nn
+from torchvision import models
+
+DEFAULT_ARCH = 'mobilenet_v2'
+DEFAULT_IMG_SIZE = 224
+ARCHITECTURES = ('mobilenet_v2', 'mobilenet_v3_small', 'mobilenet_v3_large')
+
+
+def build_model(arch: str, num_classes: int, pretrained: bool = False, width_mult: float = 1.0):
+    """`arch` with its last classifier layer replaced by a `num_classes` Linear.
+
+    ImageNet weights only exist for width_mult 1.0; narrower MobileNetV2s start from scratch.
+    """
+    if arch not in ARCHITECTURES:
+        raise ValueError(f'unknown architecture {arch!r} (expected one of {", ".join(ARCHITECTURES)})')
+    if arch == 'mobilenet_v2':
+        pretrained = pretrained and width_mult == 1.0
+        model = models.mobilenet_v2(pretrained=pretrained, width_mult=width_mult)
+    else:
+        model = getattr(models, arch)(pretrained=pretrained)
+    model.classifier[-1] = nn.Linear(model.classifier[-1].in_features, num_classes)
+    return model
+
+
+def checkpoint_spec(data: dict) -> dict:
+    """Architecture keys of a loaded checkpoint dict, defaulting to the train.py model."""
+    return {
+        'arch': data.get('arch', DEFAULT_ARCH),
+        'width_mult': float(data.get('width_mult', 1.0)),
+        'img_size': int(data.get('img_size', DEFAULT_IMG_SIZE)),
+    }
+
+
+def model_from_checkpoint(data: dict):
+    """(eval-mode model, classes, img_size); built on the meta device and adopting the checkpoint tensors."""
+    classes = data.get('classes')
+    spec = checkpoint_spec(data)
+    with torch.device('meta'):
+        model = build_model(spec['arch'], len(classes), width_mult=spec['width_mult'])
+    model.load_state_dict(data['model_state'], assign=True)
+    model.eval()
+    return model, classes, spec['img_size']
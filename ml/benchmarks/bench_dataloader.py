@@ -0,0 +1,101 @@
+"""Images/sec of the training input pipeline: ImageFolder (decode every epoch) vs the shard cache.
+
+Both paths use the same AUGMENT_LEVEL transforms and DataLoader settings.
+The shard build is timed separately (it is a one-time cost), and each mode is
+measured over whole passes of the train split after one warm-up pass.
+
+Usage:
+python ml/benchmarks/bench_dataloader.py
+python ml/benchmarks/bench_dataloader.py --workers 0 2 4 --epochs 2 --json loader.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ML_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ML_DIR))
+
+import torch  # noqa: E402
+from torch.utils.data import DataLoader  # noqa: E402
+from torchvision import datasets, transforms  # noqa: E402
+
+from shards import SPLIT_DIR, ShardDataset, build_shards, tensor_transforms  # noqa: E402
+
+
+def imagefolder_dataset(img_size: int, augment_level: str):
+    # mirrors train.get_dataloaders
+    if augment_level == 'none':
+        tf = transforms.Compose([transforms.Resize((img_size, img_size)), transforms.ToTensor()])
+    elif augment_level == 'strong':
+        tf = transforms.Compose([
+            transforms.RandomResizedCrop(img_size, scale=(0.7, 1.0)),
+            transforms.RandomHorizontalFlip(),
+            transforms.RandomVerticalFlip(),
+            transforms.RandomRotation(20),
+            transforms.ColorJitter(0.2, 0.2, 0.2, 0.1),
+            transforms.ToTensor(),
+        ])
+    else:
+        tf = transforms.Compose([
+            transforms.RandomResizedCrop(img_size, scale=(0.8, 1.0)),
+            transforms.RandomHorizontalFlip(),
+            transforms.ColorJitter(0.1, 0.1, 0.1, 0.05),
+            transforms.ToTensor(),
+        ])
+    return datasets.ImageFolder(SPLIT_DIR / 'train', transform=tf)
+
+
+def measure(ds, batch_size: int, workers: int, epochs: int) -> float:
+    loader = DataLoader(ds, batch_size=batch_size, shuffle=True, num_workers=workers,
+                        persistent_workers=workers > 0)
+    for _ in loader:  # warm-up pass (worker start-up, page cache)
+        pass
+    n = 0
+    t0 = time.perf_counter()
+    for _ in range(epochs):
+        for imgs, _ in loader:
+            n += imgs.shape[0]
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--img-size', type=int, default=224)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--workers', type=int, nargs='*', default=[0, 2])
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--json', default='')
+    args = parser.parse_args()
+    augment_level = os.environ.get('AUGMENT_LEVEL', 'baseline')
+    torch.manual_seed(0)
+
+    t0 = time.perf_counter()
+    shard_dir = build_shards('train', args.img_size)
+    build_seconds = time.perf_counter() - t0
+    print(f"shard cache ready in {build_seconds:.1f}s ({shard_dir})")
+
+    results = []
+    for workers in args.workers:
+        for mode in ('imagefolder', 'shards'):
+            if mode == 'imagefolder':
+                ds = imagefolder_dataset(args.img_size, augment_level)
+            else:
+                ds = ShardDataset(shard_dir, tensor_transforms(augment_level, args.img_size, train=True))
+            ips = measure(ds, args.batch_size, workers, args.epochs)
+            results.append({'mode': mode, 'workers': workers, 'augment_level': augment_level,
+                            'images_per_sec': round(ips, 1)})
+            print(f"{mode:>12} workers={workers}: {ips:8.1f} img/s")
+        base, fast = results[-2]['images_per_sec'], results[-1]['images_per_sec']
+        if base:
+            print(f"{'':>12} speed-up: {fast / base:.2f}x")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'build_seconds': round(build_seconds, 2), 'results': results}, f, indent=2)
+        print(f"Wrote results to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""Knowledge distillation of the fruit classifier into a smaller, faster student.
+
+The teacher (default ml/models/fruit_classifier.best.pt, else
+fruit_classifier.pt) runs once over the train split with the deterministic
+eval transform. Its logits are cached as a memory-mapped .npy:
+
+  data/cache/teacher_logits/train_<teacher digest>/logits.npy   float32 [N, C]
+  data/cache/teacher_logits/train_<teacher digest>/meta.json    classes, sample fingerprint
+
+The cache is reused until the teacher or the files in the split change. The
+student (default MobileNetV3-small at 160x160, see ml/architectures.py) then
+trains on
+
+  alpha * T^2 * KL(softmax(teacher / T) || softmax(student / T)) + (1 - alpha) * CE(student, label)
+
+Because the teacher logits are computed on the un-augmented image, the
+student only gets light augmentation (flip and a mild crop). The best epoch
+by val accuracy is saved to fruit_classifier.student.pt with its 'arch',
+'width_mult' and 'img_size', so evaluate.py, export.py and the backend build
+the right network. `--promote` copies it over fruit_classifier.pt, which the
+backend model registry then hot-reloads.
+
+Usage:
+python ml/distill.py --epochs 10
+python ml/distill.py --arch mobilenet_v2 --width-mult 0.5 --img-size 128 --promote
+python ml/evaluate.py --student
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader
+from torchvision import transforms
+
+from architectures import ARCHITECTURES, build_model, model_from_checkpoint
+from manifest import open_split
+from train import LOG_DIR, MODEL_DIR, _autocast, _loader_workers, _make_criterion, _make_scheduler, _save_atomic
+
+BASE = Path(__file__).resolve().parents[1]
+CACHE_DIR = BASE / 'data' / 'cache' / 'teacher_logits'
+STUDENT_NAME = 'fruit_classifier.student.pt'
+LOG_HEADER = ['epoch', 'train_loss', 'val_acc', 'val_correct', 'val_total', 'arch', 'img_size',
+              'epoch_seconds', 'train_images_per_sec']
+
+
+class IndexedDataset(torch.utils.data.Dataset):
+    """(img, label, index) so a batch can look up its cached teacher logits."""
+
+    def __init__(self, ds):
+        self.ds = ds
+
+    def __len__(self):
+        return len(self.ds)
+
+    def __getitem__(self, i):
+        img, label = self.ds[i]
+        return img, label, i
+
+
+def default_teacher(model_dir: Path = MODEL_DIR) -> Path:
+    best = model_dir / 'fruit_classifier.best.pt'
+    return best if best.exists() else model_dir / 'fruit_classifier.pt'
+
+
+def _file_digest(path: Path, length: int = 16) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:length]
+
+
+def _samples_fingerprint(samples) -> str:
+    """Hash of (path, size, mtime) in dataset order; works for ImageFolder and the split manifest alike."""
+    h = hashlib.sha256()
+    for path, label in samples:
+        st = os.stat(path)
+        h.update(f'{path}\0{label}\0{st.st_size}\0{st.st_mtime_ns}\n'.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def _read_meta(out_dir: Path) -> dict:
+    try:
+        with open(out_dir / 'meta.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def build_teacher_logits(teacher_path: Path, split: str = 'train', batch_size: int = 64, device: str = 'cpu',
+                         force: bool = False, cache_dir: Path = CACHE_DIR) -> Path:
+    """Write the teacher-logit cache for one split if it is missing or stale; returns its directory."""
+    data = torch.load(str(teacher_path), map_location='cpu', mmap=True, weights_only=True)
+    teacher, classes, img_size = model_from_checkpoint(data)
+    tf = transforms.Compose([transforms.Resize((img_size, img_size)), transforms.ToTensor()])
+    ds = open_split(split, tf)
+    out_dir = Path(cache_dir) / f'{split}_{_file_digest(teacher_path)}'
+    fingerprint = _samples_fingerprint(ds.samples)
+    meta = _read_meta(out_dir)
+    if not force and meta.get('fingerprint') == fingerprint and meta.get('classes') == classes:
+        return out_dir
+    if list(ds.classes) != list(classes):
+        raise ValueError(f'teacher {teacher_path} was trained on different classes than the {split} split')
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    teacher.to(device)
+    loader = DataLoader(ds, batch_size=batch_size, shuffle=False, num_workers=_loader_workers())
+    t0 = time.perf_counter()
+    logits = np.lib.format.open_memmap(out_dir / 'logits.npy', mode='w+', dtype=np.float32,
+                                       shape=(len(ds), len(classes)))
+    offset = 0
+    with torch.inference_mode():
+        for imgs, _ in loader:
+            out = teacher(imgs.to(device)).float().cpu().numpy()
+            logits[offset:offset + len(out)] = out
+            offset += len(out)
+    logits.flush()
+    del logits
+    meta = {
+        'split': split,
+        'count': len(ds),
+        'teacher': str(teacher_path),
+        'teacher_img_size': img_size,
+        'classes': classes,
+        'fingerprint': fingerprint,
+        'build_seconds': round(time.perf_counter() - t0, 2),
+    }
+    # meta last: an interrupted build has no matching meta and is redone
+    with open(out_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    print(f"Cached teacher logits for {len(ds)} {split} images to {out_dir} in {meta['build_seconds']}s")
+    return out_dir
+
+
+def distillation_loss(student_logits, teacher_logits, labels, criterion, temperature: float, alpha: float):
+    """Hinton et al.: T^2-scaled KL to the softened teacher plus hard-label cross-entropy."""
+    soft = F.kl_div(F.log_softmax(student_logits / temperature, dim=1),
+                    F.softmax(teacher_logits / temperature, dim=1),
+                    reduction='batchmean') * (temperature * temperature)
+    return alpha * soft + (1.0 - alpha) * criterion(student_logits, labels)
+
+
+def _ensure_log_header(log_file: Path):
+    if not log_file.exists():
+        with open(log_file, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(LOG_HEADER)
+
+
+def distill(teacher_path=None, arch='mobilenet_v3_small', width_mult=1.0, img_size=160, epochs=10, lr=1e-3,
+            batch_size=32, temperature=4.0, alpha=0.7, device='cpu', seed=1337, fast=False, promote=False):
+    torch_threads = int(os.environ.get('TORCH_NUM_THREADS', '0') or 0)
+    if torch_threads > 0:
+        torch.set_num_threads(torch_threads)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    teacher_path = Path(teacher_path) if teacher_path else default_teacher()
+    if not teacher_path.exists():
+        print(f"Teacher not found: {teacher_path}")
+        return None
+    cache = build_teacher_logits(teacher_path, 'train', device=device)
+    teacher_logits = torch.from_numpy(np.ascontiguousarray(np.load(cache / 'logits.npy', mmap_mode='r')))
+    print(f"Teacher {teacher_path.name}: logits {tuple(teacher_logits.shape)} from {cache}")
+
+    # light augmentation only: the cached logits describe the un-augmented image
+    train_tf = transforms.Compose([
+        transforms.RandomResizedCrop(img_size, scale=(0.85, 1.0)),
+        transforms.RandomHorizontalFlip(),
+        transforms.ToTensor(),
+    ])
+    val_tf = transforms.Compose([transforms.Resize((img_size, img_size)), transforms.ToTensor()])
+    train_ds = open_split('train', train_tf)
+    val_ds = open_split('val', val_tf)
+    if len(train_ds) != teacher_logits.shape[0]:
+        raise RuntimeError(f'teacher logit cache has {teacher_logits.shape[0]} rows for {len(train_ds)} images')
+    classes = train_ds.classes
+    num_workers = _loader_workers()
+    train_loader = DataLoader(IndexedDataset(train_ds), batch_size=batch_size, shuffle=True,
+                              num_workers=num_workers)
+    val_loader = DataLoader(val_ds, batch_size=batch_size, shuffle=False, num_workers=num_workers)
+
+    model = build_model(arch, len(classes), pretrained=True, width_mult=width_mult).to(device)
+    n_params = sum(p.numel() for p in model.parameters())
+    print(f"Student {arch} (width {width_mult}) at {img_size}x{img_size}: {n_params / 1e6:.2f}M parameters")
+    criterion = _make_criterion(train_ds.targets, device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    scheduler = _make_scheduler(optimizer, epochs)
+    scaler = torch.cuda.amp.GradScaler() if fast and str(device).startswith('cuda') else None
+    student_path = MODEL_DIR / STUDENT_NAME
+    spec = {'arch': arch, 'width_mult': width_mult, 'img_size': img_size}
+    log_file = LOG_DIR / 'distill_log.csv'
+    _ensure_log_header(log_file)
+
+    best_val_acc = -1.0
+    for epoch in range(epochs):
+        model.train()
+        epoch_start = time.perf_counter()
+        running = torch.zeros((), device=device)
+        seen = 0
+        for imgs, labels, idx in train_loader:
+            imgs = imgs.to(device)
+            labels = labels.to(device)
+            targets = teacher_logits[idx].to(device)
+            optimizer.zero_grad(set_to_none=True)
+            with _autocast(device, fast):
+                outputs = model(imgs)
+            loss = distillation_loss(outputs.float(), targets, labels, criterion, temperature, alpha)
+            if scaler is not None:
+                scaler.scale(loss).backward()
+                scaler.step(optimizer)
+                scaler.update()
+            else:
+                loss.backward()
+                optimizer.step()
+            running += loss.detach()
+            seen += labels.size(0)
+        avg = float(running) / max(1, len(train_loader))
+        epoch_seconds = time.perf_counter() - epoch_start
+        images_per_sec = seen / epoch_seconds if epoch_seconds > 0 else 0.0
+
+        model.eval()
+        correct = 0
+        total = 0
+        with torch.no_grad(), _autocast(device, fast):
+            for imgs, labels in val_loader:
+                preds = model(imgs.to(device)).argmax(dim=1)
+                correct += (preds == labels.to(device)).sum().item()
+                total += labels.size(0)
+        val_acc = correct / total if total else 0.0
+        print(f"Distill epoch {epoch+1}/{epochs} loss: {avg:.4f}, val acc: {val_acc:.4f} ({correct}/{total}), "
+              f"{images_per_sec:.1f} img/s")
+        if val_acc > best_val_acc:
+            best_val_acc = val_acc
+            _save_atomic({'model_state': model.state_dict(), 'classes': classes, **spec,
+                          'teacher': teacher_path.name, 'temperature': temperature, 'alpha': alpha}, student_path)
+            print(f"New best student saved to {student_path} (val_acc={best_val_acc:.4f})")
+        if scheduler is not None:
+            scheduler.step()
+        with open(log_file, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow([epoch + 1, f"{avg:.6f}", f"{val_acc:.6f}", correct, total, arch, img_size,
+                                    f"{epoch_seconds:.3f}", f"{images_per_sec:.2f}"])
+
+    if promote and student_path.exists():
+        # copy-then-rename so the backend's checkpoint watcher never sees a partial file
+        target = MODEL_DIR / 'fruit_classifier.pt'
+        tmp = target.with_name(target.name + '.tmp')
+        shutil.copy2(student_path, tmp)
+        os.replace(tmp, target)
+        print(f"Promoted {student_path} to {target}")
+    return student_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teacher', default=None, help='teacher checkpoint (default fruit_classifier.best.pt)')
+    parser.add_argument('--arch', choices=ARCHITECTURES, default='mobilenet_v3_small')
+    parser.add_argument('--width-mult', type=float, default=1.0, help='MobileNetV2 width multiplier')
+    parser.add_argument('--img-size', type=int, default=160, help='student input resolution')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--lr', type=float, default=1e-3)
+    parser.add_argument('--temperature', type=float, default=4.0, help='softmax temperature for the soft targets')
+    parser.add_argument('--alpha', type=float, default=0.7, help='weight of the soft-target loss (1 - alpha for CE)')
+    parser.add_argument('--fast', action='store_true', help='autocast (bf16 on CPU, fp16 on CUDA) for the student')
+    parser.add_argument('--rebuild-cache', action='store_true', help='recompute the teacher logits')
+    parser.add_argument('--promote', action='store_true',
+                        help='copy the best student over fruit_classifier.pt so the backend serves it')
+    args = parser.parse_args()
+    dev = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if args.rebuild_cache:
+        build_teacher_logits(Path(args.teacher) if args.teacher else default_teacher(), 'train', device=dev,
+                             force=True)
+    distill(args.teacher, args.arch, args.width_mult, args.img_size, args.epochs, args.lr, args.batch_size,
+            args.temperature, args.alpha, dev, fast=args.fast, promote=args.promote)
@@ -1,91 +1,408 @@
 import torch
-from torchvision import transforms, datasets
+from torchvision import transforms
 from pathlib import Path
 import json
 import os
+import time
+import argparse
+import csv
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
+from architectures import model_from_checkpoint
+from manifest import open_split
+
 BASE = Path(__file__).resolve().parents[1]
 SPLIT_DIR = BASE / 'data' / 'splits'
 MODEL_PATH = BASE / 'ml' / 'models' / 'fruit_classifier.pt'
+CALIBRATION_PATH = BASE / 'ml' / 'models' / 'fruit_classifier.calibration.json'
 LOG_DIR = BASE / 'ml' / 'logs'
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 
 def load_model(path):
-    data = torch.load(path, map_location='cpu')
-    classes = data.get('classes')
-    from torchvision import models
-    import torch.nn as nn
-    model = models.mobilenet_v2(pretrained=False)
-    model.classifier[1] = nn.Linear(model.last_channel, len(classes))
-    model.load_state_dict(data['model_state'])
-    model.eval()
-    return model, classes
-
-
-def evaluate():
-    if not MODEL_PATH.exists():
-        print(f"Model not found: {MODEL_PATH}")
-        return
-    model, classes = load_model(MODEL_PATH)
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-    ])
-    test_ds = datasets.ImageFolder(SPLIT_DIR / 'test', transform=transform)
-    # Use num_workers=0 on Windows for compatibility
-    from sys import platform as _platform
-    num_workers = 0
-    loader = torch.utils.data.DataLoader(test_ds, batch_size=32, shuffle=False, num_workers=num_workers)
-
-    correct = 0
-    total = 0
-    all_preds = []
-    all_labels = []
-    with torch.no_grad():
-        for imgs, labels in loader:
-            outputs = model(imgs)
-            preds = outputs.argmax(dim=1)
-            all_preds.extend(preds.tolist())
-            all_labels.extend(labels.tolist())
-            correct += (preds == labels).sum().item()
-            total += labels.size(0)
-    acc = correct / total if total > 0 else 0.0
-    print(f"Test accuracy: {acc:.4f} ({correct}/{total})")
-
-    # confusion matrix and classification report
+    """(model, classes, img_size); the architecture and input size come from the checkpoint (ml/architectures.py)."""
+    data = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+    # built on the meta device and adopting the checkpoint tensors: no random init, no extra copy
+    return model_from_checkpoint(data)
+
+
+class _MultiSize:
+    """Resize one decoded image to every input size in `sizes`; returns a tuple of tensors."""
+
+    def __init__(self, sizes):
+        self.transforms = [transforms.Compose([transforms.Resize((s, s)), transforms.ToTensor()]) for s in sizes]
+
+    def __call__(self, img):
+        return tuple(tf(img) for tf in self.transforms)
+
+
+def _latency_bs1(model, images, iters=20):
+    """Median single-image forward time in ms over up to `iters` real images."""
+    with torch.inference_mode():
+        model(images[:1])  # warm-up
+        times = []
+        for i in range(min(iters, images.shape[0])):
+            t0 = time.perf_counter()
+            model(images[i:i + 1])
+            times.append(time.perf_counter() - t0)
+    times.sort()
+    return round(times[len(times) // 2] * 1000.0, 3) if times else 0.0
+
+
+def _loader_workers():
+    # On Windows, using num_workers>0 can cause issues in some environments
+    if os.name == 'nt':
+        return 0
+    return int(os.environ.get('LOADER_WORKERS', '2'))
+
+
+def compute_metrics(labels, probs, topk=(1, 3, 5), bins=15):
+    """Confusion matrix, per-class P/R/F1, top-k accuracy and ECE from int labels [N] and probs [N, C]."""
+    n, num_classes = probs.shape
+    preds = probs.argmax(axis=1)
+    cm = np.bincount(labels * num_classes + preds, minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+    tp = np.diag(cm).astype(np.float64)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    top = {}
+    for k in topk:
+        if k > num_classes:
+            continue
+        # unordered top-k indices are enough for membership
+        idx = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+        top[f'top{k}'] = float((idx == labels[:, None]).any(axis=1).mean()) if n else 0.0
+    conf = probs.max(axis=1)
+    correct = (preds == labels).astype(np.float64)
+    which = np.clip(np.ceil(conf * bins).astype(int) - 1, 0, bins - 1)
+    counts = np.bincount(which, minlength=bins)
+    conf_sum = np.bincount(which, weights=conf, minlength=bins)
+    acc_sum = np.bincount(which, weights=correct, minlength=bins)
+    ece = float(np.abs(conf_sum - acc_sum).sum() / n) if n else 0.0
+    return {
+        'accuracy': float(tp.sum() / n) if n else 0.0,
+        'correct': int(tp.sum()),
+        'total': int(n),
+        'topk': top,
+        'ece': ece,
+        'macro_f1': float(f1[support > 0].mean()) if (support > 0).any() else 0.0,
+        'confusion_matrix': cm,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'support': support,
+    }
+
+
+def _write_reports(metrics, classes, model_path, out_dir, split, extra=None):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    acc = metrics['accuracy']
+    with open(out_dir / 'evaluation.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_path': str(model_path), 'split': split,
+            'accuracy': acc, 'correct': metrics['correct'], 'total': metrics['total'],
+            'topk': metrics['topk'], 'ece': metrics['ece'], 'macro_f1': metrics['macro_f1'],
+            **(extra or {}),
+        }, f, indent=2)
+
+    report_path = out_dir / 'classification_report.csv'
+    with open(report_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['class','precision','recall','f1-score','support'])
+        for i, cls in enumerate(classes):
+            writer.writerow([cls, metrics['precision'][i], metrics['recall'][i], metrics['f1'][i],
+                             int(metrics['support'][i])])
+    cm = metrics['confusion_matrix']
+    np.savetxt(out_dir / 'confusion_matrix.csv', cm, fmt='%d', delimiter=',')
+
     try:
-        from sklearn.metrics import confusion_matrix, classification_report
-        cm = confusion_matrix(all_labels, all_preds)
-        classes = test_ds.classes
         plt.figure(figsize=(12, 10))
         sns.heatmap(cm, annot=False, fmt='d', xticklabels=classes, yticklabels=classes, cmap='Blues')
         plt.xlabel('Predicted')
         plt.ylabel('True')
         plt.title(f'Confusion Matrix (acc={acc:.4f})')
-        cm_path = LOG_DIR / 'confusion_matrix.png'
+        cm_path = out_dir / 'confusion_matrix.png'
         plt.tight_layout()
         plt.savefig(cm_path)
-        print(f"Wrote confusion matrix to {cm_path}")
-
-        report = classification_report(all_labels, all_preds, target_names=classes, output_dict=True)
-        import csv
-        report_path = LOG_DIR / 'classification_report.csv'
-        with open(report_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['class','precision','recall','f1-score','support'])
-            for cls in classes:
-                r = report.get(cls, {})
-                writer.writerow([cls, r.get('precision',0), r.get('recall',0), r.get('f1-score',0), r.get('support',0)])
-        print(f"Wrote classification report to {report_path}")
+        plt.close()
     except Exception as e:
-        print(f"Could not produce confusion matrix or report: {e}")
+        print(f"Could not plot confusion matrix: {e}")
+    print(f"Wrote evaluation.json, classification_report.csv and confusion matrix to {out_dir}")
+
+
+def evaluate_checkpoints(model_paths, out_dirs, split='test', batch_size=64):
+    """Evaluate several checkpoints in one pass over the decoded split.
+
+    Each batch is decoded once and fed to every model, resized to each
+    checkpoint's own input size (distilled students run below 224x224). Labels
+    and probabilities go into preallocated arrays, and the metrics are
+    computed in NumPy at the end. Single-image latency and parameter count are
+    reported next to the accuracy.
+    """
+    model_paths = [Path(p) for p in model_paths]
+    out_dirs = [Path(d) for d in out_dirs]
+    loaded = []
+    for path, out_dir in zip(model_paths, out_dirs):
+        if not path.exists():
+            print(f"Model not found: {path}")
+            continue
+        model, _, img_size = load_model(path)
+        loaded.append((path, out_dir, model, img_size))
+    if not loaded:
+        return []
+    sizes = sorted({m[3] for m in loaded})
+    ds = open_split(split, _MultiSize(sizes))
+    num_workers = _loader_workers()
+    loader = torch.utils.data.DataLoader(ds, batch_size=batch_size, shuffle=False, num_workers=num_workers,
+                                         persistent_workers=False)
+    n = len(ds)
+    num_classes = len(ds.classes)
+    labels = np.empty(n, dtype=np.int64)
+    probs = [np.empty((n, num_classes), dtype=np.float32) for _ in loaded]
+    first = None
+
+    t0 = time.perf_counter()
+    offset = 0
+    with torch.inference_mode():
+        for views, lbl in loader:
+            b = lbl.shape[0]
+            labels[offset:offset + b] = lbl.numpy()
+            if first is None:
+                first = views
+            for i, (_, _, model, img_size) in enumerate(loaded):
+                imgs = views[sizes.index(img_size)]
+                probs[i][offset:offset + b] = torch.softmax(model(imgs), dim=1).numpy()
+            offset += b
+    elapsed = time.perf_counter() - t0
+    print(f"Evaluated {len(loaded)} checkpoint(s) on {n} {split} images in {elapsed:.1f}s")
+
+    results = []
+    for (path, out_dir, model, img_size), p in zip(loaded, probs):
+        metrics = compute_metrics(labels, p)
+        extra = {
+            'img_size': img_size,
+            'params': sum(t.numel() for t in model.parameters()),
+            'latency_bs1_ms': _latency_bs1(model, first[sizes.index(img_size)]) if first is not None else 0.0,
+        }
+        top = ', '.join(f"{k}={v:.4f}" for k, v in metrics['topk'].items())
+        print(f"{path}: accuracy {metrics['accuracy']:.4f} ({metrics['correct']}/{metrics['total']}), "
+              f"{top}, ECE {metrics['ece']:.4f}, macro F1 {metrics['macro_f1']:.4f}, "
+              f"bs1 {extra['latency_bs1_ms']:.2f} ms at {img_size}px")
+        _write_reports(metrics, ds.classes, path, out_dir, split, extra)
+        results.append({'model_path': str(path), 'accuracy': metrics['accuracy'], 'ece': metrics['ece'],
+                        'macro_f1': metrics['macro_f1'], **metrics['topk'], **extra})
+    return results
+
+
+def evaluate(model_path=MODEL_PATH, out_dir=LOG_DIR):
+    """Evaluate a checkpoint on the test split; reports go to `out_dir` (default ml/logs)."""
+    results = evaluate_checkpoints([model_path], [out_dir])
+    return results[0] if results else None
+
+
+def evaluate_student(teacher_path=None, student_path=None):
+    """Compare a distilled student (ml/distill.py) with its teacher; writes distill_report.csv.
+
+    Both are scored in one pass over the test split, each at its own input
+    size; reports go to ml/logs/distill/{teacher,student}.
+    """
+    model_dir = MODEL_PATH.parent
+    if teacher_path is None:
+        best = model_dir / 'fruit_classifier.best.pt'
+        teacher_path = best if best.exists() else MODEL_PATH
+    student_path = student_path or model_dir / 'fruit_classifier.student.pt'
+    out = LOG_DIR / 'distill'
+    results = evaluate_checkpoints([teacher_path, student_path], [out / 'teacher', out / 'student'])
+    if len(results) != 2:
+        print("Need both a teacher and a student checkpoint to compare")
+        return results
+    teacher, student = results
+    rows = []
+    for role, r in (('teacher', teacher), ('student', student)):
+        rows.append({
+            'role': role, 'model_path': r['model_path'], 'img_size': r['img_size'],
+            'params_m': round(r['params'] / 1e6, 3),
+            'accuracy': round(r['accuracy'], 6), 'accuracy_delta': round(r['accuracy'] - teacher['accuracy'], 6),
+            'macro_f1': round(r['macro_f1'], 6), 'latency_bs1_ms': r['latency_bs1_ms'],
+            'speedup': round(teacher['latency_bs1_ms'] / r['latency_bs1_ms'], 2) if r['latency_bs1_ms'] else 0.0,
+        })
+    report_path = LOG_DIR / 'distill_report.csv'
+    with open(report_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    row = rows[1]
+    print(f"Student: accuracy delta {row['accuracy_delta']:+.4f}, {row['speedup']:.2f}x faster at bs1 "
+          f"({row['params_m']}M vs {rows[0]['params_m']}M parameters)")
+    print(f"Wrote teacher/student comparison to {report_path}")
+    return rows
+
+
+def evaluate_variants(names=None):
+    """Compare the eager checkpoint with the variants written by ml/export.py.
+
+    Reports test accuracy, accuracy delta vs eager, single-image latency and
+    batched throughput for each variant, and writes variants_report.csv.
+    """
+    from variants import ALL_VARIANTS, VARIANT_FILES, load_variant, read_manifest
+    model_dir = MODEL_PATH.parent
+    if names is None:
+        names = [n for n in ALL_VARIANTS if (model_dir / VARIANT_FILES[n]).exists()]
+    names = ['eager'] + [n for n in names if n != 'eager']
+    img_size = read_manifest(model_dir).get('img_size', 224)
+    transform = transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+    ])
+    test_ds = open_split('test', transform)
+    loader = torch.utils.data.DataLoader(test_ds, batch_size=32, shuffle=False, num_workers=_loader_workers())
+    # decode the test set once and reuse it for every variant
+    batches = [(imgs, labels) for imgs, labels in loader]
+    single = [imgs[:1] for imgs, _ in batches][:20]
+
+    rows = []
+    base_acc = None
+    for name in names:
+        try:
+            model, _, _ = load_variant(model_dir, name)
+        except Exception as e:
+            print(f"{name}: could not load ({e})")
+            continue
+        correct = 0
+        total = 0
+        infer_time = 0.0
+        with torch.no_grad():
+            model(batches[0][0])  # warm-up
+            for imgs, labels in batches:
+                t0 = time.perf_counter()
+                outputs = model(imgs)
+                infer_time += time.perf_counter() - t0
+                correct += (outputs.argmax(dim=1) == labels).sum().item()
+                total += labels.size(0)
+            lat = []
+            for x in single:
+                t0 = time.perf_counter()
+                model(x)
+                lat.append(time.perf_counter() - t0)
+        lat.sort()
+        acc = correct / total if total else 0.0
+        if base_acc is None:
+            base_acc = acc
+        row = {
+            'variant': name,
+            'accuracy': round(acc, 6),
+            'accuracy_delta': round(acc - base_acc, 6),
+            'latency_bs1_ms': round(lat[len(lat) // 2] * 1000.0, 3) if lat else 0.0,
+            'throughput_bs32_img_s': round(total / infer_time, 2) if infer_time else 0.0,
+        }
+        rows.append(row)
+        print(f"{name:>13}: acc={row['accuracy']:.4f} (delta {row['accuracy_delta']:+.4f})  "
+              f"bs1 {row['latency_bs1_ms']:.2f} ms  bs32 {row['throughput_bs32_img_s']:.1f} img/s")
+
+    report_path = LOG_DIR / 'variants_report.csv'
+    with open(report_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['variant', 'accuracy', 'accuracy_delta', 'latency_bs1_ms', 'throughput_bs32_img_s'])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Wrote variant comparison to {report_path}")
+    return rows
+
+
+def _ece(probs, labels, bins=15):
+    """Expected calibration error over equal-width confidence bins."""
+    return compute_metrics(labels.numpy(), probs.float().numpy(), topk=(), bins=bins)['ece']
+
+
+def fit_temperature():
+    """Fit a softmax temperature on the validation split and write it for the backend.
+
+    The temperature minimises validation NLL (LBFGS on log T, so T stays
+    positive). The backend divides logits by it before the softmax; argmax, and
+    therefore accuracy, is unchanged. The checkpoint's size/mtime are recorded
+    so a retrained model ignores a stale calibration.
+    """
+    if not MODEL_PATH.exists():
+        print(f"Model not found: {MODEL_PATH}")
+        return
+    model, _, img_size = load_model(MODEL_PATH)
+    transform = transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+    ])
+    val_ds = open_split('val', transform)
+    loader = torch.utils.data.DataLoader(val_ds, batch_size=32, shuffle=False, num_workers=_loader_workers())
+    all_logits = []
+    all_labels = []
+    with torch.no_grad():
+        for imgs, labels in loader:
+            all_logits.append(model(imgs))
+            all_labels.append(labels)
+    logits = torch.cat(all_logits)
+    labels = torch.cat(all_labels)
+
+    nll = torch.nn.CrossEntropyLoss()
+    log_t = torch.zeros(1, requires_grad=True)
+    optimizer = torch.optim.LBFGS([log_t], lr=0.1, max_iter=200)
+
+    def _closure():
+        optimizer.zero_grad()
+        loss = nll(logits / log_t.exp(), labels)
+        loss.backward()
+        return loss
+
+    optimizer.step(_closure)
+    temperature = float(log_t.exp().item())
+    with torch.no_grad():
+        before = {'nll': nll(logits, labels).item(), 'ece': _ece(torch.softmax(logits, dim=1), labels)}
+        after = {'nll': nll(logits / temperature, labels).item(),
+                 'ece': _ece(torch.softmax(logits / temperature, dim=1), labels)}
+    st = MODEL_PATH.stat()
+    out = {
+        'temperature': round(temperature, 6),
+        'samples': int(labels.numel()),
+        'before': {k: round(v, 6) for k, v in before.items()},
+        'after': {k: round(v, 6) for k, v in after.items()},
+        'source': {'path': MODEL_PATH.name, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns},
+    }
+    with open(CALIBRATION_PATH, 'w', encoding='utf-8') as f:
+        json.dump(out, f, indent=2)
+    print(f"Temperature {temperature:.4f}: NLL {before['nll']:.4f} -> {after['nll']:.4f}, "
+          f"ECE {before['ece']:.4f} -> {after['ece']:.4f}")
+    print(f"Wrote calibration to {CALIBRATION_PATH}")
+    return out
 
 
 if __name__ == '__main__':
-    evaluate()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--variants', nargs='*', default=None,
+                        help='compare exported variants (no names = every variant on disk)')
+    parser.add_argument('--model', default=str(MODEL_PATH), help='checkpoint to evaluate')
+    parser.add_argument('--out-dir', default=str(LOG_DIR), help='where to write the report and confusion matrix')
+    parser.add_argument('--models', nargs='*', default=None,
+                        help='evaluate several checkpoints in one pass over the test set')
+    parser.add_argument('--out-dirs', nargs='*', default=None, help='one report directory per --models entry')
+    parser.add_argument('--student', action='store_true',
+                        help='compare fruit_classifier.student.pt (ml/distill.py) with its teacher')
+    parser.add_argument('--fit-temperature', action='store_true',
+                        help='fit softmax temperature on the val split for /vision/predict calibration')
+    args = parser.parse_args()
+    if args.fit_temperature:
+        fit_temperature()
+    elif args.student:
+        evaluate_student()
+    elif args.variants is not None:
+        evaluate_variants(args.variants or None)
+    elif args.models:
+        out_dirs = args.out_dirs or [str(Path(m).parent) for m in args.models]
+        if len(out_dirs) != len(args.models):
+            parser.error('--out-dirs needs one entry per --models entry')
+        evaluate_checkpoints(args.models, out_dirs)
+    else:
+        evaluate(args.model, args.out_dir)
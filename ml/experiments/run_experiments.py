@@ -1,15 +1,35 @@
 """Orchestrate multiple training experiments and pick the best model.
 
+Runs are scheduled concurrently on a bounded pool (`--workers`). Each run
+gets its own core budget (`--threads-per-run`), split between torch threads
+and DataLoader worker processes (LOADER_WORKERS), writes checkpoints and
+train_log.csv into its own folder and is evaluated against its own
+checkpoint, so runs never touch ml/models/fruit_classifier.pt; only the final
+selection copies the winner there (the previous model is backed up first).
+Once training is done, all trained checkpoints are evaluated in one
+evaluate.py pass, so the test set is decoded once per sweep, not per run.
+
+A run that finished writes result.json into its folder; `--resume <sweep dir>`
+skips those and continues the rest from their last completed epoch.
+results.csv / results.json in the sweep folder consolidate status, accuracy,
+min per-class F1, wall-clock and training throughput per run.
+
 Usage: run with the project's venv python
 python ml/experiments/run_experiments.py
+python ml/experiments/run_experiments.py --workers 2 --threads-per-run 4
+python ml/experiments/run_experiments.py --resume ml/experiments/20251010_215844
 """
-import subprocess
-import json
-from pathlib import Path
-import shutil
+import argparse
+import csv
 import datetime
+import json
 import os
+import shutil
+import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 
 BASE = Path(__file__).resolve().parents[2]
 ML_DIR = BASE / 'ml'
@@ -18,16 +38,6 @@ EXP_ROOT = ML_DIR / 'experiments'
 LOG_DIR = ML_DIR / 'logs'
 EXP_ROOT.mkdir(parents=True, exist_ok=True)
 
-timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-out_root = EXP_ROOT / timestamp
-out_root.mkdir(parents=True, exist_ok=True)
-
-orig_model = MODEL_DIR / 'fruit_classifier.pt'
-backup_dir = out_root / 'backup'
-backup_dir.mkdir(parents=True, exist_ok=True)
-if orig_model.exists():
-    shutil.copy2(orig_model, backup_dir / 'fruit_classifier.pt')
-
 # experiment definitions
 EXPERIMENTS = [
     {'name': 'baseline-8', 'env': {'AUGMENT_LEVEL': 'baseline', 'CLASS_WEIGHT': '0', 'LR_SCHEDULER': ''}},
@@ -38,113 +48,277 @@ EXPERIMENTS = [
 ]
 
 PY = sys.executable
+RESULT_FIELDS = ['name', 'status', 'accuracy', 'min_f1', 'best_val_acc', 'epochs', 'wall_seconds',
+                 'train_seconds', 'eval_seconds', 'train_images_per_sec', 'threads', 'run_dir']
+
+
+def _split_budget(threads: int, loader_workers: int = -1):
+    """(torch threads, DataLoader workers) sharing one run's budget of `threads` cores.
+
+    Each DataLoader worker is a decoding process of its own, so it is counted in
+    the budget: by default half the cores (at most train.py's default of 2) load
+    data and the rest run torch; 1 core means loading in the main process.
+    """
+    if loader_workers < 0:
+        loader_workers = min(2, threads // 2)
+    loader_workers = min(loader_workers, max(0, threads - 1))
+    return max(1, threads - loader_workers), loader_workers
+
+
+def _thread_env(threads: int, loader_workers: int = -1) -> dict:
+    if threads <= 0:
+        return {}
+    torch_threads, loader_workers = _split_budget(threads, loader_workers)
+    n = str(torch_threads)
+    return {'TORCH_NUM_THREADS': n, 'OMP_NUM_THREADS': n, 'MKL_NUM_THREADS': n,
+            'LOADER_WORKERS': str(loader_workers)}
+
+
+def _min_f1(report: Path):
+    if not report.exists():
+        return None
+    min_f1 = None
+    with open(report, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            try:
+                f1 = float(row[3])
+            except Exception:
+                continue
+            if min_f1 is None or f1 < min_f1:
+                min_f1 = f1
+    return min_f1
+
+
+def _train_log_stats(train_log: Path) -> dict:
+    """Best val acc and mean training throughput from a run's train_log.csv."""
+    stats = {'best_val_acc': None, 'train_images_per_sec': None}
+    if not train_log.exists():
+        return stats
+    with open(train_log, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    accs = [float(r['val_acc']) for r in rows if r.get('val_acc')]
+    ips = [float(r['train_images_per_sec']) for r in rows if r.get('train_images_per_sec')]
+    if accs:
+        stats['best_val_acc'] = round(max(accs), 6)
+    if ips:
+        stats['train_images_per_sec'] = round(sum(ips) / len(ips), 2)
+    return stats
 
-results = []
 
-for exp in EXPERIMENTS:
+def _read_json(path: Path) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def run_experiment(exp: dict, out_root: Path, epochs: int, threads: int, loader_workers: int = -1) -> dict:
+    """Train one run (or reuse its trained.json if it already finished training)."""
     name = exp['name']
     run_dir = out_root / name
     run_dir.mkdir(parents=True, exist_ok=True)
     checkpoints = run_dir / 'checkpoints'
     checkpoints.mkdir(parents=True, exist_ok=True)
+    trained = _read_json(run_dir / 'trained.json')
+    if trained.get('status') == 'trained':
+        print(f"Skipping training of {name}: already trained, evaluation pending")
+        return trained
+    # an interrupted run continues from its resume state (train.py --resume); otherwise start a clean log
+    train_log = run_dir / 'train_log.csv'
+    if train_log.exists() and not (checkpoints / 'fruit_classifier.last.pt').exists():
+        train_log.unlink()
 
-    # set EXP_MODEL_DIR so train writes models into this run folder
+    # EXP_MODEL_DIR / EXP_LOG_DIR make train.py write checkpoints and train_log.csv into this run folder
     env = os.environ.copy()
     env.update(exp['env'])
+    env.update(_thread_env(threads, loader_workers))
     env['EXP_MODEL_DIR'] = str(checkpoints)
+    env['EXP_LOG_DIR'] = str(run_dir)
 
-    run_config = {'name': name, 'env': exp['env'], 'epochs': 8}
+    torch_threads, workers = _split_budget(threads, loader_workers) if threads > 0 else (None, None)
+    run_config = {'name': name, 'env': exp['env'], 'epochs': epochs, 'threads': threads,
+                  'torch_threads': torch_threads, 'loader_workers': workers}
     with open(run_dir / 'run_config.json', 'w', encoding='utf-8') as f:
         json.dump(run_config, f, indent=2)
 
     print(f"Running experiment {name} -> {run_dir}")
-    cmd = [PY, str(ML_DIR / 'train.py'), '--epochs', '8']
-    proc = subprocess.run(cmd, env=env, cwd=str(BASE))
+    result = {'name': name, 'status': 'trained', 'run_dir': str(run_dir), 'epochs': epochs, 'threads': threads}
+    t0 = time.perf_counter()
+    with open(run_dir / 'train.out', 'w', encoding='utf-8') as out:
+        proc = subprocess.run([PY, str(ML_DIR / 'train.py'), '--epochs', str(epochs), '--resume'],
+                              env=env, cwd=str(BASE), stdout=out, stderr=subprocess.STDOUT)
+    result['train_seconds'] = round(time.perf_counter() - t0, 2)
     if proc.returncode != 0:
-        print(f"Experiment {name} failed (exit {proc.returncode}), skipping evaluation")
-        results.append({'name': name, 'status': 'failed'})
-        continue
+        print(f"Experiment {name} failed (exit {proc.returncode}), skipping evaluation; see {run_dir / 'train.out'}")
+        result['status'] = 'failed'
+        return result
 
-    # copy train log and best model into run folder if present
-    # evaluate: point evaluate.py at the run's best model
     best_model = checkpoints / 'fruit_classifier.best.pt'
     if not best_model.exists():
         # try the final model
-        final_model = checkpoints / 'fruit_classifier.pt'
-        if final_model.exists():
-            best_model = final_model
-
-    if best_model.exists():
-        shutil.copy2(best_model, run_dir / best_model.name)
-        # run evaluation using the copied model by temporarily swapping ml/models/fruit_classifier.pt
-        temp_target = MODEL_DIR / 'fruit_classifier.pt'
-        # backup current model in MODEL_DIR
-        temp_backup = run_dir / 'model_dir_backup'
-        temp_backup.mkdir(parents=True, exist_ok=True)
-        if temp_target.exists():
-            shutil.copy2(temp_target, temp_backup / 'fruit_classifier.pt')
-        shutil.copy2(best_model, temp_target)
-        # run evaluation
-        eval_proc = subprocess.run([PY, str(ML_DIR / 'evaluate.py')], cwd=str(BASE))
-        # move logs produced to run_dir
-        for fname in ('classification_report.csv', 'confusion_matrix.png'):
-            p = LOG_DIR / fname
-            if p.exists():
-                shutil.copy2(p, run_dir / fname)
-        # restore model
-        if (temp_backup / 'fruit_classifier.pt').exists():
-            shutil.copy2(temp_backup / 'fruit_classifier.pt', temp_target)
-    else:
+        best_model = checkpoints / 'fruit_classifier.pt'
+    if not best_model.exists():
         print(f"No model found for run {name}")
+        result['status'] = 'no-model'
+        return result
+    shutil.copy2(best_model, run_dir / best_model.name)
+    result['model'] = str(run_dir / best_model.name)
+    result.update(_train_log_stats(train_log))
+    with open(run_dir / 'trained.json', 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Trained {name} in {result['train_seconds']}s")
+    return result
 
-    results.append({'name': name, 'status': 'ok', 'run_dir': str(run_dir)})
 
-# select best model by inspecting classification_report.csv for min per-class f1
-import csv
-best_run = None
-best_min_f1 = -1.0
-
-for r in results:
-    if r.get('status') != 'ok':
-        continue
-    run_dir = Path(r['run_dir'])
-    report = run_dir / 'classification_report.csv'
-    if not report.exists():
-        continue
-    min_f1 = None
-    with open(report, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        headers = next(reader)
-        for row in reader:
-            try:
-                f1 = float(row[3])
-            except Exception:
-                continue
-            if min_f1 is None or f1 < min_f1:
-                min_f1 = f1
-    if min_f1 is None:
-        continue
-    print(f"Run {r['name']} min f1: {min_f1}")
-    if best_run is None or min_f1 > best_min_f1:
-        best_min_f1 = min_f1
-        best_run = r
-
-if best_run:
+def evaluate_runs(trained: list, threads: int, loader_workers: int = -1):
+    """Evaluate every trained run's checkpoint in one evaluate.py pass over the test set.
+
+    The test images are decoded once and fed to all checkpoints; each run's
+    reports land in its own folder. Writes result.json per run.
+    """
+    if not trained:
+        return
+    t0 = time.perf_counter()
+    eval_env = os.environ.copy()
+    eval_env.update(_thread_env(threads, loader_workers))
+    cmd = [PY, str(ML_DIR / 'evaluate.py'), '--models'] + [r['model'] for r in trained]
+    cmd += ['--out-dirs'] + [r['run_dir'] for r in trained]
+    log = Path(trained[0]['run_dir']).parent / 'evaluate.out'
+    with open(log, 'w', encoding='utf-8') as out:
+        eval_proc = subprocess.run(cmd, env=eval_env, cwd=str(BASE), stdout=out, stderr=subprocess.STDOUT)
+    eval_seconds = round(time.perf_counter() - t0, 2)
+    print(f"Evaluated {len(trained)} run(s) in one pass in {eval_seconds}s")
+    if eval_proc.returncode != 0:
+        print(f"Evaluation failed (exit {eval_proc.returncode}); see {log}")
+    for r in trained:
+        run_dir = Path(r['run_dir'])
+        evaluation = _read_json(run_dir / 'evaluation.json')
+        r['accuracy'] = round(evaluation['accuracy'], 6) if 'accuracy' in evaluation else None
+        r['min_f1'] = _min_f1(run_dir / 'classification_report.csv')
+        r['eval_seconds'] = eval_seconds
+        r['wall_seconds'] = round(r.get('train_seconds', 0.0) + eval_seconds, 2)
+        r['status'] = 'ok' if r['accuracy'] is not None else 'eval-failed'
+        if r['status'] == 'ok':
+            with open(run_dir / 'result.json', 'w', encoding='utf-8') as f:
+                json.dump(r, f, indent=2)
+        print(f"Finished {r['name']} (acc={r['accuracy']}, min_f1={r['min_f1']})")
+
+
+def write_results(out_root: Path, results: list):
+    results = sorted(results, key=lambda r: r['name'])
+    with open(out_root / 'results.json', 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    with open(out_root / 'results.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"{'run':<18}{'status':<12}{'acc':>8}{'min_f1':>8}{'wall_s':>9}{'img/s':>9}")
+    for r in results:
+        def fmt(v, spec):
+            return format(v, spec) if isinstance(v, (int, float)) else '-'
+        print(f"{r['name']:<18}{r['status']:<12}{fmt(r.get('accuracy'), '8.4f')}{fmt(r.get('min_f1'), '8.4f')}"
+              f"{fmt(r.get('wall_seconds'), '9.1f')}{fmt(r.get('train_images_per_sec'), '9.1f')}")
+
+
+def select_best(out_root: Path, results: list):
+    """Copy the run with the highest minimum per-class F1 to ml/models/fruit_classifier.pt."""
+    best_run = None
+    best_min_f1 = -1.0
+    for r in results:
+        if r.get('status') != 'ok' or r.get('min_f1') is None:
+            continue
+        print(f"Run {r['name']} min f1: {r['min_f1']}")
+        if best_run is None or r['min_f1'] > best_min_f1:
+            best_min_f1 = r['min_f1']
+            best_run = r
+    if not best_run:
+        return None
+
     print(f"Best run selected: {best_run['name']} (min_f1={best_min_f1})")
-    # copy its best model to ml/models/fruit_classifier.pt (backup already created)
+    orig_model = MODEL_DIR / 'fruit_classifier.pt'
+    backup_dir = out_root / 'backup'
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    if orig_model.exists() and not (backup_dir / 'fruit_classifier.pt').exists():
+        shutil.copy2(orig_model, backup_dir / 'fruit_classifier.pt')
     selected_run_dir = Path(best_run['run_dir'])
     for candidate in ('fruit_classifier.best.pt', 'fruit_classifier.pt'):
         p = selected_run_dir / candidate
         if p.exists():
-            shutil.copy2(p, MODEL_DIR / 'fruit_classifier.pt')
+            MODEL_DIR.mkdir(parents=True, exist_ok=True)
+            # copy then rename so the serving watcher never sees a half-written checkpoint
+            tmp = MODEL_DIR / 'fruit_classifier.pt.tmp'
+            shutil.copy2(p, tmp)
+            os.replace(tmp, orig_model)
             shutil.copy2(p, out_root / ('selected_' + candidate))
             break
-    print(f"Selected model copied to {MODEL_DIR / 'fruit_classifier.pt'}")
+    print(f"Selected model copied to {orig_model}")
 
     # also copy the selected run artifacts into top-level for quick inspection
     shutil.copytree(selected_run_dir, out_root / 'best_run', dirs_exist_ok=True)
+    return best_run
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=0,
+                        help='concurrent runs (0 = cpu_count // threads-per-run, at least 1)')
+    parser.add_argument('--threads-per-run', type=int, default=0,
+                        help='cores per run, torch threads plus DataLoader workers (0 = cpu_count // workers)')
+    parser.add_argument('--loader-workers', type=int, default=-1,
+                        help='DataLoader workers per run, taken out of --threads-per-run '
+                             '(-1 = half of it, at most 2)')
+    parser.add_argument('--epochs', type=int, default=8)
+    parser.add_argument('--only', nargs='*', default=None, help='run only these experiment names')
+    parser.add_argument('--resume', default='', help='existing sweep folder; runs with a result.json are skipped')
+    args = parser.parse_args()
+
+    workers, threads = args.workers, args.threads_per_run
+    if workers <= 0:
+        workers = max(1, cpus // threads) if threads > 0 else 1
+    if threads <= 0:
+        threads = max(1, cpus // workers)
+
+    if args.resume:
+        out_root = Path(args.resume).resolve()
+    else:
+        out_root = EXP_ROOT / datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    out_root.mkdir(parents=True, exist_ok=True)
+
+    experiments = [e for e in EXPERIMENTS if args.only is None or e['name'] in args.only]
+    results = []
+    pending = []
+    for exp in experiments:
+        done = _read_json(out_root / exp['name'] / 'result.json')
+        if done.get('status') == 'ok':
+            print(f"Skipping {exp['name']}: already finished in {out_root}")
+            results.append(done)
+        else:
+            pending.append(exp)
+
+    torch_threads, loader_workers = _split_budget(threads, args.loader_workers)
+    print(f"Sweep {out_root}: {len(pending)} run(s) to go, {workers} at a time, {threads} core(s) each "
+          f"({torch_threads} torch thread(s) + {loader_workers} loader worker(s))")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_experiment, exp, out_root, args.epochs, threads, args.loader_workers): exp for exp in pending}
+        for fut in as_completed(futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                name = futures[fut]['name']
+                print(f"Experiment {name} crashed: {e}")
+                results.append({'name': name, 'status': 'error', 'run_dir': str(out_root / name)})
+    evaluate_runs([r for r in results if r.get('status') == 'trained'], max(1, cpus))
+    print(f"Sweep wall-clock: {time.perf_counter() - t0:.1f}s")
+
+    write_results(out_root, results)
+    select_best(out_root, results)
+    print('Experiments finished. Artifacts: ', out_root)
+
 
-print('Experiments finished. Artifacts: ', out_root)
-print('Results summary:')
-for r in results:
-    print(r)
+if __name__ == '__main__':
+    main()
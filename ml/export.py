@@ -0,0 +1,215 @@
+"""Export fruit_classifier.pt into CPU-serving variants.
+
+Variants (written next to the checkpoint):
+  torchscript   fruit_classifier.torchscript.pt   traced + frozen fp32 graph
+  dynamic_int8  fruit_classifier.dynamic_int8.pt  dynamic int8 Linear layers (traced)
+  static_int8   fruit_classifier.static_int8.pt   fused, static int8 model calibrated on data/splits/val
+  onnx          fruit_classifier.onnx             ONNX graph for onnxruntime (optional)
+
+A manifest (fruit_classifier.variants.json) records the source checkpoint
+signature, classes and the latency measured for each variant on this machine;
+backend/vision_api.py uses it to pick the fastest fresh artifact. File names,
+the manifest reader and the variant loader live in variants.py, shared with
+backend/vision/model_loader.py.
+
+Usage:
+python ml/export.py
+python ml/export.py --variants torchscript static_int8 --calib-batches 20
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import time
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+from torchvision import transforms
+
+from architectures import checkpoint_spec, model_from_checkpoint
+from manifest import open_split
+from variants import ALL_VARIANTS, MANIFEST_NAME, VARIANT_FILES, load_variant
+
+BASE = Path(__file__).resolve().parents[1]
+SPLIT_DIR = BASE / 'data' / 'splits'
+MODEL_DIR = BASE / 'ml' / 'models'
+MODEL_PATH = MODEL_DIR / 'fruit_classifier.pt'
+
+
+def checkpoint_signature(path: Path) -> dict:
+    st = path.stat()
+    return {'path': str(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def load_checkpoint(path: Path):
+    data = torch.load(str(path), map_location='cpu')
+    model, classes, _ = model_from_checkpoint(data)
+    return model, classes
+
+
+def quantized_engine() -> str:
+    supported = torch.backends.quantized.supported_engines
+    machine = platform.machine().lower()
+    if ('arm' in machine or 'aarch64' in machine) and 'qnnpack' in supported:
+        return 'qnnpack'
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in supported:
+            return engine
+    return supported[0]
+
+
+def calibration_loader(img_size: int, batch_size: int):
+    transform = transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+    ])
+    ds = open_split('val', transform)
+    return torch.utils.data.DataLoader(ds, batch_size=batch_size, shuffle=True, num_workers=0)
+
+
+def _save_script(module, path: Path, classes, img_size: int, extra: dict = None):
+    meta = {'classes': classes, 'img_size': img_size}
+    meta.update(extra or {})
+    torch.jit.save(module, str(path), _extra_files={'meta.json': json.dumps(meta)})
+
+
+def export_torchscript(model, classes, out: Path, img_size: int):
+    example = torch.randn(1, 3, img_size, img_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+        traced = torch.jit.freeze(traced)
+    _save_script(traced, out, classes, img_size)
+
+
+def export_dynamic_int8(model, classes, out: Path, img_size: int):
+    # MobileNetV2 is conv-heavy; dynamic quantization only covers the Linear head,
+    # so expect a smaller win here than from static_int8.
+    qmodel = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    example = torch.randn(1, 3, img_size, img_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(qmodel, example)
+    _save_script(traced, out, classes, img_size)
+
+
+def export_static_int8(state_dict, classes, out: Path, img_size: int, calib_batches: int, width_mult: float = 1.0):
+    from torchvision.models.quantization import mobilenet_v2 as q_mobilenet_v2
+    engine = quantized_engine()
+    torch.backends.quantized.engine = engine
+    qmodel = q_mobilenet_v2(pretrained=False, quantize=False, width_mult=width_mult)
+    qmodel.classifier[1] = nn.Linear(qmodel.last_channel, len(classes))
+    qmodel.load_state_dict(state_dict)
+    qmodel.eval()
+    qmodel.fuse_model()
+    qmodel.qconfig = torch.ao.quantization.get_default_qconfig(engine)
+    torch.ao.quantization.prepare(qmodel, inplace=True)
+    seen = 0
+    with torch.no_grad():
+        for i, (imgs, _) in enumerate(calibration_loader(img_size, 32)):
+            if i >= calib_batches:
+                break
+            qmodel(imgs)
+            seen += imgs.size(0)
+    print(f"static_int8: calibrated on {seen} val images (engine={engine})")
+    torch.ao.quantization.convert(qmodel, inplace=True)
+    example = torch.randn(1, 3, img_size, img_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(qmodel, example)
+    _save_script(traced, out, classes, img_size, {'quantized_engine': engine})
+    return engine
+
+
+def export_onnx(model, out: Path, img_size: int):
+    example = torch.randn(1, 3, img_size, img_size)
+    torch.onnx.export(
+        model, example, str(out),
+        input_names=['input'], output_names=['logits'],
+        dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=13,
+    )
+
+
+def measure_latency(model, img_size: int, batch_size: int, iters: int = 20, warmup: int = 3) -> dict:
+    x = torch.randn(batch_size, 3, img_size, img_size)
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(x)
+        times = []
+        for _ in range(iters):
+            t0 = time.perf_counter()
+            model(x)
+            times.append(time.perf_counter() - t0)
+    times.sort()
+    median = times[len(times) // 2]
+    return {'batch_size': batch_size, 'median_ms': round(median * 1000.0, 3),
+            'images_per_sec': round(batch_size / median, 2)}
+
+
+def export(checkpoint: Path, variants, calib_batches: int = 10, img_size: int = None, bench_iters: int = 20):
+    out_dir = checkpoint.parent
+    data = torch.load(str(checkpoint), map_location='cpu')
+    model, classes = load_checkpoint(checkpoint)
+    spec = checkpoint_spec(data)
+    # distilled students (ml/distill.py) record their own architecture and input size
+    img_size = img_size or spec['img_size']
+    manifest = {
+        'source': checkpoint_signature(checkpoint),
+        'classes': classes,
+        'arch': spec['arch'],
+        'img_size': img_size,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'torch': torch.__version__,
+        'threads': torch.get_num_threads(),
+        'variants': {},
+    }
+    manifest['variants']['eager'] = {
+        'path': str(checkpoint),
+        'latency_bs1': measure_latency(model, img_size, 1, bench_iters),
+        'latency_bs16': measure_latency(model, img_size, 16, max(3, bench_iters // 4)),
+    }
+    for name in variants:
+        out = out_dir / VARIANT_FILES[name]
+        try:
+            if name == 'torchscript':
+                export_torchscript(model, classes, out, img_size)
+            elif name == 'dynamic_int8':
+                export_dynamic_int8(model, classes, out, img_size)
+            elif name == 'static_int8':
+                if spec['arch'] != 'mobilenet_v2':
+                    print(f"static_int8: skipped, no quantizable {spec['arch']} definition")
+                    continue
+                export_static_int8(data['model_state'], classes, out, img_size, calib_batches,
+                                   spec['width_mult'])
+            elif name == 'onnx':
+                export_onnx(model, out, img_size)
+        except Exception as e:
+            print(f"{name}: export failed: {e}")
+            continue
+        entry = {'path': str(out)}
+        try:
+            loaded, _, _ = load_variant(out_dir, name)
+            entry['latency_bs1'] = measure_latency(loaded, img_size, 1, bench_iters)
+            entry['latency_bs16'] = measure_latency(loaded, img_size, 16, max(3, bench_iters // 4))
+        except Exception as e:
+            # e.g. onnx exported but onnxruntime not installed
+            print(f"{name}: exported to {out} but could not benchmark: {e}")
+        manifest['variants'][name] = entry
+        print(f"{name}: wrote {out} ({os.path.getsize(out) / 1e6:.1f} MB) {entry.get('latency_bs1', '')}")
+
+    with open(out_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote manifest to {out_dir / MANIFEST_NAME}")
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checkpoint', default=str(MODEL_PATH))
+    parser.add_argument('--variants', nargs='*', default=['torchscript', 'dynamic_int8', 'static_int8'],
+                        choices=ALL_VARIANTS)
+    parser.add_argument('--calib-batches', type=int, default=10)
+    parser.add_argument('--img-size', type=int, default=None, help="default: the checkpoint's input size")
+    parser.add_argument('--bench-iters', type=int, default=20)
+    args = parser.parse_args()
+    export(Path(args.checkpoint), args.variants, args.calib_batches, args.img_size, args.bench_iters)
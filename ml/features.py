@@ -0,0 +1,147 @@
+"""Frozen-backbone feature cache for head-only training.
+
+The ImageNet-pretrained MobileNetV2 backbone (features + global average pool)
+is run once over a split with the deterministic eval transform, and the pooled
+1280-d features are written to a memory-mapped .npy next to the labels:
+
+  data/cache/features/<split>_<img_size>/features.npy   float32 [N, 1280]
+  data/cache/features/<split>_<img_size>/labels.npy     int64   [N]
+  data/cache/features/<split>_<img_size>/meta.json      classes, split fingerprint, torchvision version
+  data/cache/features/backbone_<torchvision version>.pt  the backbone weights the features came from
+
+The cache is rebuilt when files in the split change. Because the features are
+computed once, head-only training sees no per-epoch augmentation; use
+`train.py --head-only --finetune-epochs N` to finish with augmented, unfrozen
+epochs when that matters.
+
+Usage:
+python ml/features.py                   # cache train and val
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torchvision
+from torch.utils.data import DataLoader
+from torchvision import models, transforms
+
+from manifest import FolderDataset
+from shards import list_split, split_fingerprint
+
+BASE = Path(__file__).resolve().parents[1]
+SPLIT_DIR = BASE / 'data' / 'splits'
+CACHE_DIR = BASE / 'data' / 'cache' / 'features'
+FEATURE_DIM = 1280
+
+
+class Backbone(nn.Module):
+    """MobileNetV2 up to (and including) the global average pool -> [B, 1280]."""
+
+    def __init__(self, net):
+        super().__init__()
+        self.features = net.features
+
+    def forward(self, x):
+        return nn.functional.adaptive_avg_pool2d(self.features(x), 1).flatten(1)
+
+
+def pretrained_backbone_state(cache_dir: Path = CACHE_DIR) -> dict:
+    """ImageNet MobileNetV2 `features` weights, fetched once and kept next to the feature caches.
+
+    train.py --head-only assembles its checkpoint from these, so the saved
+    backbone is the one the cached features were computed with.
+    """
+    path = Path(cache_dir) / f'backbone_{torchvision.__version__}.pt'
+    if path.exists():
+        return torch.load(str(path), map_location='cpu', weights_only=True)
+    state = models.mobilenet_v2(pretrained=True).features.state_dict()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    torch.save(state, str(tmp))
+    os.replace(tmp, path)
+    return state
+
+
+def _read_meta(out_dir: Path) -> dict:
+    try:
+        with open(out_dir / 'meta.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def build_features(split: str, img_size: int = 224, batch_size: int = 64, device: str = 'cpu',
+                   force: bool = False, split_dir: Path = SPLIT_DIR, cache_dir: Path = CACHE_DIR) -> Path:
+    """Write the feature cache for one split if it is missing or stale; returns its directory."""
+    src = Path(split_dir) / split
+    out_dir = Path(cache_dir) / f'{split}_{img_size}'
+    classes, samples = list_split(src)
+    fingerprint = split_fingerprint(src, samples)
+    meta = _read_meta(out_dir)
+    if (not force and meta.get('fingerprint') == fingerprint and meta.get('classes') == classes
+            and meta.get('torchvision') == torchvision.__version__):
+        return out_dir
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tf = transforms.Compose([transforms.Resize((img_size, img_size)), transforms.ToTensor()])
+    # the class list every split shares (manifest.split_classes), not just the folders present here
+    ds = FolderDataset(src, classes, transform=tf)
+    num_workers = int(os.environ.get('LOADER_WORKERS', '2'))
+    loader = DataLoader(ds, batch_size=batch_size, shuffle=False, num_workers=num_workers)
+    net = models.mobilenet_v2(pretrained=False)
+    net.features.load_state_dict(pretrained_backbone_state(cache_dir))
+    backbone = Backbone(net).to(device).eval()
+
+    t0 = time.perf_counter()
+    feats = np.lib.format.open_memmap(out_dir / 'features.npy', mode='w+', dtype=np.float32,
+                                      shape=(len(ds), FEATURE_DIM))
+    offset = 0
+    with torch.no_grad():
+        for imgs, _ in loader:
+            out = backbone(imgs.to(device)).cpu().numpy()
+            feats[offset:offset + len(out)] = out
+            offset += len(out)
+    feats.flush()
+    del feats
+    np.save(out_dir / 'labels.npy', np.asarray(ds.targets, dtype=np.int64))
+    meta = {
+        'split': split,
+        'count': len(ds),
+        'dim': FEATURE_DIM,
+        'img_size': img_size,
+        'classes': ds.classes,
+        'fingerprint': fingerprint,
+        'torchvision': torchvision.__version__,
+        'build_seconds': round(time.perf_counter() - t0, 2),
+    }
+    # meta last: an interrupted build has no matching meta and is redone
+    with open(out_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    print(f"Cached {len(ds)} {split} feature vectors to {out_dir} in {meta['build_seconds']}s")
+    return out_dir
+
+
+def load_features(out_dir: Path):
+    """(features memmap [N,1280], labels [N], classes) for a cache directory."""
+    out_dir = Path(out_dir)
+    meta = _read_meta(out_dir)
+    feats = np.load(out_dir / 'features.npy', mmap_mode='r')
+    labels = np.load(out_dir / 'labels.npy')
+    return feats, labels, meta.get('classes')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--splits', nargs='*', default=['train', 'val'])
+    parser.add_argument('--img-size', type=int, default=224)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+    dev = 'cuda' if torch.cuda.is_available() else 'cpu'
+    for s in args.splits:
+        build_features(s, args.img_size, args.batch_size, dev, args.force)
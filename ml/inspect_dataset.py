@@ -1,9 +1,32 @@
-import os
+"""Scan data/FruitImageDataset and write ml/metadata.json.
+
+Besides class counts and samples, every image is fully decoded on a process
+pool (truncated or corrupt files are listed under `corrupt`). Its size,
+dimensions and a 64-bit perceptual hash (dHash) are recorded per file in
+data/cache/inspect_cache.json, keyed by size and mtime, so a rescan only
+decodes new or changed files. metadata.json only gets the summaries.
+Pairs of images whose hashes differ by at most `--max-distance` bits are
+reported as near-duplicates. When data/splits/manifest.csv exists, pairs
+that fall in different splits are flagged as leakage.
+
+Usage:
+python ml/inspect_dataset.py
+python ml/inspect_dataset.py --workers 8 --max-distance 3
+"""
+import argparse
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-DATA_DIR = Path(__file__).resolve().parents[1] / 'data' / 'FruitImageDataset'
+BASE = Path(__file__).resolve().parents[1]
+DATA_DIR = BASE / 'data' / 'FruitImageDataset'
 OUT_FILE = Path(__file__).resolve().parents[0] / 'metadata.json'
+CACHE_FILE = BASE / 'data' / 'cache' / 'inspect_cache.json'
+HASH_BITS = 64
+# hash bands shared by more images than this are not expanded into pairs
+MAX_BUCKET = 256
 
 
 def inspect_dataset(data_dir: Path):
@@ -19,20 +42,188 @@ def inspect_dataset(data_dir: Path):
     return classes, counts, samples
 
 
+def _dhash(img) -> str:
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 grayscale thumbnail."""
+    from PIL import Image
+    small = img.convert('L').resize((9, 8), Image.BILINEAR)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return f'{bits:016x}'
+
+
+def _inspect_file(path: str) -> dict:
+    """Worker: fully decode one image; never raises."""
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            img.verify()  # structural check (CRCs, truncated headers)
+        with Image.open(path) as img:
+            fmt = img.format
+            width, height = img.size
+            if fmt == 'JPEG':
+                # decode at reduced scale for the hash; load() still reads the whole stream
+                img.draft('RGB', (64, 64))
+            img.load()
+            return {'ok': True, 'width': width, 'height': height, 'format': fmt, 'phash': _dhash(img)}
+    except Exception as e:
+        return {'ok': False, 'error': f'{e.__class__.__name__}: {e}'}
+
+
+def _load_cache() -> dict:
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _save_cache(cache: dict):
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_FILE.with_name(CACHE_FILE.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp, CACHE_FILE)
+
+
+def scan_images(data_dir: Path, workers: int = 0) -> tuple:
+    """{relative path: record} for every file, decoding only files not in the cache; returns (records, decoded)."""
+    cache = _load_cache()
+    records = {}
+    todo = []
+    for cls_dir in sorted(p for p in data_dir.iterdir() if p.is_dir()):
+        for p in sorted(cls_dir.iterdir()):
+            if not p.is_file():
+                continue
+            rel = p.relative_to(data_dir).as_posix()
+            st = p.stat()
+            hit = cache.get(rel)
+            if hit and hit.get('bytes') == st.st_size and hit.get('mtime_ns') == st.st_mtime_ns:
+                records[rel] = hit
+            else:
+                records[rel] = {'bytes': st.st_size, 'mtime_ns': st.st_mtime_ns}
+                todo.append(rel)
+    if todo:
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        paths = [str(data_dir / rel) for rel in todo]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rel, res in zip(todo, pool.map(_inspect_file, paths, chunksize=32)):
+                records[rel].update(res)
+    _save_cache(records)
+    return records, len(todo)
+
+
+def near_duplicates(records: dict, max_distance: int = 4, max_bucket: int = MAX_BUCKET) -> tuple:
+    """(pairs, skipped): decodable images whose hashes differ in at most `max_distance` bits.
+
+    Multi-index hashing: split the hash into max_distance + 1 bands; by the
+    pigeonhole principle any pair within the distance shares at least one band
+    exactly, so only pairs sharing a band are compared. A band value shared by
+    more than `max_bucket` images (blank or flat images all hash alike) would
+    make this quadratic again, so such buckets are skipped and returned as
+    `skipped` ({'band', 'size', 'sample'}) instead.
+    """
+    hashes = [(rel, int(r['phash'], 16)) for rel, r in records.items() if r.get('ok') and r.get('phash')]
+    bands = max_distance + 1
+    width = -(-HASH_BITS // bands)
+    mask = (1 << width) - 1
+    candidates = set()
+    skipped = []
+    for b in range(bands):
+        buckets = {}
+        for i, (_, h) in enumerate(hashes):
+            buckets.setdefault((h >> (b * width)) & mask, []).append(i)
+        for idxs in buckets.values():
+            if len(idxs) > max_bucket:
+                skipped.append({'band': b, 'size': len(idxs), 'sample': [hashes[i][0] for i in idxs[:5]]})
+                continue
+            for x in range(len(idxs)):
+                for y in range(x + 1, len(idxs)):
+                    candidates.add((idxs[x], idxs[y]))
+    pairs = []
+    for i, j in candidates:
+        d = bin(hashes[i][1] ^ hashes[j][1]).count('1')
+        if d <= max_distance:
+            pairs.append({'a': hashes[i][0], 'b': hashes[j][0], 'distance': d})
+    pairs.sort(key=lambda p: (p['distance'], p['a'], p['b']))
+    return pairs, skipped
+
+
+def _split_of(data_dir: Path) -> dict:
+    """Source-relative path -> split, from the split manifest if there is one."""
+    try:
+        from manifest import read_manifest
+    except Exception:
+        return {}
+    prefix = data_dir.relative_to(BASE).as_posix() + '/'
+    return {r['path'][len(prefix):]: r['split'] for r in read_manifest() if r['path'].startswith(prefix)}
+
+
+def _dims_summary(records: dict) -> dict:
+    ok = [r for r in records.values() if r.get('ok')]
+    if not ok:
+        return {}
+    widths = sorted(r['width'] for r in ok)
+    heights = sorted(r['height'] for r in ok)
+    sizes = sorted(r['bytes'] for r in ok)
+    mid = len(ok) // 2
+    return {
+        'width': {'min': widths[0], 'median': widths[mid], 'max': widths[-1]},
+        'height': {'min': heights[0], 'median': heights[mid], 'max': heights[-1]},
+        'bytes': {'min': sizes[0], 'median': sizes[mid], 'max': sizes[-1], 'total': sum(sizes)},
+    }
+
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=0, help='decode processes (0 = cpu_count - 1)')
+    parser.add_argument('--max-distance', type=int, default=4, help='max dHash Hamming distance for near-duplicates')
+    parser.add_argument('--max-bucket', type=int, default=MAX_BUCKET,
+                        help='skip hash bands shared by more images than this')
+    args = parser.parse_args()
+
     if not DATA_DIR.exists():
         print(f"Data dir not found: {DATA_DIR}")
         return
+    t0 = time.perf_counter()
     classes, counts, samples = inspect_dataset(DATA_DIR)
+    records, decoded = scan_images(DATA_DIR, args.workers)
+    corrupt = [{'path': rel, 'error': r.get('error')} for rel, r in sorted(records.items()) if not r.get('ok')]
+    dups, skipped = near_duplicates(records, args.max_distance, args.max_bucket)
+    splits = _split_of(DATA_DIR)
+    for p in dups:
+        sa, sb = splits.get(p['a']), splits.get(p['b'])
+        p['splits'] = [sa, sb]
+        p['leakage'] = bool(sa and sb and sa != sb)
+    leakage = [p for p in dups if p['leakage']]
+
     meta = {
         'dataset_path': str(DATA_DIR),
         'num_classes': len(classes),
         'classes': classes,
         'counts': counts,
         'samples': samples,
+        'num_images': len(records),
+        'dimensions': _dims_summary(records),
+        'corrupt': corrupt,
+        'near_duplicates': {'hash': 'dhash64', 'max_distance': args.max_distance,
+                            'pairs': dups, 'cross_split_pairs': len(leakage), 'skipped_buckets': skipped},
+        'cache': str(CACHE_FILE),
     }
     with open(OUT_FILE, 'w', encoding='utf-8') as f:
         json.dump(meta, f, indent=2)
+    print(f"Scanned {len(records)} images ({decoded} decoded, {len(records) - decoded} cached) "
+          f"in {time.perf_counter() - t0:.1f}s")
+    print(f"Corrupt: {len(corrupt)}; near-duplicate pairs: {len(dups)} ({len(leakage)} across splits)")
+    for c in corrupt[:10]:
+        print(f"  corrupt {c['path']}: {c['error']}")
+    for sk in skipped[:10]:
+        print(f"  skipped band {sk['band']} bucket of {sk['size']} images (e.g. {sk['sample'][0]}); "
+              f"raise --max-bucket to compare them")
+    for p in leakage[:10]:
+        print(f"  leakage {p['a']} ({p['splits'][0]}) ~ {p['b']} ({p['splits'][1]}), distance {p['distance']}")
     print(f"Wrote metadata to {OUT_FILE}")
 
 
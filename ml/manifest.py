@@ -0,0 +1,126 @@
+"""Split manifest written by ml/preprocess_split.py, and a Dataset that reads it.
+
+data/splits/manifest.csv has one row per source image:
+
+  path,label,split,size,mtime_ns,sha256
+
+`path` is relative to the project root and points at the original image under
+data/FruitImageDataset, so no copy is needed. `open_split` reads
+data/splits/<split> when that directory was materialized, else the manifest;
+SPLIT_SOURCE=manifest forces the manifest. Either way the label indices come
+from `split_classes`, one class list shared by every split and both sources,
+so train/val/test never disagree on what label 3 means. torchvision is only
+imported when an image is loaded, so preprocess_split.py doesn't need it.
+"""
+import csv
+import os
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+SPLIT_DIR = BASE / 'data' / 'splits'
+MANIFEST_PATH = SPLIT_DIR / 'manifest.csv'
+MANIFEST_FIELDS = ['path', 'label', 'split', 'size', 'mtime_ns', 'sha256']
+SPLITS = ('train', 'val', 'test')
+# torchvision.datasets.folder.IMG_EXTENSIONS, what ImageFolder accepts
+IMG_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.ppm', '.bmp', '.pgm', '.tif', '.tiff', '.webp')
+
+
+def read_manifest(path: Path = MANIFEST_PATH) -> list:
+    """Manifest rows as dicts ([] if there is no manifest)."""
+    try:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    except FileNotFoundError:
+        return []
+
+
+def write_manifest(rows: list, path: Path = MANIFEST_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(sorted(rows, key=lambda r: (r['split'], r['label'], r['path'])))
+    os.replace(tmp, path)
+
+
+def split_classes(split_dir: Path = SPLIT_DIR) -> list:
+    """Sorted class names shared by every split: manifest labels plus the class folders of any materialized split."""
+    split_dir = Path(split_dir)
+    classes = {r['label'] for r in read_manifest(split_dir / MANIFEST_PATH.name)}
+    for split in SPLITS:
+        folder = split_dir / split
+        if folder.is_dir():
+            classes.update(d.name for d in folder.iterdir() if d.is_dir())
+    return sorted(classes)
+
+
+def _default_loader(path):
+    from torchvision.datasets.folder import default_loader
+    return default_loader(path)
+
+
+class _SplitDataset:
+    """ImageFolder-compatible dataset (classes, class_to_idx, samples, targets) with a given class list."""
+
+    def __init__(self, classes: list, samples: list, transform=None):
+        self.classes = list(classes)
+        self.class_to_idx = {c: i for i, c in enumerate(self.classes)}
+        self.samples = samples
+        self.targets = [t for _, t in self.samples]
+        self.transform = transform
+        self.loader = _default_loader
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, i):
+        path, target = self.samples[i]
+        img = self.loader(path)
+        if self.transform is not None:
+            img = self.transform(img)
+        return img, target
+
+
+class ManifestDataset(_SplitDataset):
+    """One manifest split. Classes default to every label in the manifest, so a class with no
+    images in this split keeps its index."""
+
+    def __init__(self, split: str, transform=None, manifest: Path = MANIFEST_PATH, classes: list = None):
+        rows = read_manifest(manifest)
+        if not rows:
+            raise FileNotFoundError(f'no split manifest at {manifest}')
+        classes = classes or sorted({r['label'] for r in rows})
+        class_to_idx = {c: i for i, c in enumerate(classes)}
+        samples = [(str(BASE / r['path']), class_to_idx[r['label']])
+                   for r in rows if r['split'] == split and r['label'] in class_to_idx]
+        super().__init__(classes, samples, transform)
+
+
+class FolderDataset(_SplitDataset):
+    """A materialized data/splits/<split>/<class>/<file> tree, labelled with a given class list.
+
+    Unlike ImageFolder, a class folder that is missing or empty keeps its index.
+    """
+
+    def __init__(self, folder: Path, classes: list, transform=None):
+        folder = Path(folder)
+        samples = []
+        for idx, cls in enumerate(classes):
+            class_dir = folder / cls
+            if not class_dir.is_dir():
+                continue
+            for p in sorted(class_dir.iterdir()):
+                if p.is_file() and p.suffix.lower() in IMG_EXTENSIONS:
+                    samples.append((str(p), idx))
+        super().__init__(classes, samples, transform)
+
+
+def open_split(split: str, transform=None, split_dir: Path = SPLIT_DIR):
+    """data/splits/<split> if it was materialized, else the manifest; labels from `split_classes`."""
+    source = os.environ.get('SPLIT_SOURCE', 'auto').lower()
+    folder = Path(split_dir) / split
+    classes = split_classes(split_dir)
+    if source != 'manifest' and folder.is_dir() and any(folder.iterdir()):
+        return FolderDataset(folder, classes, transform)
+    return ManifestDataset(split, transform, Path(split_dir) / MANIFEST_PATH.name, classes)
@@ -1,13 +1,42 @@
+"""Build deterministic train/val/test splits of data/FruitImageDataset.
+
+Every run writes data/splits/manifest.csv (path, label, split, size, mtime,
+sha256; see ml/manifest.py). With --mode hardlink (default), symlink or copy
+it also materializes data/splits/<split>/<class>/<file>, which is what
+ImageFolder reads. With --mode manifest nothing is materialized, split folders
+left by an earlier run are removed, and train.py / evaluate.py read the
+manifest directly.
+
+Reruns are incremental. Files whose size and mtime match the manifest are
+skipped. New or changed files are hashed on a thread pool, and links are only
+(re)created for them. Existing files keep their split. New files are assigned
+by a hash bucket, so adding images never reshuffles the existing splits.
+Files removed from the source (or listed as corrupt in ml/metadata.json by
+ml/inspect_dataset.py) are dropped from the manifest, and their materialized
+copies are deleted.
+
+Usage:
+python ml/preprocess_split.py
+python ml/preprocess_split.py --mode manifest --workers 16
+"""
+import argparse
+import hashlib
 import json
+import os
 import random
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from manifest import MANIFEST_PATH, read_manifest, write_manifest
+
 BASE = Path(__file__).resolve().parents[1]
 DATA_DIR = BASE / 'data' / 'FruitImageDataset'
 OUT_DIR = BASE / 'data' / 'splits'
 META_FILE = BASE / 'ml' / 'metadata.json'
 LABELS_FILE = BASE / 'ml' / 'labels.json'
+SPLITS = ('train', 'val', 'test')
 
 
 def load_metadata():
@@ -20,62 +49,164 @@ def load_metadata():
 
 
 def make_dirs():
-    for split in ('train', 'val', 'test'):
+    for split in SPLITS:
         (OUT_DIR / split).mkdir(parents=True, exist_ok=True)
 
 
-def split_dataset(train_ratio=0.7, val_ratio=0.15, seed=1337):
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _initial_assignment(imgs, train_ratio, val_ratio, rng):
+    """Original per-class shuffle split, used when there is no manifest yet."""
+    n = len(imgs)
+    imgs_sorted = sorted(imgs)
+    rng.shuffle(imgs_sorted)
+    n_train = int(n * train_ratio)
+    n_val = int(n * val_ratio)
+    # ensure at least 1 image in train if possible
+    if n_train == 0 and n >= 1:
+        n_train = 1
+    # make sure we don't exceed available
+    n_val = min(n_val, n - n_train)
+    out = {}
+    for i, p in enumerate(imgs_sorted):
+        out[p] = 'train' if i < n_train else ('val' if i < n_train + n_val else 'test')
+    return out
+
+
+def _bucket_split(sha: str, train_ratio, val_ratio) -> str:
+    """Stable split for a file added after the first build."""
+    x = int(sha[:8], 16) / float(1 << 32)
+    if x < train_ratio:
+        return 'train'
+    return 'val' if x < train_ratio + val_ratio else 'test'
+
+
+def _target(row) -> Path:
+    return OUT_DIR / row['split'] / row['label'] / Path(row['path']).name
+
+
+def _materialize(src: Path, dst: Path, mode: str) -> str:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    if mode == 'hardlink':
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            # different filesystem / no hardlink support: fall back to a copy
+            pass
+    elif mode == 'symlink':
+        os.symlink(src.resolve(), dst)
+        return 'symlink'
+    shutil.copy2(src, dst)
+    return 'copy'
+
+
+def split_dataset(train_ratio=0.7, val_ratio=0.15, seed=1337, mode='hardlink', workers=8):
+    t0 = time.perf_counter()
     meta = load_metadata()
     classes = meta.get('classes', [])
     class_to_idx = {c: i for i, c in enumerate(classes)}
-    make_dirs()
-    random.seed(seed)
+    rng = random.Random(seed)
 
-    summary = { 'train': {}, 'val': {}, 'test': {} }
-    totals = {'train': 0, 'val': 0, 'test': 0}
+    # images ml/inspect_dataset.py could not decode would crash DataLoader workers mid-epoch
+    corrupt = {c['path'] for c in meta.get('corrupt', [])}
+    previous = {r['path']: r for r in read_manifest(MANIFEST_PATH)}
+    first_build = not previous
 
+    # scan sources; only new or changed (size/mtime) files need hashing
+    sources = []  # (rel, cls, path, stat)
     for cls in classes:
         src = DATA_DIR / cls
-        imgs = [p for p in src.iterdir() if p.is_file()]
-        n = len(imgs)
-        if n == 0:
+        if not src.is_dir():
             continue
-        imgs_sorted = sorted(imgs)
-        random.shuffle(imgs_sorted)
-
-        n_train = int(n * train_ratio)
-        n_val = int(n * val_ratio)
-        # ensure at least 1 image in train if possible
-        if n_train == 0 and n >= 1:
-            n_train = 1
-        # make sure we don't exceed available
-        n_val = min(n_val, n - n_train)
-        n_test = n - n_train - n_val
-
-        train_imgs = imgs_sorted[:n_train]
-        val_imgs = imgs_sorted[n_train:n_train + n_val]
-        test_imgs = imgs_sorted[n_train + n_val:]
-
-        for split_name, split_imgs in [('train', train_imgs), ('val', val_imgs), ('test', test_imgs)]:
-            out_class_dir = OUT_DIR / split_name / cls
-            out_class_dir.mkdir(parents=True, exist_ok=True)
-            for p in split_imgs:
-                shutil.copy2(p, out_class_dir / p.name)
-            summary[split_name][cls] = len(split_imgs)
-            totals[split_name] += len(split_imgs)
+        for p in src.iterdir():
+            if p.is_file() and f'{cls}/{p.name}' not in corrupt:
+                sources.append((p.relative_to(BASE).as_posix(), cls, p, p.stat()))
+    changed = [s for s in sources
+               if s[0] not in previous
+               or int(previous[s[0]]['size']) != s[3].st_size
+               or int(previous[s[0]]['mtime_ns']) != s[3].st_mtime_ns]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = dict(zip((s[0] for s in changed), pool.map(lambda s: _sha256(s[2]), changed)))
+
+    initial = {}
+    if first_build:
+        by_class = {}
+        for rel, cls, p, _ in sources:
+            by_class.setdefault(cls, []).append(rel)
+        for cls in classes:
+            if by_class.get(cls):
+                initial.update(_initial_assignment(by_class[cls], train_ratio, val_ratio, rng))
+
+    rows = []
+    todo = []  # rows whose materialized file must be (re)created
+    for rel, cls, p, st in sources:
+        old = previous.get(rel)
+        sha = hashes.get(rel) or old['sha256']
+        if old is not None:
+            split = old['split']
+        elif first_build:
+            split = initial[rel]
+        else:
+            split = _bucket_split(sha, train_ratio, val_ratio)
+        row = {'path': rel, 'label': cls, 'split': split, 'size': st.st_size,
+               'mtime_ns': st.st_mtime_ns, 'sha256': sha}
+        rows.append(row)
+        if mode != 'manifest' and (rel in hashes or not _target(row).exists()):
+            todo.append((p, _target(row)))
+
+    current = {r['path'] for r in rows}
+    removed = [r for path, r in previous.items() if path not in current]
+    if mode != 'manifest':
+        make_dirs()
+        for r in removed:
+            t = _target(r)
+            if t.exists() or t.is_symlink():
+                t.unlink()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            kinds = list(pool.map(lambda job: _materialize(job[0], job[1], mode), todo))
+        if mode == 'hardlink' and 'copy' in kinds:
+            print(f"Note: {kinds.count('copy')} file(s) were copied (hardlinks not supported on this filesystem)")
+    else:
+        # folders materialized by an earlier hardlink/symlink/copy run would shadow the manifest in
+        # open_split; they only hold links or copies of data/FruitImageDataset, so drop them
+        for split in SPLITS:
+            folder = OUT_DIR / split
+            if folder.is_dir():
+                shutil.rmtree(folder)
+                print(f"Removed previously materialized {folder} (manifest mode)")
+
+    write_manifest(rows, MANIFEST_PATH)
 
     # write labels
     with open(LABELS_FILE, 'w', encoding='utf-8') as f:
         json.dump(class_to_idx, f, indent=2)
 
+    summary = {s: {} for s in SPLITS}
+    totals = {s: 0 for s in SPLITS}
+    for r in rows:
+        summary[r['split']][r['label']] = summary[r['split']].get(r['label'], 0) + 1
+        totals[r['split']] += 1
+
     print(f"Wrote labels to {LABELS_FILE}")
-    print(f"Splits written to {OUT_DIR}")
+    print(f"Wrote manifest to {MANIFEST_PATH} ({len(rows)} images; {len(changed)} new/changed, "
+          f"{len(removed)} removed, {len(todo)} {mode} operations) in {time.perf_counter() - t0:.1f}s")
+    if mode != 'manifest':
+        print(f"Splits written to {OUT_DIR}")
     print("Summary per split:")
-    for split in ('train', 'val', 'test'):
+    for split in SPLITS:
         print(f"  {split}: {totals[split]} images")
 
     # print per-class counts for first 10 classes for brevity and total counts all
-    for split in ('train', 'val', 'test'):
+    for split in SPLITS:
         print(f"\nTop classes in {split}:")
         items = sorted(summary[split].items(), key=lambda kv: -kv[1])
         for cls, cnt in items[:10]:
@@ -83,4 +214,12 @@ def split_dataset(train_ratio=0.7, val_ratio=0.15, seed=1337):
 
 
 if __name__ == '__main__':
-    split_dataset()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=['hardlink', 'symlink', 'copy', 'manifest'], default='hardlink',
+                        help='how to materialize data/splits (manifest = write only manifest.csv)')
+    parser.add_argument('--workers', type=int, default=8, help='threads for hashing and linking')
+    parser.add_argument('--train-ratio', type=float, default=0.7)
+    parser.add_argument('--val-ratio', type=float, default=0.15)
+    parser.add_argument('--seed', type=int, default=1337)
+    args = parser.parse_args()
+    split_dataset(args.train_ratio, args.val_ratio, args.seed, args.mode, args.workers)
@@ -0,0 +1,235 @@
+"""Preprocessed uint8 shard cache for the train/val splits.
+
+ImageFolder decodes and resizes every JPEG on every epoch. `build_shards`
+does that once: each image is decoded (PIL draft for JPEG), resized to a
+fixed `store_size` square and written as a raw HxWx3 uint8 record into
+fixed-size shard files. An index.json next to the shards records the
+record shape, labels, classes, source paths and a fingerprint of the split
+(relative path, size, mtime of every file) so a changed split is rebuilt.
+Images that fail to decode are not stored; they are listed under 'errors'.
+
+`ShardDataset` memory-maps the shards and returns records as zero-copy
+uint8 [3,H,W] tensors; the augmentations then run on those small tensors.
+
+Layout (per split):
+  data/cache/shards/<split>_<store_size>/index.json
+  data/cache/shards/<split>_<store_size>/shard_00000.u8 ...
+
+Usage:
+python ml/shards.py                     # build train and val at the default sizes
+python ml/shards.py --img-size 224 --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import torch
+from torchvision import transforms
+
+BASE = Path(__file__).resolve().parents[1]
+SPLIT_DIR = BASE / 'data' / 'splits'
+CACHE_DIR = BASE / 'data' / 'cache' / 'shards'
+IMG_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff')
+RECORDS_PER_SHARD = 4096
+INDEX_NAME = 'index.json'
+# bump when the record layout or what gets stored changes; older caches are rebuilt
+SHARD_FORMAT = 2
+
+
+def store_size_for(split: str, img_size: int = 224) -> int:
+    """Train records keep some margin for RandomResizedCrop; val is stored at the eval size."""
+    return int(round(img_size * 8 / 7)) if split == 'train' else img_size
+
+
+def list_split(split_dir: Path, classes: list = None):
+    """(classes, [(relative_path, label)]) in ImageFolder order.
+
+    `classes` defaults to manifest.split_classes, the list every split shares,
+    so a class with no images in this split keeps its label index.
+    """
+    if classes is None:
+        from manifest import split_classes
+        classes = split_classes(split_dir.parent)
+    samples = []
+    for label, cls in enumerate(classes):
+        class_dir = split_dir / cls
+        if not class_dir.is_dir():
+            continue
+        for p in sorted(class_dir.iterdir()):
+            if p.is_file() and p.suffix.lower() in IMG_EXTENSIONS:
+                samples.append((f'{cls}/{p.name}', label))
+    return classes, samples
+
+
+def split_fingerprint(split_dir: Path, samples) -> str:
+    h = hashlib.sha256()
+    for rel, _ in samples:
+        st = (split_dir / rel).stat()
+        h.update(f'{rel}\0{st.st_size}\0{st.st_mtime_ns}\n'.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def _decode(args):
+    """Worker: decode + resize one image to a store_size x store_size x 3 uint8 array."""
+    path, size = args
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            if img.format == 'JPEG':
+                img.draft('RGB', (size, size))
+            img = img.convert('RGB').resize((size, size), Image.BILINEAR)
+            return np.asarray(img, dtype=np.uint8), None
+    except Exception as e:
+        return None, f'{path}: {e}'
+
+
+def read_index(out_dir: Path) -> dict:
+    try:
+        with open(out_dir / INDEX_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def build_shards(split: str, img_size: int = 224, workers: int = 0, force: bool = False,
+                 split_dir: Path = SPLIT_DIR, cache_dir: Path = CACHE_DIR) -> Path:
+    """Write the shard cache for one split if it is missing or stale; returns its directory."""
+    size = store_size_for(split, img_size)
+    src = Path(split_dir) / split
+    out_dir = Path(cache_dir) / f'{split}_{size}'
+    classes, samples = list_split(src)
+    fingerprint = split_fingerprint(src, samples)
+    index = read_index(out_dir)
+    if (not force and index.get('fingerprint') == fingerprint and index.get('size') == size
+            and index.get('format') == SHARD_FORMAT and index.get('classes') == classes):
+        return out_dir
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob('shard_*.u8'):
+        old.unlink()
+    record_bytes = size * size * 3
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    t0 = time.perf_counter()
+    errors = []
+    shards = []
+    kept = []
+    jobs = [(str(src / rel), size) for rel, _ in samples]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        f = None
+        for sample, (arr, err) in zip(samples, pool.map(_decode, jobs, chunksize=16)):
+            if err:
+                # unreadable images are left out of the cache rather than stored as blank records
+                errors.append(err)
+                continue
+            if len(kept) % RECORDS_PER_SHARD == 0:
+                if f is not None:
+                    f.close()
+                name = f'shard_{len(shards):05d}.u8'
+                shards.append({'file': name, 'count': 0})
+                f = open(out_dir / name, 'wb')
+            f.write(arr.tobytes())
+            shards[-1]['count'] += 1
+            kept.append(sample)
+        if f is not None:
+            f.close()
+    index = {
+        'format': SHARD_FORMAT,
+        'split': split,
+        'size': size,
+        'record_bytes': record_bytes,
+        'records_per_shard': RECORDS_PER_SHARD,
+        'count': len(kept),
+        'classes': classes,
+        'labels': [label for _, label in kept],
+        'paths': [rel for rel, _ in kept],
+        'shards': shards,
+        'fingerprint': fingerprint,
+        'errors': errors,
+        'build_seconds': round(time.perf_counter() - t0, 2),
+    }
+    # index last: a crash mid-build leaves no index, so the next run rebuilds
+    tmp = out_dir / f'{INDEX_NAME}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(index, fh)
+    os.replace(tmp, out_dir / INDEX_NAME)
+    print(f"Wrote {len(kept)} {split} records ({size}x{size}) in {len(shards)} shard(s) to {out_dir} "
+          f"in {index['build_seconds']}s" + (f", skipped {len(errors)} unreadable" if errors else ''))
+    return out_dir
+
+
+class ShardDataset(torch.utils.data.Dataset):
+    """Memory-mapped view of a shard directory; yields (transform(uint8 [3,H,W]), label)."""
+
+    def __init__(self, shard_dir: Path, transform=None):
+        self.shard_dir = Path(shard_dir)
+        index = read_index(self.shard_dir)
+        if not index:
+            raise FileNotFoundError(f'no shard index in {self.shard_dir}')
+        self.size = index['size']
+        self.per_shard = index['records_per_shard']
+        self.classes = index['classes']
+        self.class_to_idx = {c: i for i, c in enumerate(self.classes)}
+        self.targets = index['labels']
+        self.paths = index['paths']
+        self.shard_files = [s['file'] for s in index['shards']]
+        self.transform = transform
+        # opened lazily so the dataset pickles cheaply into DataLoader workers
+        self._maps = None
+
+    def _open(self):
+        maps = []
+        for name in self.shard_files:
+            # copy-on-write: writable for torch.from_numpy, never written back to the file
+            mm = np.memmap(self.shard_dir / name, dtype=np.uint8, mode='c')
+            maps.append(mm.reshape(-1, self.size, self.size, 3))
+        self._maps = maps
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getitem__(self, i):
+        if self._maps is None:
+            self._open()
+        shard, offset = divmod(i, self.per_shard)
+        img = torch.from_numpy(self._maps[shard][offset]).permute(2, 0, 1)
+        if self.transform is not None:
+            img = self.transform(img)
+        return img, self.targets[i]
+
+
+def tensor_transforms(augment_level: str, img_size: int = 224, train: bool = True):
+    """Tensor-space equivalents of the PIL pipelines in train.get_dataloaders (uint8 in, float out)."""
+    to_float = transforms.ConvertImageDtype(torch.float32)
+    if not train or augment_level == 'none':
+        return transforms.Compose([transforms.Resize((img_size, img_size), antialias=True), to_float])
+    if augment_level == 'strong':
+        return transforms.Compose([
+            transforms.RandomResizedCrop(img_size, scale=(0.7, 1.0), antialias=True),
+            transforms.RandomHorizontalFlip(),
+            transforms.RandomVerticalFlip(),
+            transforms.RandomRotation(20),
+            transforms.ColorJitter(0.2, 0.2, 0.2, 0.1),
+            to_float,
+        ])
+    return transforms.Compose([
+        transforms.RandomResizedCrop(img_size, scale=(0.8, 1.0), antialias=True),
+        transforms.RandomHorizontalFlip(),
+        transforms.ColorJitter(0.1, 0.1, 0.1, 0.05),
+        to_float,
+    ])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--splits', nargs='*', default=['train', 'val'])
+    parser.add_argument('--img-size', type=int, default=224)
+    parser.add_argument('--workers', type=int, default=0, help='decode processes (0 = cpu_count - 1)')
+    parser.add_argument('--force', action='store_true')
+    args = parser.parse_args()
+    for s in args.splits:
+        build_shards(s, args.img_size, args.workers, args.force)
@@ -0,0 +1,42 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+for _mod in ('torch', 'torchvision', 'matplotlib', 'seaborn'):
+    pytest.importorskip(_mod)
+
+from evaluate import compute_metrics  # noqa: E402
+
+
+def test_confusion_matrix_and_per_class_scores():
+    labels = np.array([0, 0, 1, 2])
+    probs = np.array([
+        [0.9, 0.05, 0.05],
+        [0.2, 0.7, 0.1],
+        [0.1, 0.8, 0.1],
+        [0.3, 0.3, 0.4],
+    ])
+    m = compute_metrics(labels, probs, topk=(1, 2, 5))
+    assert m['confusion_matrix'].tolist() == [[1, 1, 0], [0, 1, 0], [0, 0, 1]]
+    assert m['correct'] == 3 and m['total'] == 4
+    assert m['accuracy'] == pytest.approx(0.75)
+    assert m['precision'].tolist() == pytest.approx([1.0, 0.5, 1.0])
+    assert m['recall'].tolist() == pytest.approx([0.5, 1.0, 1.0])
+    assert m['topk']['top1'] == pytest.approx(0.75)
+    assert m['topk']['top2'] == pytest.approx(1.0)
+    assert 'top5' not in m['topk']  # more than the number of classes
+
+
+def test_perfectly_confident_correct_predictions_have_zero_ece():
+    labels = np.array([0, 1])
+    probs = np.array([[1.0, 0.0], [0.0, 1.0]])
+    m = compute_metrics(labels, probs)
+    assert m['ece'] == pytest.approx(0.0)
+    assert m['macro_f1'] == pytest.approx(1.0)
+
+
+def test_class_without_support_is_left_out_of_macro_f1():
+    labels = np.array([0, 0])
+    probs = np.array([[0.6, 0.4], [0.7, 0.3]])
+    m = compute_metrics(labels, probs)
+    assert m['support'].tolist() == [2, 0]
+    assert m['macro_f1'] == pytest.approx(1.0)
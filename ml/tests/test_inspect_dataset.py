@@ -0,0 +1,27 @@
+from inspect_dataset import near_duplicates
+
+
+def _rec(phash, ok=True):
+    return {'ok': ok, 'phash': phash}
+
+
+def test_near_duplicates_within_distance():
+    records = {
+        'a/1.jpg': _rec('ffff0000ffff0000'),
+        'a/2.jpg': _rec('ffff0000ffff0001'),  # 1 bit from 1.jpg
+        'b/3.jpg': _rec('0000ffff0000ffff'),
+        'b/4.jpg': _rec('ffff0000ffff0001', ok=False),
+    }
+    pairs, skipped = near_duplicates(records, max_distance=2)
+    assert pairs == [{'a': 'a/1.jpg', 'b': 'a/2.jpg', 'distance': 1}]
+    assert skipped == []
+
+
+def test_oversized_buckets_are_skipped():
+    # every hash shares the low bands, so one bucket holds all of them
+    records = {f'c/{i}.jpg': _rec(f'{i:04x}000000000000') for i in range(20)}
+    pairs, skipped = near_duplicates(records, max_distance=1, max_bucket=5)
+    assert skipped and all(s['size'] > 5 for s in skipped)
+    full, none_skipped = near_duplicates(records, max_distance=1)
+    assert none_skipped == []
+    assert len(pairs) <= len(full)
@@ -0,0 +1,67 @@
+from manifest import (FolderDataset, ManifestDataset, open_split, read_manifest, split_classes,
+                      write_manifest)
+
+
+def _row(path, label, split):
+    return {'path': path, 'label': label, 'split': split, 'size': 1, 'mtime_ns': 1, 'sha256': 'x'}
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'')
+
+
+def test_write_then_read_manifest_round_trips(tmp_path):
+    rows = [_row('data/b.jpg', 'banana', 'val'), _row('data/a.jpg', 'apple', 'train')]
+    write_manifest(rows, tmp_path / 'manifest.csv')
+    back = read_manifest(tmp_path / 'manifest.csv')
+    assert [(r['path'], r['label'], r['split']) for r in back] == [('data/a.jpg', 'apple', 'train'),
+                                                                   ('data/b.jpg', 'banana', 'val')]
+    assert read_manifest(tmp_path / 'missing.csv') == []
+
+
+def test_manifest_labels_cover_every_split(tmp_path):
+    write_manifest([_row('a.jpg', 'apple', 'train'), _row('k.jpg', 'kiwi', 'test'),
+                    _row('b.jpg', 'banana', 'val')], tmp_path / 'manifest.csv')
+    val = ManifestDataset('val', manifest=tmp_path / 'manifest.csv')
+    assert val.classes == ['apple', 'banana', 'kiwi']
+    assert val.targets == [1]
+
+
+def test_folder_and_manifest_splits_share_label_indices(tmp_path, monkeypatch):
+    monkeypatch.delenv('SPLIT_SOURCE', raising=False)
+    # train was materialized by an earlier run and lacks 'banana'; val only exists in the manifest
+    _touch(tmp_path / 'train' / 'apple' / '1.jpg')
+    _touch(tmp_path / 'train' / 'cherry' / '2.jpg')
+    (tmp_path / 'val').mkdir()
+    write_manifest([_row('x/a.jpg', 'apple', 'train'), _row('x/b.jpg', 'banana', 'val'),
+                    _row('x/c.jpg', 'cherry', 'val')], tmp_path / 'manifest.csv')
+
+    train = open_split('train', split_dir=tmp_path)
+    val = open_split('val', split_dir=tmp_path)
+    assert isinstance(train, FolderDataset)
+    assert isinstance(val, ManifestDataset)
+    assert train.classes == val.classes == ['apple', 'banana', 'cherry']
+    assert train.targets == [0, 2]
+    assert val.targets == [1, 2]
+
+
+def test_empty_class_folder_keeps_its_index(tmp_path, monkeypatch):
+    monkeypatch.delenv('SPLIT_SOURCE', raising=False)
+    _touch(tmp_path / 'train' / 'apple' / '1.jpg')
+    (tmp_path / 'train' / 'banana').mkdir()
+    _touch(tmp_path / 'train' / 'cherry' / '1.png')
+    _touch(tmp_path / 'train' / 'cherry' / 'notes.txt')
+    assert split_classes(tmp_path) == ['apple', 'banana', 'cherry']
+    train = open_split('train', split_dir=tmp_path)
+    assert train.targets == [0, 2]
+
+
+def test_split_source_manifest_ignores_folders(tmp_path, monkeypatch):
+    _touch(tmp_path / 'train' / 'apple' / '1.jpg')
+    write_manifest([_row('x/a.jpg', 'apple', 'train'), _row('x/b.jpg', 'apple', 'train')],
+                   tmp_path / 'manifest.csv')
+    monkeypatch.setenv('SPLIT_SOURCE', 'manifest')
+    ds = open_split('train', split_dir=tmp_path)
+    assert isinstance(ds, ManifestDataset)
+    assert len(ds) == 2
@@ -1,16 +1,19 @@
 import os
 import torch
 import torch.nn as nn
-from torchvision import transforms, datasets, models
+from torchvision import transforms, models
 from torch.utils.data import DataLoader
 from pathlib import Path
 import argparse
 import json
+import time
 import platform
 import csv
 import random
 import numpy as np
 
+from manifest import open_split
+
 BASE = Path(__file__).resolve().parents[1]
 SPLIT_DIR = BASE / 'data' / 'splits'
 # Allow experiments to set a custom model directory so multiple runs don't clobber each other
@@ -19,13 +22,41 @@ if EXP_MODEL_DIR:
     MODEL_DIR = Path(EXP_MODEL_DIR)
 else:
     MODEL_DIR = BASE / 'ml' / 'models'
-LOG_DIR = BASE / 'ml' / 'logs'
+# ... and a custom log directory so concurrent runs keep separate train_log.csv files
+EXP_LOG_DIR = os.environ.get('EXP_LOG_DIR')
+LOG_DIR = Path(EXP_LOG_DIR) if EXP_LOG_DIR else BASE / 'ml' / 'logs'
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 MODEL_PATH = MODEL_DIR / 'fruit_classifier.pt'
+# per-epoch resume state (model, optimizer, scheduler, RNG), removed once a run completes
+LAST_STATE_NAME = 'fruit_classifier.last.pt'
+
+
+def _loader_workers():
+    # On Windows, using num_workers>0 can cause issues in some environments
+    if platform.system().lower().startswith('win'):
+        return 0
+    return int(os.environ.get('LOADER_WORKERS', '2'))
+
+
+def get_shard_dataloaders(img_size=224, batch_size=16):
+    """Same splits and augmentations as get_dataloaders, read from the uint8 shard cache (ml/shards.py)."""
+    from shards import ShardDataset, build_shards, tensor_transforms
+    augment_level = os.environ.get('AUGMENT_LEVEL', 'baseline')
+    train_ds = ShardDataset(build_shards('train', img_size), tensor_transforms(augment_level, img_size, train=True))
+    val_ds = ShardDataset(build_shards('val', img_size), tensor_transforms(augment_level, img_size, train=False))
+    num_workers = _loader_workers()
+    train_loader = DataLoader(train_ds, batch_size=batch_size, shuffle=True, num_workers=num_workers,
+                              persistent_workers=num_workers > 0)
+    val_loader = DataLoader(val_ds, batch_size=batch_size, shuffle=False, num_workers=num_workers,
+                            persistent_workers=num_workers > 0)
+    return train_loader, val_loader, train_ds.classes
 
 
 def get_dataloaders(img_size=224, batch_size=16):
+    # Preprocessed shard cache instead of per-epoch JPEG decoding (enable with SHARD_CACHE=1)
+    if os.environ.get('SHARD_CACHE', '0') == '1':
+        return get_shard_dataloaders(img_size, batch_size)
     # Allow selecting augmentation intensity via environment variable AUGMENT_LEVEL
     augment_level = os.environ.get('AUGMENT_LEVEL', 'baseline')
     if augment_level == 'none':
@@ -71,34 +102,85 @@ def get_dataloaders(img_size=224, batch_size=16):
                     except Exception:
                         pass
 
-    train_ds = datasets.ImageFolder(SPLIT_DIR / 'train', transform=train_transforms)
-    val_ds = datasets.ImageFolder(SPLIT_DIR / 'val', transform=val_transforms)
+    train_ds = open_split('train', train_transforms)
+    val_ds = open_split('val', val_transforms)
 
-    # On Windows, using num_workers>0 can cause issues in some environments
-    num_workers = 0 if platform.system().lower().startswith('win') else 2
+    num_workers = _loader_workers()
     train_loader = DataLoader(train_ds, batch_size=batch_size, shuffle=True, num_workers=num_workers)
     val_loader = DataLoader(val_ds, batch_size=batch_size, shuffle=False, num_workers=num_workers)
     return train_loader, val_loader, train_ds.classes
 
 
-def train(epochs=3, lr=1e-3, device='cpu', batch_size=16, seed=1337):
-    # reproducibility
-    random.seed(seed)
-    np.random.seed(seed)
-    torch.manual_seed(seed)
+LOG_HEADER = ['epoch', 'train_loss', 'val_acc', 'val_correct', 'val_total', 'model_path',
+              'mode', 'epoch_seconds', 'train_images_per_sec', 'step_ms']
 
-    train_loader, val_loader, classes = get_dataloaders(batch_size=batch_size)
-    num_classes = len(classes)
-    model = models.mobilenet_v2(pretrained=True)
-    model.classifier[1] = nn.Linear(model.last_channel, num_classes)
-    model.to(device)
 
+def _ensure_log_header(log_file):
+    """Create train_log.csv, or widen an older log to LOG_HEADER (old rows get empty new columns)."""
+    if not log_file.exists():
+        with open(log_file, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(LOG_HEADER)
+        return
+    with open(log_file, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    if rows and rows[0] == LOG_HEADER:
+        return
+    body = rows[1:] if rows else []
+    with open(log_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(LOG_HEADER)
+        for r in body:
+            writer.writerow(r + [''] * (len(LOG_HEADER) - len(r)))
+
+
+def _blank_pruned_paths(log_file, pruned):
+    """Clear model_path in train_log.csv rows whose epoch checkpoint was pruned, so no row points at a deleted file."""
+    if not pruned or not log_file.exists():
+        return
+    with open(log_file, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    col = LOG_HEADER.index('model_path')
+    changed = False
+    for r in rows[1:]:
+        if len(r) > col and r[col] in pruned:
+            r[col] = ''
+            changed = True
+    if changed:
+        with open(log_file, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+
+
+def _run_config(epochs, lr, batch_size, seed, mode, classes):
+    """What a resumed run must share with the interrupted one for its saved state to be valid."""
+    return {
+        'epochs': epochs, 'lr': lr, 'batch_size': batch_size, 'seed': seed, 'mode': mode, 'classes': list(classes),
+        'augment_level': os.environ.get('AUGMENT_LEVEL', 'baseline'),
+        'class_weight': os.environ.get('CLASS_WEIGHT', '0'),
+        'lr_scheduler': os.environ.get('LR_SCHEDULER', '').lower(),
+        'shard_cache': os.environ.get('SHARD_CACHE', '0'),
+    }
+
+
+def _resume_mismatches(state, config):
+    """Keys whose saved value differs from this invocation (older state files only carry classes and mode)."""
+    saved = state.get('config') or {'classes': state.get('classes'), 'mode': state.get('mode')}
+    return [k for k, v in saved.items() if k in config and config[k] != v]
+
+
+def _autocast(device, enabled):
+    """bf16 autocast on CPU, fp16 on CUDA; a no-op context when disabled."""
+    device_type = 'cuda' if str(device).startswith('cuda') else 'cpu'
+    dtype = torch.float16 if device_type == 'cuda' else torch.bfloat16
+    return torch.autocast(device_type=device_type, dtype=dtype, enabled=enabled)
+
+
+def _make_criterion(targets, device):
     # Optionally use class-weighted loss (enable by setting env CLASS_WEIGHT=1)
     use_class_weight = os.environ.get('CLASS_WEIGHT', '0') == '1'
     if use_class_weight:
         # compute weights from train dataset class counts
         try:
-            counts = np.bincount(train_loader.dataset.targets)
+            counts = np.bincount(targets)
             weights = 1.0 / (counts + 1e-6)
             weights = weights / weights.sum() * len(weights)
             class_weights = torch.tensor(weights, dtype=torch.float32, device=device)
@@ -109,8 +191,10 @@ def train(epochs=3, lr=1e-3, device='cpu', batch_size=16, seed=1337):
             criterion = nn.CrossEntropyLoss()
     else:
         criterion = nn.CrossEntropyLoss()
-    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    return criterion
+
 
+def _make_scheduler(optimizer, epochs):
     # Optional LR scheduler (enable via LR_SCHEDULER env var, e.g., 'cosine' or 'step')
     lr_scheduler = os.environ.get('LR_SCHEDULER', '').lower()
     scheduler = None
@@ -126,41 +210,164 @@ def train(epochs=3, lr=1e-3, device='cpu', batch_size=16, seed=1337):
             print("Using StepLR scheduler")
         except Exception:
             scheduler = None
+    return scheduler
+
+
+def _get_rng_state():
+    state = {'python': random.getstate(), 'numpy': np.random.get_state(), 'torch': torch.get_rng_state()}
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def _set_rng_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'].cpu())
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all([t.cpu() for t in state['cuda']])
+
+
+def _save_atomic(obj, path):
+    # write-then-rename so an interrupted save never leaves a truncated resume file
+    tmp = path.with_name(path.name + '.tmp')
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+
+def train(epochs=3, lr=1e-3, device='cpu', batch_size=16, seed=1337, fast=None, compile_model=None,
+          init_state=None, mode_prefix='', resume=None, patience=None, keep_epochs=None, init_best_acc=None):
+    # per-run torch thread budget (set by the experiment scheduler so parallel runs don't oversubscribe)
+    torch_threads = int(os.environ.get('TORCH_NUM_THREADS', '0') or 0)
+    if torch_threads > 0:
+        torch.set_num_threads(torch_threads)
+
+    # reproducibility
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
 
-    best_val_acc = 0.0
+    train_loader, val_loader, classes = get_dataloaders(batch_size=batch_size)
+    num_classes = len(classes)
+    model = models.mobilenet_v2(pretrained=init_state is None)
+    model.classifier[1] = nn.Linear(model.last_channel, num_classes)
+    if init_state is not None:
+        # e.g. the head trained by train_head(); fine-tune the whole network from there
+        model.load_state_dict(init_state)
+    model.to(device)
+
+    # Opt-in fast mode (FAST_TRAIN=1 / --fast): autocast, channels_last, one loss sync per epoch,
+    # optionally torch.compile (TORCH_COMPILE=1 / --compile)
+    if fast is None:
+        fast = os.environ.get('FAST_TRAIN', '0') == '1'
+    if compile_model is None:
+        compile_model = os.environ.get('TORCH_COMPILE', '0') == '1'
+    mode = 'baseline'
+    net = model
+    if fast:
+        mode = 'fast'
+        model = model.to(memory_format=torch.channels_last)
+        net = model
+        if compile_model and hasattr(torch, 'compile'):
+            try:
+                net = torch.compile(model)
+                mode = 'fast+compile'
+            except Exception as e:
+                print(f"torch.compile unavailable, continuing without it: {e}")
+    scaler = torch.cuda.amp.GradScaler() if fast and str(device).startswith('cuda') else None
+    mode = mode_prefix + mode
+    print(f"Training mode: {mode}")
+
+    criterion = _make_criterion(train_loader.dataset.targets, device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+
+    scheduler = _make_scheduler(optimizer, epochs)
+
+    # fine-tuning starts from the head-only result; only an improvement on it replaces the saved models
+    best_val_acc = init_best_acc if init_best_acc is not None else 0.0
     MODEL_PATH = MODEL_DIR / 'fruit_classifier.pt'
     best_path = MODEL_DIR / 'fruit_classifier.best.pt'
 
+    # Early stopping (EARLY_STOP_PATIENCE, 0 = off) and keep-best-K epoch checkpoints (KEEP_EPOCH_CHECKPOINTS, 0 = all)
+    if patience is None:
+        patience = int(os.environ.get('EARLY_STOP_PATIENCE', '0') or 0)
+    if keep_epochs is None:
+        keep_epochs = int(os.environ.get('KEEP_EPOCH_CHECKPOINTS', '0') or 0)
+    if resume is None:
+        resume = os.environ.get('RESUME', '0') == '1'
+    stale_epochs = 0
+    kept = []  # [(val_acc, epoch, path)] epoch checkpoints still on disk
+    start_epoch = 0
+    state_path = MODEL_DIR / LAST_STATE_NAME
+    config = _run_config(epochs, lr, batch_size, seed, mode, classes)
+    state = None
+    if resume and state_path.exists():
+        state = torch.load(state_path, map_location=device, weights_only=False)
+        mismatches = _resume_mismatches(state, config)
+        if mismatches:
+            print(f"Not resuming from {state_path}: it was saved with different "
+                  f"{', '.join(mismatches)}; starting from epoch 1")
+            state = None
+    if state is not None:
+        model.load_state_dict(state['model_state'])
+        optimizer.load_state_dict(state['optimizer_state'])
+        if scheduler is not None and state.get('scheduler_state'):
+            scheduler.load_state_dict(state['scheduler_state'])
+        if scaler is not None and state.get('scaler_state'):
+            scaler.load_state_dict(state['scaler_state'])
+        _set_rng_state(state['rng'])
+        start_epoch = state['epoch']
+        best_val_acc = state['best_val_acc']
+        stale_epochs = state.get('stale_epochs', 0)
+        kept = [tuple(k) for k in state.get('kept', []) if Path(k[2]).exists()]
+        print(f"Resuming from {state_path} after epoch {start_epoch} (best val acc {best_val_acc:.4f})")
+
     log_file = LOG_DIR / 'train_log.csv'
-    if not log_file.exists():
-        with open(log_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['epoch', 'train_loss', 'val_acc', 'val_correct', 'val_total', 'model_path'])
+    _ensure_log_header(log_file)
 
-    for epoch in range(epochs):
+    stopped_early = False
+    for epoch in range(start_epoch, epochs):
         model.train()
-        running = 0
+        epoch_start = time.perf_counter()
+        running = torch.zeros((), device=device) if fast else 0
+        seen = 0
         for imgs, labels in train_loader:
-            imgs = imgs.to(device)
-            labels = labels.to(device)
-            optimizer.zero_grad()
-            outputs = model(imgs)
-            loss = criterion(outputs, labels)
-            loss.backward()
-            optimizer.step()
-            running += loss.item()
-        avg = running / max(1, len(train_loader))
-        print(f"Epoch {epoch+1}/{epochs} train loss: {avg:.4f}")
+            imgs = imgs.to(device, non_blocking=fast)
+            labels = labels.to(device, non_blocking=fast)
+            if fast:
+                imgs = imgs.contiguous(memory_format=torch.channels_last)
+            optimizer.zero_grad(set_to_none=True)
+            with _autocast(device, fast):
+                outputs = net(imgs)
+                loss = criterion(outputs, labels)
+            if scaler is not None:
+                scaler.scale(loss).backward()
+                scaler.step(optimizer)
+                scaler.update()
+            else:
+                loss.backward()
+                optimizer.step()
+            # fast mode keeps the running loss on the device; .item() would sync every step
+            running += loss.detach() if fast else loss.item()
+            seen += labels.size(0)
+        steps = max(1, len(train_loader))
+        avg = float(running) / steps
+        epoch_seconds = time.perf_counter() - epoch_start
+        images_per_sec = seen / epoch_seconds if epoch_seconds > 0 else 0.0
+        step_ms = epoch_seconds * 1000.0 / steps
+        print(f"Epoch {epoch+1}/{epochs} train loss: {avg:.4f} ({images_per_sec:.1f} img/s, {step_ms:.1f} ms/step)")
 
         # Validation
         model.eval()
         correct = 0
         total = 0
-        with torch.no_grad():
+        with torch.no_grad(), _autocast(device, fast):
             for imgs, labels in val_loader:
                 imgs = imgs.to(device)
                 labels = labels.to(device)
-                outputs = model(imgs)
+                if fast:
+                    imgs = imgs.contiguous(memory_format=torch.channels_last)
+                outputs = net(imgs)
                 preds = outputs.argmax(dim=1)
                 correct += (preds == labels).sum().item()
                 total += labels.size(0)
@@ -170,10 +377,26 @@ def train(epochs=3, lr=1e-3, device='cpu', batch_size=16, seed=1337):
         # checkpoint best
         epoch_path = MODEL_DIR / f'fruit_classifier_epoch_{epoch+1}.pt'
         torch.save({'model_state': model.state_dict(), 'classes': classes}, epoch_path)
+        kept.append((val_acc, epoch + 1, str(epoch_path)))
+        pruned = set()
+        if keep_epochs > 0 and len(kept) > keep_epochs:
+            # keep the K best epoch checkpoints (ties: the newer one wins)
+            kept.sort(key=lambda k: (k[0], k[1]), reverse=True)
+            for _, _, path in kept[keep_epochs:]:
+                try:
+                    Path(path).unlink()
+                except OSError:
+                    pass
+                pruned.add(path)
+            kept = kept[:keep_epochs]
+            _blank_pruned_paths(log_file, pruned)
         if val_acc > best_val_acc:
             best_val_acc = val_acc
+            stale_epochs = 0
             torch.save({'model_state': model.state_dict(), 'classes': classes}, best_path)
             print(f"New best model saved to {best_path} (val_acc={best_val_acc:.4f})")
+        else:
+            stale_epochs += 1
 
         if scheduler is not None:
             try:
@@ -184,21 +407,177 @@ def train(epochs=3, lr=1e-3, device='cpu', batch_size=16, seed=1337):
         # log
         with open(log_file, 'a', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow([epoch + 1, f"{avg:.6f}", f"{val_acc:.6f}", correct, total, str(epoch_path)])
+            logged_path = '' if str(epoch_path) in pruned else str(epoch_path)
+            writer.writerow([epoch + 1, f"{avg:.6f}", f"{val_acc:.6f}", correct, total, logged_path,
+                             mode, f"{epoch_seconds:.3f}", f"{images_per_sec:.2f}", f"{step_ms:.3f}"])
+
+        # resumable state: everything needed to continue from the next epoch
+        _save_atomic({
+            'model_state': model.state_dict(),
+            'optimizer_state': optimizer.state_dict(),
+            'scheduler_state': scheduler.state_dict() if scheduler is not None else None,
+            'scaler_state': scaler.state_dict() if scaler is not None else None,
+            'rng': _get_rng_state(),
+            'epoch': epoch + 1,
+            'best_val_acc': best_val_acc,
+            'stale_epochs': stale_epochs,
+            'kept': kept,
+            'classes': classes,
+            'mode': mode,
+            'config': config,
+        }, state_path)
+
+        if patience > 0 and stale_epochs >= patience:
+            print(f"Early stopping after epoch {epoch+1}: no val acc improvement in {patience} epoch(s)")
+            stopped_early = True
+            break
 
     # Save last model as well
-    torch.save({'model_state': model.state_dict(), 'classes': classes}, MODEL_PATH)
-    print(f"Saved final model to {MODEL_PATH}")
+    if init_best_acc is not None and best_val_acc <= init_best_acc:
+        print(f"Fine-tuning did not improve on val acc {init_best_acc:.4f}; keeping {MODEL_PATH}")
+    else:
+        torch.save({'model_state': model.state_dict(), 'classes': classes}, MODEL_PATH)
+        print(f"Saved final model to {MODEL_PATH}" + (' (stopped early)' if stopped_early else ''))
+    # the run is complete; the optimizer/RNG state is no longer needed
+    if state_path.exists():
+        state_path.unlink()
     if best_path.exists():
         print(f"Best model available at {best_path} (val_acc={best_val_acc:.4f})")
 
 
+def train_head(epochs=10, lr=1e-3, device='cpu', batch_size=256, seed=1337, finetune_epochs=0, finetune_lr=None,
+               fast=None, compile_model=None, patience=None, keep_epochs=None):
+    """Train only classifier[1] on cached frozen-backbone features (ml/features.py).
+
+    Each epoch is a pass over [N,1280] feature vectors instead of N images, so
+    a head-only sweep takes seconds. With `finetune_epochs` > 0 the trained
+    head is loaded into the full network and train() fine-tunes it unfrozen;
+    `fast`, `compile_model`, `patience` and `keep_epochs` apply to that phase.
+    """
+    from features import FEATURE_DIM, build_features, load_features, pretrained_backbone_state
+
+    torch_threads = int(os.environ.get('TORCH_NUM_THREADS', '0') or 0)
+    if torch_threads > 0:
+        torch.set_num_threads(torch_threads)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    train_x, train_y, classes = load_features(build_features('train', device=device))
+    val_x, val_y, _ = load_features(build_features('val', device=device))
+    # the cached features are small ([N,1280] float32); hold them as tensors
+    train_x = torch.from_numpy(np.ascontiguousarray(train_x)).to(device)
+    train_y = torch.from_numpy(train_y).to(device)
+    val_x = torch.from_numpy(np.ascontiguousarray(val_x)).to(device)
+    val_y = torch.from_numpy(val_y).to(device)
+
+    head = nn.Linear(FEATURE_DIM, len(classes)).to(device)
+    dropout = nn.Dropout(0.2)  # MobileNetV2's classifier[0]
+    criterion = _make_criterion(train_y.cpu().numpy(), device)
+    optimizer = torch.optim.Adam(head.parameters(), lr=lr)
+    scheduler = _make_scheduler(optimizer, epochs)
+
+    log_file = LOG_DIR / 'train_log.csv'
+    _ensure_log_header(log_file)
+    best_val_acc = -1.0
+    best_head = None
+    n = train_x.shape[0]
+    for epoch in range(epochs):
+        head.train()
+        epoch_start = time.perf_counter()
+        running = torch.zeros((), device=device)
+        perm = torch.randperm(n, device=device)
+        steps = 0
+        for i in range(0, n, batch_size):
+            idx = perm[i:i + batch_size]
+            optimizer.zero_grad(set_to_none=True)
+            loss = criterion(head(dropout(train_x[idx])), train_y[idx])
+            loss.backward()
+            optimizer.step()
+            running += loss.detach()
+            steps += 1
+        avg = float(running) / max(1, steps)
+        epoch_seconds = time.perf_counter() - epoch_start
+        head.eval()
+        with torch.no_grad():
+            correct = int((head(val_x).argmax(dim=1) == val_y).sum())
+        total = int(val_y.numel())
+        val_acc = correct / total if total else 0.0
+        images_per_sec = n / epoch_seconds if epoch_seconds > 0 else 0.0
+        print(f"Head epoch {epoch+1}/{epochs} train loss: {avg:.4f}, val acc: {val_acc:.4f} ({correct}/{total})")
+        if val_acc > best_val_acc:
+            best_val_acc = val_acc
+            best_head = {k: v.detach().cpu().clone() for k, v in head.state_dict().items()}
+        if scheduler is not None:
+            scheduler.step()
+        with open(log_file, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow([epoch + 1, f"{avg:.6f}", f"{val_acc:.6f}", correct, total, '',
+                                    'head-only', f"{epoch_seconds:.3f}", f"{images_per_sec:.2f}",
+                                    f"{epoch_seconds * 1000.0 / max(1, steps):.3f}"])
+
+    # assemble a full checkpoint in the usual format: the backbone the features came from + best head
+    model = models.mobilenet_v2(pretrained=False)
+    model.classifier[1] = nn.Linear(model.last_channel, len(classes))
+    model.features.load_state_dict(pretrained_backbone_state())
+    model.classifier[1].load_state_dict(best_head)
+    state = model.state_dict()
+    best_path = MODEL_DIR / 'fruit_classifier.best.pt'
+    torch.save({'model_state': state, 'classes': classes}, best_path)
+    torch.save({'model_state': state, 'classes': classes}, MODEL_PATH)
+    print(f"Saved head-only model to {MODEL_PATH} (val_acc={best_val_acc:.4f})")
+
+    if finetune_epochs > 0:
+        print(f"Fine-tuning the unfrozen network for {finetune_epochs} epoch(s)")
+        train(epochs=finetune_epochs, lr=finetune_lr or lr * 0.1, device=device, seed=seed,
+              init_state=state, mode_prefix='finetune-', resume=False, init_best_acc=best_val_acc,
+              fast=fast, compile_model=compile_model, patience=patience, keep_epochs=keep_epochs)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--epochs', type=int, default=3)
     parser.add_argument('--batch-size', type=int, default=16)
     parser.add_argument('--lr', type=float, default=1e-3)
+    parser.add_argument('--shard-cache', action='store_true',
+                        help='read train/val from the preprocessed uint8 shard cache (same as SHARD_CACHE=1)')
+    parser.add_argument('--fast', action='store_true',
+                        help='autocast (bf16 on CPU), channels_last and one loss sync per epoch (same as FAST_TRAIN=1)')
+    parser.add_argument('--compile', action='store_true', help='with --fast, also torch.compile the model')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from fruit_classifier.last.pt if an earlier run was interrupted (RESUME=1)')
+    parser.add_argument('--patience', type=int, default=None,
+                        help='stop after N epochs without val acc improvement (EARLY_STOP_PATIENCE, 0 = off)')
+    parser.add_argument('--keep-epochs', type=int, default=None,
+                        help='keep only the K best fruit_classifier_epoch_N.pt files (KEEP_EPOCH_CHECKPOINTS, '
+                             'default 0 = keep all)')
+    parser.add_argument('--head-only', action='store_true',
+                        help='train only the classifier on cached frozen-backbone features (same as HEAD_ONLY=1)')
+    parser.add_argument('--finetune-epochs', type=int, default=int(os.environ.get('FINETUNE_EPOCHS', '0')),
+                        help='with --head-only, then fine-tune the whole network for N epochs; --fast, --compile, '
+                             '--patience, --keep-epochs and --shard-cache apply to those epochs')
     args = parser.parse_args()
+    head_only = args.head_only or os.environ.get('HEAD_ONLY', '0') == '1'
+    if head_only:
+        # the head phase reads cached features; the full-network options only mean something when fine-tuning
+        if args.resume:
+            # sweeps always pass --resume; the head retrains in seconds, so it simply starts over
+            print('--resume has no effect with --head-only: the head (and any fine-tuning) starts over')
+        ignored = [flag for flag, given in (('--fast', args.fast), ('--compile', args.compile),
+                                            ('--patience', args.patience is not None),
+                                            ('--keep-epochs', args.keep_epochs is not None),
+                                            ('--shard-cache', args.shard_cache)) if given]
+        if ignored and args.finetune_epochs <= 0:
+            parser.error(f"{', '.join(ignored)} only apply to full-network epochs; "
+                         f"add --finetune-epochs N or drop --head-only")
+    if args.shard_cache:
+        os.environ['SHARD_CACHE'] = '1'
 
     device = 'cuda' if torch.cuda.is_available() else 'cpu'
-    train(epochs=args.epochs, lr=args.lr, device=device)
+    if head_only:
+        train_head(epochs=args.epochs, lr=args.lr, device=device, finetune_epochs=args.finetune_epochs,
+                   fast=True if args.fast else None, compile_model=True if args.compile else None,
+                   patience=args.patience, keep_epochs=args.keep_epochs)
+    else:
+        train(epochs=args.epochs, lr=args.lr, device=device,
+              fast=True if args.fast else None, compile_model=True if args.compile else None,
+              resume=True if args.resume else None, patience=args.patience, keep_epochs=args.keep_epochs)
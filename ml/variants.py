@@ -0,0 +1,71 @@
+"""Exported CPU-serving variants of fruit_classifier.pt: file names, manifest and loading.
+
+export.py writes the variants and the manifest. backend/vision/model_loader.py
+and evaluate.py read them through this module, so the artifact names and the
+loading rules are shared by both sides. torch and onnxruntime are imported
+lazily, so the backend can import this without them.
+"""
+import json
+from pathlib import Path
+
+MANIFEST_NAME = 'fruit_classifier.variants.json'
+CHECKPOINT_NAME = 'fruit_classifier.pt'
+DEFAULT_IMG_SIZE = 224
+ALL_VARIANTS = ('torchscript', 'dynamic_int8', 'static_int8', 'onnx')
+VARIANT_FILES = {
+    'torchscript': 'fruit_classifier.torchscript.pt',
+    'dynamic_int8': 'fruit_classifier.dynamic_int8.pt',
+    'static_int8': 'fruit_classifier.static_int8.pt',
+    'onnx': 'fruit_classifier.onnx',
+}
+
+
+class OnnxModel:
+    """Minimal torch-like wrapper around an onnxruntime session."""
+
+    def __init__(self, path: Path, threads: int = 0):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(path), opts, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, x):
+        import torch
+        out = self.session.run(None, {self.input_name: x.detach().cpu().numpy()})[0]
+        return torch.from_numpy(out)
+
+
+def read_manifest(model_dir: Path) -> dict:
+    """The variants manifest in `model_dir`, or {} if it is missing or unreadable."""
+    try:
+        with open(Path(model_dir) / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def load_variant(model_dir: Path, name: str):
+    """(callable model, classes, img_size) for an exported variant, or 'eager' for the checkpoint."""
+    import torch
+    model_dir = Path(model_dir)
+    if name == 'eager':
+        from architectures import model_from_checkpoint
+        data = torch.load(str(model_dir / CHECKPOINT_NAME), map_location='cpu')
+        return model_from_checkpoint(data)
+    path = model_dir / VARIANT_FILES[name]
+    if name == 'onnx':
+        manifest = read_manifest(model_dir)
+        return OnnxModel(path), manifest.get('classes'), int(manifest.get('img_size', DEFAULT_IMG_SIZE))
+    extra = {'meta.json': ''}
+    module = torch.jit.load(str(path), map_location='cpu', _extra_files=extra)
+    meta = json.loads(extra['meta.json'] or '{}')
+    engine = meta.get('quantized_engine')
+    if engine and engine in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = engine
+    module.eval()
+    return module, meta.get('classes'), int(meta.get('img_size', DEFAULT_IMG_SIZE))